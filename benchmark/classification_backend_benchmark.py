@@ -0,0 +1,71 @@
+"""
+Compare latency and throughput of TextClassificationAnalyzer backends on CPU.
+
+Usage:
+    python benchmark/classification_backend_benchmark.py --model obsei-ai/sell-buy-intent-classifier-bert-mini
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+from obsei.analyzer.classification_analyzer import (
+    ClassificationAnalyzerConfig,
+    TextClassificationAnalyzer,
+)
+from obsei.payload import TextPayload
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(stream=sys.stdout, level=logging.WARNING)
+
+SAMPLE_TEXTS = [
+    "I am interested in this style of servo motor, could you please send me the quotation",
+    "Black full body massage chair for sale.",
+    "The unit is just lovely, you go to sleep & wake up to this incredible place",
+    "I had the worst experience ever, bad cars, asking to pay in cash and more. Worst service.",
+    "I am mixed",
+]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--model", default="obsei-ai/sell-buy-intent-classifier-bert-mini")
+parser.add_argument("--num-texts", type=int, default=256)
+parser.add_argument("--batch-size", type=int, default=16)
+parser.add_argument("--repeat", type=int, default=3)
+args = parser.parse_args()
+
+source_responses = [
+    TextPayload(processed_text=SAMPLE_TEXTS[idx % len(SAMPLE_TEXTS)])
+    for idx in range(args.num_texts)
+]
+analyzer_config = ClassificationAnalyzerConfig()
+
+print(f"{'backend':<20}{'batch latency ms':>20}{'texts/sec':>15}")
+for backend, quantize in [("pytorch", False), ("onnx", False), ("onnx", True)]:
+    analyzer = TextClassificationAnalyzer(
+        model_name_or_path=args.model,
+        device="cpu",
+        backend=backend,
+        quantize=quantize,
+        batch_size=args.batch_size,
+        use_model_registry=False,
+    )
+
+    # Warm up
+    analyzer.analyze_input(source_responses[: args.batch_size], analyzer_config)
+
+    batch_latencies = []
+    for _ in range(args.repeat):
+        for index in range(0, len(source_responses), args.batch_size):
+            start_time = time.perf_counter()
+            analyzer.analyze_input(
+                source_responses[index : index + args.batch_size], analyzer_config
+            )
+            batch_latencies.append(time.perf_counter() - start_time)
+
+    total_time = sum(batch_latencies)
+    name = f"{backend}{' (int8)' if quantize else ''}"
+    print(
+        f"{name:<20}{statistics.median(batch_latencies) * 1000:>20.2f}"
+        f"{args.num_texts * args.repeat / total_time:>15.1f}"
+    )
@@ -0,0 +1,46 @@
+"""
+Compare RemoveDateTime (dateutil fuzzy parsing) with RegExRemoveDateTime.
+
+Usage:
+    python benchmark/date_time_removal_benchmark.py --num-texts 100000
+"""
+import argparse
+import logging
+import sys
+import time
+
+from obsei.preprocessor.text_cleaning_function import (
+    RegExRemoveDateTime,
+    RemoveDateTime,
+)
+
+logger = logging.getLogger(__name__)
+# RemoveDateTime log warning for every text it fails to parse
+logging.basicConfig(stream=sys.stdout, level=logging.ERROR)
+
+SAMPLE_TEXTS = [
+    "Peter drinks likely likes to tea at 16:45 every 15th May 2021",
+    "Delivered on 2021-05-15, two days late",
+    "App crashes every time I open it since the last update",
+    "Waited from 10:30 am to 1 pm on Monday, worst service",
+    "Good but too many ads",
+]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num-texts", type=int, default=100000)
+args = parser.parse_args()
+
+token_lists = [
+    SAMPLE_TEXTS[idx % len(SAMPLE_TEXTS)].split() for idx in range(args.num_texts)
+]
+
+print(f"{'function':<24}{'seconds':>12}{'texts/sec':>14}")
+for cleaning_function in [RemoveDateTime(), RegExRemoveDateTime()]:
+    start_time = time.perf_counter()
+    for tokens in token_lists:
+        cleaning_function.execute(tokens)
+    total_time = time.perf_counter() - start_time
+    print(
+        f"{type(cleaning_function).__name__:<24}{total_time:>12.2f}"
+        f"{args.num_texts / total_time:>14.1f}"
+    )
@@ -0,0 +1,66 @@
+"""
+Aggregate classifier scores of split documents with InferenceAggregator.
+
+Usage:
+    python benchmark/inference_aggregator_benchmark.py --num-documents 20000 --num-labels 5
+"""
+import argparse
+import random
+import time
+
+from obsei.payload import TextPayload
+from obsei.postprocessor.inference_aggregator import (
+    InferenceAggregator,
+    InferenceAggregatorConfig,
+)
+from obsei.postprocessor.inference_aggregator_function import (
+    ClassificationAverageScore,
+    ClassificationMaxCategories,
+)
+from obsei.preprocessor.text_splitter import TextSplitterPayload
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num-documents", type=int, default=20000)
+parser.add_argument("--num-labels", type=int, default=5)
+parser.add_argument("--max-chunks", type=int, default=8)
+args = parser.parse_args()
+
+rnd = random.Random(42)
+labels = [f"label_{idx}" for idx in range(args.num_labels)]
+chunks = []
+for doc_idx in range(args.num_documents):
+    total_chunks = rnd.randint(1, args.max_chunks)
+    for chunk_id in range(total_chunks):
+        text = "x" * rnd.randint(1, 512)
+        chunks.append(
+            TextPayload(
+                processed_text=text,
+                source_name="benchmark",
+                segmented_data={
+                    "classifier_data": {label: rnd.random() for label in labels}
+                },
+                meta={
+                    "splitter": TextSplitterPayload(
+                        phrase=text,
+                        chunk_id=chunk_id,
+                        chunk_length=len(text),
+                        document_id=str(doc_idx),
+                        total_chunks=total_chunks,
+                    )
+                },
+            )
+        )
+rnd.shuffle(chunks)
+
+aggregator = InferenceAggregator()
+print(f"{len(chunks)} chunks, {args.num_documents} documents, {args.num_labels} labels")
+print(f"{'function':<30}{'seconds':>12}{'chunks/sec':>14}")
+for aggregate_function in [ClassificationAverageScore(), ClassificationMaxCategories()]:
+    config = InferenceAggregatorConfig(aggregate_function=aggregate_function)
+    start_time = time.perf_counter()
+    aggregator.postprocess_input(input_list=chunks, config=config)
+    total_time = time.perf_counter() - start_time
+    print(
+        f"{type(aggregate_function).__name__:<30}{total_time:>12.3f}"
+        f"{len(chunks) / total_time:>14.1f}"
+    )
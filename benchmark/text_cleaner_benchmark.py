@@ -0,0 +1,91 @@
+"""
+Compare TextCleaner throughput with and without compiled (fused) cleaning functions,
+and with worker processes.
+
+Usage:
+    python benchmark/text_cleaner_benchmark.py --num-texts 1000000 --n-process 4
+"""
+import argparse
+import logging
+import sys
+import time
+
+from obsei.payload import TextPayload
+from obsei.preprocessor.text_cleaner import TextCleaner, TextCleanerConfig
+from obsei.preprocessor.text_cleaning_function import (
+    DecodeUnicode,
+    RemovePunctuation,
+    RemoveSpecialChars,
+    RemoveStopWords,
+    RemoveWhiteSpaceAndEmptyToken,
+    ToLowerCase,
+    TokenStemming,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(stream=sys.stdout, level=logging.WARNING)
+
+SAMPLE_TEXTS = [
+    "I love this app!!! Works great :)",
+    "Worst update ever, app crashes every time I open it.",
+    "Can't login since yesterday... please fix ASAP",
+    "Good but too many ads",
+    "Délicieux café, service très rapide 👍",
+]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num-texts", type=int, default=1000000)
+parser.add_argument(
+    "--default-chain",
+    action="store_true",
+    help="Use default TextCleanerConfig chain, which include date time and domain keywords functions",
+)
+parser.add_argument("--n-process", type=int, default=1)
+args = parser.parse_args()
+
+if args.default_chain:
+    cleaning_functions = None
+else:
+    cleaning_functions = [
+        ToLowerCase(),
+        RemoveWhiteSpaceAndEmptyToken(),
+        RemovePunctuation(),
+        RemoveSpecialChars(),
+        DecodeUnicode(),
+        TokenStemming(),
+        RemoveStopWords(),
+        RemoveWhiteSpaceAndEmptyToken(),
+    ]
+
+texts = [SAMPLE_TEXTS[idx % len(SAMPLE_TEXTS)] for idx in range(args.num_texts)]
+
+runs = [(False, 1), (True, 1)]
+if args.n_process > 1:
+    runs.append((True, args.n_process))
+
+outputs = []
+print(f"{'compiled':<12}{'n_process':>10}{'seconds':>12}{'texts/sec':>14}")
+for compiled, n_process in runs:
+    text_cleaner = TextCleaner(n_process=n_process)
+    config = TextCleanerConfig(
+        cleaning_functions=cleaning_functions,
+        compile_cleaning_functions=compiled,
+    )
+    # Warm up, ie start worker processes
+    text_cleaner.preprocess_input(
+        input_list=[TextPayload(processed_text=text) for text in SAMPLE_TEXTS],
+        config=config,
+    )
+    payloads = [TextPayload(processed_text=text) for text in texts]
+
+    start_time = time.perf_counter()
+    text_cleaner.preprocess_input(input_list=payloads, config=config)
+    total_time = time.perf_counter() - start_time
+
+    outputs.append([payload.processed_text for payload in payloads])
+    print(
+        f"{str(compiled):<12}{n_process:>10}{total_time:>12.2f}"
+        f"{args.num_texts / total_time:>14.1f}"
+    )
+
+assert all(output == outputs[0] for output in outputs), "Cleaner outputs differ"
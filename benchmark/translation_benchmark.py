@@ -0,0 +1,66 @@
+"""
+Compare TranslationAnalyzer throughput on CPU for batching strategies and generation settings.
+
+Usage:
+    python benchmark/translation_benchmark.py --model Helsinki-NLP/opus-mt-hi-en
+"""
+import argparse
+import logging
+import sys
+import time
+
+from obsei.analyzer.translation_analyzer import (
+    TranslationAnalyzer,
+    TranslationAnalyzerConfig,
+)
+from obsei.payload import TextPayload
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(stream=sys.stdout, level=logging.WARNING)
+
+# Reviews of varying length, as in the real feeds
+SAMPLE_TEXTS = [
+    "मुझे सब चीजे बहुत अच्छी लगी ।",
+    "ठीक ठाक सेवा थी ।",
+    "यह जीवन का सबसे बुरा अनुभव था । खराब कारें, नकद में भुगतान करने के लिए कह रहे हैं, पर्याप्त ईंधन नहीं है, "
+    "एसी न खोलें, मेरे स्थान से बहुत दूर तक प्रतीक्षा करें जब तक कि यात्रा रद्द न हो जाए।",
+    "बहुत बढ़िया",
+    "ऐप अच्छा है लेकिन बहुत धीमा है, कृपया इसे ठीक करें ।",
+]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--model", default="Helsinki-NLP/opus-mt-hi-en")
+parser.add_argument("--num-texts", type=int, default=64)
+parser.add_argument("--batch-size", type=int, default=8)
+parser.add_argument("--max-new-tokens", type=int, default=128)
+args = parser.parse_args()
+
+source_responses = [
+    TextPayload(processed_text=SAMPLE_TEXTS[idx % len(SAMPLE_TEXTS)])
+    for idx in range(args.num_texts)
+]
+
+print(f"{'batching':<12}{'num_beams':>10}{'seconds':>12}{'texts/sec':>12}")
+for batching_strategy in ["arrival", "length"]:
+    analyzer = TranslationAnalyzer(
+        model_name_or_path=args.model,
+        device="cpu",
+        batch_size=args.batch_size,
+        batching_strategy=batching_strategy,
+    )
+    for num_beams in [1, 4]:
+        analyzer_config = TranslationAnalyzerConfig(
+            num_beams=num_beams,
+            max_new_tokens=args.max_new_tokens,
+            early_stopping=num_beams > 1,
+        )
+        # Warm up
+        analyzer.analyze_input(source_responses[: args.batch_size], analyzer_config)
+
+        start_time = time.perf_counter()
+        analyzer.analyze_input(source_responses, analyzer_config)
+        total_time = time.perf_counter() - start_time
+        print(
+            f"{batching_strategy:<12}{num_beams:>10}{total_time:>12.2f}"
+            f"{args.num_texts / total_time:>12.1f}"
+        )
@@ -1,9 +1,13 @@
+import weakref
 from abc import abstractmethod
-from typing import Any, Generator, List, Optional
+from itertools import islice
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional
 
 from pydantic import Field, PrivateAttr
 from pydantic_settings import BaseSettings
 
+from obsei.analyzer.inference_cache import BaseInferenceCache
+from obsei.analyzer.model_registry import model_registry
 from obsei.misc import gpu_util
 from obsei.payload import TextPayload
 from obsei.postprocessor.inference_aggregator import (
@@ -43,6 +47,15 @@ class BaseAnalyzer(BaseSettings):
     batch_size: int = -1
     splitter: TextSplitter = Field(default=TextSplitter())
     aggregator: InferenceAggregator = Field(default=InferenceAggregator())
+    # Share loaded model with other analyzers using the same model, task and device
+    use_model_registry: bool = True
+    # "arrival": batch inputs in arrival order
+    # "length": sort inputs by token length before batching to reduce padding, output order is preserved
+    batching_strategy: str = "arrival"
+    # Cap on padded tokens (longest input length * batch items) per batch, used by "length" strategy
+    max_batch_tokens: Optional[int] = None
+    # Skip model inference for already seen texts, see `InMemoryInferenceCache` and `SQLiteInferenceCache`
+    inference_cache: Optional[BaseInferenceCache] = None
 
     """
         auto: choose gpu if present else use cpu
@@ -61,6 +74,62 @@ class BaseAnalyzer(BaseSettings):
                 else DEFAULT_BATCH_SIZE_GPU
             )
 
+    def _load_model(
+        self,
+        task: str,
+        model_name_or_path: str,
+        loader: Callable[[], Any],
+        **options: Any,
+    ) -> Any:
+        if not self.use_model_registry:
+            return loader()
+
+        key = model_registry.build_key(
+            task, model_name_or_path, self._device_id, **options
+        )
+        model = model_registry.acquire(key, loader)
+        # Release the model reference once analyzer is garbage collected
+        weakref.finalize(self, model_registry.release, key)
+        return model
+
+    def _cached_inference(
+        self,
+        texts: List[str],
+        inference_fn: Callable[[List[str]], List[Any]],
+        fingerprint: str,
+    ) -> List[Any]:
+        """
+        Run `inference_fn` only on texts missing from the inference cache, `fingerprint`
+        should capture model and config affecting the prediction
+        """
+        if self.inference_cache is None:
+            return inference_fn(texts)
+
+        results: List[Any] = [None] * len(texts)
+        # Duplicate texts in the same input are inferred only once
+        missing: Dict[str, List[int]] = {}
+        for idx, text in enumerate(texts):
+            key = self.inference_cache.build_key(text, fingerprint)
+            if key in missing:
+                missing[key].append(idx)
+                continue
+            cached_result = self.inference_cache.get(key)
+            if cached_result is None:
+                missing[key] = [idx]
+            else:
+                results[idx] = cached_result
+
+        if missing:
+            predictions = inference_fn(
+                [texts[indices[0]] for indices in missing.values()]
+            )
+            for (key, indices), prediction in zip(missing.items(), predictions):
+                self.inference_cache.set(key, prediction)
+                for idx in indices:
+                    results[idx] = prediction
+
+        return results
+
     @abstractmethod
     def analyze_input(
         self,
@@ -70,6 +139,22 @@ class BaseAnalyzer(BaseSettings):
     ) -> List[TextPayload]:
         pass
 
+    def analyze_stream(
+        self,
+        source_response_stream: Iterable[TextPayload],
+        analyzer_config: Optional[BaseAnalyzerConfig] = None,
+        batch_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Generator[List[TextPayload], None, None]:
+        for batch_responses in self.batchify_stream(
+            source_response_stream, batch_size or self.batch_size
+        ):
+            yield self.analyze_input(
+                source_response_list=batch_responses,
+                analyzer_config=analyzer_config,
+                **kwargs,
+            )
+
     @staticmethod
     def batchify(
         payload_list: List[TextPayload],
@@ -78,5 +163,67 @@ class BaseAnalyzer(BaseSettings):
         for index in range(0, len(payload_list), batch_size):
             yield payload_list[index : index + batch_size]
 
+    def batchify_encodings(
+        self,
+        lengths: List[int],
+        batch_size: int,
+    ) -> Generator[List[int], None, None]:
+        """
+        Yields batches as indices of the encodings, callers use indices to put results
+        back in the input order irrespective of the batching strategy. `lengths` are
+        token counts of the encodings
+        """
+        if self.batching_strategy == "length":
+            yield from self.batchify_by_length(
+                lengths=lengths,
+                batch_size=batch_size,
+                max_batch_tokens=self.max_batch_tokens,
+            )
+        else:
+            for index in range(0, len(lengths), batch_size):
+                yield list(range(index, min(index + batch_size, len(lengths))))
+
+    @staticmethod
+    def batchify_by_length(
+        lengths: List[int],
+        batch_size: int,
+        max_batch_tokens: Optional[int] = None,
+    ) -> Generator[List[int], None, None]:
+        # Longest first, so memory issue (if any) surface with the first batch
+        sorted_indices = sorted(range(len(lengths)), key=lambda idx: -lengths[idx])
+
+        batch: List[int] = []
+        batch_max_length = 0
+        for idx in sorted_indices:
+            length = max(lengths[idx], 1)
+            padded_length = max(batch_max_length, length)
+            if batch and (
+                len(batch) >= batch_size
+                or (
+                    max_batch_tokens is not None
+                    and padded_length * (len(batch) + 1) > max_batch_tokens
+                )
+            ):
+                yield batch
+                batch = []
+                padded_length = length
+            batch.append(idx)
+            batch_max_length = padded_length
+
+        if batch:
+            yield batch
+
+    @staticmethod
+    def batchify_stream(
+        payload_stream: Iterable[TextPayload],
+        batch_size: int,
+    ) -> Generator[List[TextPayload], None, None]:
+        payload_iterator = iter(payload_stream)
+        while True:
+            batch = list(islice(payload_iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+
     class Config:
         arbitrary_types_allowed = True
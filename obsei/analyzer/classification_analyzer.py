@@ -1,13 +1,26 @@
+import json
 import logging
+import threading
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 
+import torch
 from pydantic import Field, PrivateAttr
 from transformers import Pipeline, pipeline
 
 from obsei.analyzer.base_analyzer import (
     BaseAnalyzer,
     BaseAnalyzerConfig,
-    MAX_LENGTH,
+)
+from obsei.analyzer.onnx_runtime import OnnxTextClassificationPipeline
+from obsei.analyzer.tokenization import (
+    aggregate_windows,
+    classification_probabilities,
+    max_token_length,
+    pad_encodings,
+    tokenize_texts,
+    top_labels,
+    window_document_indices,
 )
 from obsei.payload import TextPayload
 from obsei.postprocessor.inference_aggregator import InferenceAggregatorConfig
@@ -40,27 +53,108 @@ class TextClassificationAnalyzer(BaseAnalyzer):
     _pipeline: Pipeline = PrivateAttr()
     _max_length: int = PrivateAttr()
     model_name_or_path: str
+    # "pytorch": transformers pipeline
+    # "onnx": model exported to ONNX and run via ONNX Runtime on CPU, need `onnxruntime`
+    backend: str = "pytorch"
+    # Dynamic int8 quantization of ONNX model
+    quantize: bool = False
+    # Exported ONNX models are cached here, default is `~/.cache/obsei/onnx`
+    onnx_cache_dir: Optional[str] = None
+    # Long document mode, instead of truncation texts are split into overlapping windows
+    # of model's maximum length and window scores are aggregated per text (not used by zero-shot)
+    use_sliding_window: bool = False
+    # Number of overlapping tokens between consecutive windows
+    window_stride: int = 128
+    # "mean" or "max" of window label probabilities
+    window_aggregation: str = "mean"
 
     def __init__(self, **data: Any):
         super().__init__(**data)
-        self._pipeline = pipeline(
-            self.pipeline_name,
-            model=self.model_name_or_path,
-            device=self._device_id,
+        if self.backend == "onnx":
+            self._pipeline = self._load_model(
+                task=self.pipeline_name,
+                model_name_or_path=self.model_name_or_path,
+                loader=lambda: OnnxTextClassificationPipeline(
+                    model_name_or_path=self.model_name_or_path,
+                    cache_dir=self.onnx_cache_dir,
+                    quantize=self.quantize,
+                ),
+                backend=self.backend,
+                quantize=self.quantize,
+                onnx_cache_dir=self.onnx_cache_dir,
+            )
+        elif self.backend == "pytorch":
+            self._pipeline = self._load_model(
+                task=self.pipeline_name,
+                model_name_or_path=self.model_name_or_path,
+                loader=lambda: pipeline(
+                    self.pipeline_name,
+                    model=self.model_name_or_path,
+                    device=self._device_id,
+                ),
+            )
+        else:
+            raise ValueError(
+                f"Unsupported backend {self.backend}, use `pytorch` or `onnx`"
+            )
+
+        # Maximum number of tokens, longer texts are truncated
+        self._max_length = max_token_length(
+            self._pipeline.tokenizer, self._pipeline.model.config
         )
 
-        if hasattr(self._pipeline.model.config, "max_position_embeddings"):
-            self._max_length = self._pipeline.model.config.max_position_embeddings
-        else:
-            self._max_length = MAX_LENGTH
+    def _tokenize(self, texts: List[str]) -> List[Dict[str, Any]]:
+        if self.use_sliding_window:
+            return tokenize_texts(
+                self._pipeline.tokenizer,
+                texts,
+                self._max_length,
+                return_overflowing_tokens=True,
+                stride=self.window_stride,
+            )
+        return tokenize_texts(self._pipeline.tokenizer, texts, self._max_length)
+
+    def _logits_from_encodings(self, encodings: List[Dict[str, Any]]) -> torch.Tensor:
+        tokenizer = self._pipeline.tokenizer
+        logits = torch.zeros((len(encodings), self._pipeline.model.config.num_labels))
+        for batch_indices in self.batchify_encodings(
+            [len(encoding["input_ids"]) for encoding in encodings], self.batch_size
+        ):
+            model_inputs = pad_encodings(
+                [encodings[idx] for idx in batch_indices],
+                pad_token_id=tokenizer.pad_token_id,  # type: ignore[union-attr]
+                device=self._pipeline.device,
+                model_input_names=tokenizer.model_input_names,  # type: ignore[union-attr]
+            )
+            with torch.no_grad():
+                logits[batch_indices] = (
+                    self._pipeline.model(**model_inputs).logits.float().cpu()
+                )
+        return logits
 
     def prediction_from_model(
         self,
         texts: List[str],
         analyzer_config: Optional[ClassificationAnalyzerConfig] = None,
     ) -> List[Dict[str, Any]]:
-        prediction = self._pipeline(texts)
-        predictions = prediction if isinstance(prediction, list) else [prediction]
+        if len(texts) == 0:
+            return []
+
+        # Texts are tokenized once, encodings are reused for batching and inference
+        encodings = self._tokenize(texts)
+        model_config = self._pipeline.model.config
+        probabilities = classification_probabilities(
+            self._logits_from_encodings(encodings), model_config
+        )
+        if self.use_sliding_window:
+            probabilities = aggregate_windows(
+                probabilities,
+                document_indices=window_document_indices(encodings),
+                num_documents=len(texts),
+                reduction=self.window_aggregation,
+            )
+        predictions = top_labels(probabilities, model_config)
+
         label_map = analyzer_config.label_map if analyzer_config is not None else {}
         label_map = label_map or {}
         return [
@@ -69,6 +163,31 @@ class TextClassificationAnalyzer(BaseAnalyzer):
             } for prediction in predictions
         ]
 
+    def _cache_fingerprint(
+        self, analyzer_config: Optional[ClassificationAnalyzerConfig] = None
+    ) -> str:
+        return json.dumps(
+            {
+                "pipeline": self.pipeline_name,
+                "model": self.model_name_or_path,
+                # Quantized ONNX model predict different scores
+                "backend": self.backend,
+                "quantize": self.quantize if self.backend == "onnx" else False,
+                "sliding_window": [self.window_stride, self.window_aggregation]
+                if self.use_sliding_window
+                else None,
+                "labels": analyzer_config.labels if analyzer_config else None,
+                "label_map": analyzer_config.label_map if analyzer_config else None,
+                "multi_class_classification": analyzer_config.multi_class_classification
+                if analyzer_config
+                else None,
+                "add_positive_negative_labels": analyzer_config.add_positive_negative_labels
+                if analyzer_config
+                else None,
+            },
+            sort_keys=True,
+        )
+
     def analyze_input(  # type: ignore[override]
         self,
         source_response_list: List[TextPayload],
@@ -85,35 +204,39 @@ class TextClassificationAnalyzer(BaseAnalyzer):
             source_response_list = self.splitter.preprocess_input(
                 source_response_list,
                 config=analyzer_config.splitter_config,
+                # Used by token split unit, splits along with special tokens fit in
+                # `max_split_length` tokens (see `TextSplitterConfig.split_unit`)
+                tokenizer=self._pipeline.tokenizer,
             )
 
-        for batch_responses in self.batchify(source_response_list, self.batch_size):
-            texts = [
-                source_response.processed_text[: self._max_length]
-                for source_response in batch_responses
-            ]
+        texts = [
+            source_response.processed_text for source_response in source_response_list
+        ]
+        score_dicts = self._cached_inference(
+            texts=texts,
+            inference_fn=lambda uncached_texts: self.prediction_from_model(
+                uncached_texts, analyzer_config
+            ),
+            fingerprint=self._cache_fingerprint(analyzer_config),
+        )
 
-            batch_predictions = self.prediction_from_model(texts=texts, analyzer_config=analyzer_config)
+        for score_dict, source_response in zip(score_dicts, source_response_list):
+            segmented_data = {"classifier_data": score_dict}
 
-            for score_dict, source_response in zip(batch_predictions, batch_responses):
+            if source_response.segmented_data:
                 segmented_data = {
-                    "classifier_data": score_dict
+                    **segmented_data,
+                    **source_response.segmented_data,
                 }
 
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=source_response.processed_text,
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=source_response.processed_text,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
 
         if (
             analyzer_config is not None
@@ -129,7 +252,102 @@ class TextClassificationAnalyzer(BaseAnalyzer):
 
 
 class ZeroShotClassificationAnalyzer(TextClassificationAnalyzer):
+    """
+    Zero-shot classification via NLI model. Each text (premise) is paired with a
+    hypothesis per candidate label, hypothesis encodings are cached and all pairs of
+    the input are sorted by length and inferred in padded batches of
+    `batch_size * number of labels` pairs.
+    """
+
     pipeline_name: str = "zero-shot-classification"
+    hypothesis_template: str = "This example is {}."
+    # Encodings of most recently used hypotheses are cached, 0 disables caching
+    hypothesis_cache_size: int = 1024
+    _hypothesis_encodings: "OrderedDict[str, List[int]]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _hypothesis_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def candidate_labels(analyzer_config: ClassificationAnalyzerConfig) -> List[str]:
+        # Copy, to not mutate labels of the given config
+        labels = list(analyzer_config.labels or [])
+        if analyzer_config.add_positive_negative_labels:
+            if "positive" not in labels:
+                labels.append("positive")
+            if "negative" not in labels:
+                labels.append("negative")
+
+        if len(labels) == 0:
+            raise ValueError(
+                "`labels` can't be empty or `add_positive_negative_labels` should be False"
+            )
+        return labels
+
+    def _hypothesis_encoding(self, label: str) -> List[int]:
+        hypothesis = self.hypothesis_template.format(label)
+        with self._hypothesis_lock:
+            hypothesis_ids = self._hypothesis_encodings.get(hypothesis)
+            if hypothesis_ids is not None:
+                self._hypothesis_encodings.move_to_end(hypothesis)
+                return hypothesis_ids
+
+        hypothesis_ids = self._pipeline.tokenizer(  # type: ignore[misc]
+            hypothesis, add_special_tokens=False
+        )["input_ids"]
+        if self.hypothesis_cache_size > 0:
+            with self._hypothesis_lock:
+                self._hypothesis_encodings[hypothesis] = hypothesis_ids
+                if len(self._hypothesis_encodings) > self.hypothesis_cache_size:
+                    self._hypothesis_encodings.popitem(last=False)
+        return hypothesis_ids
+
+    def _pair_logits(
+        self, premise_encodings: List[List[int]], labels: List[str]
+    ) -> torch.Tensor:
+        tokenizer = self._pipeline.tokenizer
+        max_length = self._max_length
+        special_tokens_count = tokenizer.num_special_tokens_to_add(pair=True)  # type: ignore[union-attr]
+        use_token_type_ids = "token_type_ids" in tokenizer.model_input_names  # type: ignore[union-attr]
+
+        pairs: List[Dict[str, List[int]]] = []
+        for premise_ids in premise_encodings:
+            for label in labels:
+                hypothesis_ids = self._hypothesis_encoding(label)
+                # Same as "only_first" truncation strategy of the pipeline
+                premise_length = max(
+                    max_length - special_tokens_count - len(hypothesis_ids), 0
+                )
+                truncated_premise_ids = premise_ids[:premise_length]
+                pair = {
+                    "input_ids": tokenizer.build_inputs_with_special_tokens(  # type: ignore[union-attr]
+                        truncated_premise_ids, hypothesis_ids
+                    )
+                }
+                if use_token_type_ids:
+                    pair["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(  # type: ignore[union-attr]
+                        truncated_premise_ids, hypothesis_ids
+                    )
+                pairs.append(pair)
+
+        num_labels = self._pipeline.model.config.num_labels
+        logits = torch.zeros((len(pairs), num_labels))
+        for batch_indices in self.batchify_by_length(
+            lengths=[len(pair["input_ids"]) for pair in pairs],
+            batch_size=self.batch_size * len(labels),
+            max_batch_tokens=self.max_batch_tokens,
+        ):
+            model_inputs = pad_encodings(
+                [pairs[idx] for idx in batch_indices],
+                pad_token_id=tokenizer.pad_token_id,  # type: ignore[union-attr]
+                device=self._pipeline.device,
+                model_input_names=tokenizer.model_input_names,  # type: ignore[union-attr]
+            )
+            with torch.no_grad():
+                batch_logits = self._pipeline.model(**model_inputs).logits
+            logits[batch_indices] = batch_logits.float().cpu()
+
+        return logits.reshape(len(premise_encodings), len(labels), num_labels)
 
     def prediction_from_model(
         self,
@@ -139,22 +357,44 @@ class ZeroShotClassificationAnalyzer(TextClassificationAnalyzer):
         if analyzer_config is None:
             raise ValueError("analyzer_config can't be None")
 
-        labels = analyzer_config.labels or []
-        if analyzer_config.add_positive_negative_labels:
-            if "positive" not in labels:
-                labels.append("positive")
-            if "negative" not in labels:
-                labels.append("negative")
+        labels = self.candidate_labels(analyzer_config)
+        if len(texts) == 0:
+            return []
 
-        if len(labels) == 0:
-            raise ValueError("`labels` can't be empty or `add_positive_negative_labels` should be False")
+        premise_encodings = self._pipeline.tokenizer(  # type: ignore[misc]
+            texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self._max_length,
+        )["input_ids"]
+        logits = self._pair_logits(premise_encodings, labels)
 
-        prediction = self._pipeline(
-            texts, candidate_labels=labels, multi_label=analyzer_config.multi_class_classification
-        )
-        predictions = prediction if isinstance(prediction, list) else [prediction]
+        entailment_id = self._pipeline.entailment_id  # type: ignore[attr-defined]
+        if analyzer_config.multi_class_classification or len(labels) == 1:
+            # Softmax over the entailment vs. contradiction for each label independently
+            contradiction_id = -1 if entailment_id == 0 else 0
+            scores = logits[..., [contradiction_id, entailment_id]].softmax(dim=-1)[
+                ..., 1
+            ]
+        else:
+            # Softmax the entailment logits over all candidate labels
+            scores = logits[..., entailment_id].softmax(dim=-1)
 
-        return [dict(zip(prediction["labels"], prediction["scores"])) for prediction in predictions]
+        predictions: List[Dict[str, Any]] = []
+        for text_scores in scores.numpy():
+            # Highest score first, same ordering as zero-shot pipeline
+            ranked_indices = reversed(text_scores.argsort())
+            predictions.append(
+                {labels[idx]: float(text_scores[idx]) for idx in ranked_indices}
+            )
+        return predictions
+
+    def _cache_fingerprint(
+        self, analyzer_config: Optional[ClassificationAnalyzerConfig] = None
+    ) -> str:
+        return (
+            f"{super()._cache_fingerprint(analyzer_config)}|{self.hypothesis_template}"
+        )
 
     def analyze_input(  # type: ignore[override]
         self,
@@ -0,0 +1,163 @@
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(obj: Any) -> Any:
+    # Model outputs contain numpy scalars (ie float32 scores)
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+class BaseInferenceCache(BaseModel):
+    """
+    Cache of model predictions keyed by hash of the text and the model fingerprint
+    (model name and prediction related config), so repeated texts skip inference
+    """
+
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def build_key(text: str, fingerprint: str) -> str:
+        return hashlib.sha256(
+            f"{fingerprint}\x00{text}".encode("utf-8", errors="surrogatepass")
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._set(key, value)
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self._hits, "misses": self._misses, "size": self.size()}
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._hits = 0
+            self._misses = 0
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class InMemoryInferenceCache(BaseInferenceCache):
+    # Least recently used entries are evicted beyond this size
+    max_size: int = 10000
+    _entries: "OrderedDict[str, Any]" = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            value = self._entries[key]
+        # Callers are free to mutate returned prediction
+        return copy.deepcopy(value)
+
+    def _set(self, key: str, value: Any) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteInferenceCache(BaseInferenceCache):
+    """
+    On-disk cache persisted across runs, predictions are stored as JSON
+    """
+
+    database_path: str = "obsei_inference_cache.db"
+    table_name: str = "inference_cache"
+    _connection: sqlite3.Connection = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table_name} "
+                f"(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT value FROM {self.table_name} WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _set(self, key: str, value: Any) -> None:
+        serialized_value = json.dumps(value, default=_json_default)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {self.table_name} (key, value) VALUES (?, ?)",
+                (key, serialized_value),
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT COUNT(*) FROM {self.table_name}"
+            ).fetchone()
+        return int(row[0])
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {self.table_name}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
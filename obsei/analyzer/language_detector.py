@@ -0,0 +1,138 @@
+import re
+from abc import abstractmethod
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Unicode ranges of scripts mostly used by single language, (start, end, language)
+_SCRIPT_RANGES: List[Tuple[int, int, str]] = [
+    (0x0370, 0x03FF, "el"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0590, 0x05FF, "he"),
+    (0x0600, 0x06FF, "ar"),
+    (0x0900, 0x097F, "hi"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0A00, 0x0A7F, "pa"),
+    (0x0A80, 0x0AFF, "gu"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0C00, 0x0C7F, "te"),
+    (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x3040, 0x30FF, "ja"),
+    (0x4E00, 0x9FFF, "zh"),
+    (0xAC00, 0xD7AF, "ko"),
+]
+
+# Most frequent function words of Latin script languages
+_LATIN_STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset(
+        "the and is are was were to of in it that this for with you not have has "
+        "be on but they my very i me we at so what from".split()
+    ),
+    "de": frozenset(
+        "der die das und ist nicht ich ein eine zu mit sich auf den dem es sie "
+        "auch wir aber sehr war sind für von".split()
+    ),
+    "fr": frozenset(
+        "le la les et est un une des du pas je de que qui il elle en ce pour "
+        "avec sur très mais nous vous sont".split()
+    ),
+    "es": frozenset(
+        "el la los las y es un una que de no en por con para muy pero lo se "
+        "del al mi su como está son".split()
+    ),
+    "it": frozenset(
+        "il lo la gli le e è un una che di non per con sono molto ma mi si del "
+        "della come questo anche ho".split()
+    ),
+    "pt": frozenset(
+        "o a os as e é um uma que de não em para com muito mas se do da eu "
+        "meu como está são isso".split()
+    ),
+    "nl": frozenset(
+        "de het een en is niet ik van dat die te met voor op zijn maar ook "
+        "heel was wij dit je".split()
+    ),
+}
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+class BaseLanguageDetector(BaseModel):
+    """
+    Detect language of the texts, returns ISO 639-1 code per text or `None`
+    when language can not be determined
+    """
+
+    @abstractmethod
+    def detect(self, texts: List[str]) -> List[Optional[str]]:
+        pass
+
+
+class ScriptStopwordLanguageDetector(BaseLanguageDetector):
+    """
+    Lightweight detector without model. Non Latin texts are identified by their
+    Unicode script and Latin texts by the frequent function words of the language.
+    Texts without enough evidence (ie very short or code mixed) are undetermined.
+    Function words are shared by several languages (ie "a", "de", "in", "die"),
+    hence single hit is not considered enough evidence.
+    """
+
+    # Minimum fraction of alphabetic characters belonging to the detected script
+    min_script_ratio: float = 0.5
+    # Minimum number of function words, needed to detect Latin script language
+    min_stopword_hits: int = 2
+    # Minimum fraction of words being function words of the detected language
+    min_stopword_ratio: float = 0.2
+
+    def _latin_language(self, words: List[str]) -> Optional[str]:
+        scores: Counter = Counter()
+        for word in words:
+            for language, stopwords in _LATIN_STOPWORDS.items():
+                if word in stopwords:
+                    scores[language] += 1
+        if not scores:
+            return None
+        (language, hits), *others = scores.most_common(2)
+        if (
+            hits < self.min_stopword_hits
+            or hits / len(words) < self.min_stopword_ratio
+            or (others and others[0][1] == hits)
+        ):
+            return None
+        return language
+
+    def detect_language(self, text: str) -> Optional[str]:
+        script_counts: Counter = Counter()
+        letter_count = 0
+        for char in text:
+            if not char.isalpha():
+                continue
+            letter_count += 1
+            code_point = ord(char)
+            if code_point < 0x0250:
+                script_counts["latin"] += 1
+                continue
+            for start, end, language in _SCRIPT_RANGES:
+                if start <= code_point <= end:
+                    script_counts[language] += 1
+                    break
+
+        if letter_count == 0 or not script_counts:
+            return None
+
+        # Japanese text mix kana with Chinese characters
+        if script_counts["ja"] > 0 and script_counts["zh"] > 0:
+            script_counts["ja"] += script_counts.pop("zh")
+
+        script, count = script_counts.most_common(1)[0]
+        if count / letter_count < self.min_script_ratio:
+            return None
+        if script != "latin":
+            return script
+        return self._latin_language(_WORD_PATTERN.findall(text.lower()))
+
+    def detect(self, texts: List[str]) -> List[Optional[str]]:
+        return [self.detect_language(text) for text in texts]
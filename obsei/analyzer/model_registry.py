@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, str, int, str]
+
+
+class ModelRegistryEntry(BaseModel):
+    model: Any
+    ref_count: int = 0
+    memory_in_bytes: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class ModelRegistry(BaseModel):
+    """
+    Process wide registry of loaded models (ie transformers pipelines) keyed by
+    model, task and device, so analyzers using the same model share its weights.
+    Models are reference counted, unreferenced model is freed immediately unless
+    `max_memory_in_bytes` is set. In that case unreferenced models are kept in
+    memory and least recently used of them are evicted when total memory exceeds the cap.
+    """
+
+    max_memory_in_bytes: Optional[int] = None
+    _entries: "OrderedDict[ModelKey, ModelRegistryEntry]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    # Models being loaded, concurrent callers of the same key wait on it
+    _loading: Dict[ModelKey, "Future[None]"] = PrivateAttr(default_factory=dict)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    @staticmethod
+    def build_key(
+        task: str, model_name_or_path: str, device_id: int, **options: Any
+    ) -> ModelKey:
+        return (
+            task,
+            model_name_or_path,
+            device_id,
+            json.dumps(options, sort_keys=True, default=str),
+        )
+
+    def acquire(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    logger.info(f"Reusing already loaded model {key}")
+                    entry.ref_count += 1
+                    self._entries.move_to_end(key)
+                    self._evict()
+                    return entry.model
+                loading = self._loading.get(key)
+                is_loader = loading is None
+                if loading is None:
+                    loading = Future()
+                    self._loading[key] = loading
+            if is_loader:
+                break
+            # Same model is being loaded by other caller, wait for it and look up again
+            loading.result()
+
+        # Model is loaded outside of the registry lock, so lookups and loads of
+        # other models are not blocked
+        try:
+            logger.info(f"Loading model {key}")
+            model = loader()
+            memory_in_bytes = self._estimate_memory(model)
+        except BaseException as ex:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(ex)
+            raise
+
+        with self._lock:
+            self._entries[key] = ModelRegistryEntry(
+                model=model, ref_count=1, memory_in_bytes=memory_in_bytes
+            )
+            del self._loading[key]
+            self._evict()
+        loading.set_result(None)
+        return model
+
+    def release(self, key: ModelKey) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.ref_count = max(entry.ref_count - 1, 0)
+            if entry.ref_count == 0 and self.max_memory_in_bytes is None:
+                logger.info(f"Unloading model {key}")
+                del self._entries[key]
+            else:
+                self._evict()
+
+    def total_memory_in_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.memory_in_bytes for entry in self._entries.values())
+
+    def get_stats(self) -> Dict[ModelKey, Dict[str, int]]:
+        with self._lock:
+            return {
+                key: {
+                    "ref_count": entry.ref_count,
+                    "memory_in_bytes": entry.memory_in_bytes,
+                }
+                for key, entry in self._entries.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        if self.max_memory_in_bytes is None:
+            return
+        total_memory = sum(entry.memory_in_bytes for entry in self._entries.values())
+        # OrderedDict keeps least recently used entries first
+        for key in list(self._entries.keys()):
+            if total_memory <= self.max_memory_in_bytes:
+                break
+            entry = self._entries[key]
+            if entry.ref_count > 0:
+                continue
+            logger.info(f"Evicting model {key}")
+            total_memory -= entry.memory_in_bytes
+            del self._entries[key]
+
+    @staticmethod
+    def _estimate_memory(model: Any) -> int:
+        # Transformers pipeline holds actual torch model in `model` attribute
+        torch_model = getattr(model, "model", model)
+        memory_in_bytes = 0
+        for tensors in ("parameters", "buffers"):
+            if not hasattr(torch_model, tensors):
+                continue
+            try:
+                memory_in_bytes += sum(
+                    tensor.numel() * tensor.element_size()
+                    for tensor in getattr(torch_model, tensors)()
+                )
+            except Exception as ex:
+                logger.warning(f"Unable to estimate model memory: {ex}")
+        return memory_in_bytes
+
+
+model_registry = ModelRegistry()
@@ -1,5 +1,9 @@
+import json
 import logging
-from typing import Any, Dict, Generator, List, Optional, Tuple, Iterator
+import weakref
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Iterator
+import numpy as np
+import torch
 from pydantic import PrivateAttr
 from transformers import (
     AutoModelForTokenClassification,
@@ -7,14 +11,22 @@ from transformers import (
     Pipeline,
     pipeline,
 )
+from transformers.pipelines import AggregationStrategy
 import spacy
 from spacy.language import Language
 from spacy.tokens.doc import Doc
 from obsei.analyzer.base_analyzer import (
     BaseAnalyzer,
     BaseAnalyzerConfig,
-    MAX_LENGTH,
 )
+from obsei.analyzer.tokenization import (
+    max_token_length,
+    merge_token_windows,
+    pad_encodings,
+    tokenize_texts,
+    window_document_indices,
+)
+from obsei.misc.process_util import PersistentProcessPool
 from obsei.payload import TextPayload
 
 logger = logging.getLogger(__name__)
@@ -27,17 +39,36 @@ class TransformersNERAnalyzer(BaseAnalyzer):
     model_name_or_path: str
     tokenizer_name: Optional[str] = None
     grouped_entities: Optional[bool] = True
+    # Long document mode, instead of truncation texts are split into overlapping windows
+    # of model's maximum length, token scores of overlapping windows are averaged
+    use_sliding_window: bool = False
+    # Number of overlapping tokens between consecutive windows
+    window_stride: int = 128
 
     def __init__(self, **data: Any):
         super().__init__(**data)
 
+        self._pipeline = self._load_model(
+            task="ner",
+            model_name_or_path=self.model_name_or_path,
+            loader=self._create_pipeline,
+            tokenizer_name=self.tokenizer_name,
+            grouped_entities=self.grouped_entities,
+        )
+
+        # Maximum number of tokens, longer texts are truncated
+        self._max_length = max_token_length(
+            self._pipeline.tokenizer, self._pipeline.model.config
+        )
+
+    def _create_pipeline(self) -> Pipeline:
         model = AutoModelForTokenClassification.from_pretrained(self.model_name_or_path)
         tokenizer = AutoTokenizer.from_pretrained(
             self.tokenizer_name if self.tokenizer_name else self.model_name_or_path,
             use_fast=True,
         )
 
-        self._pipeline = pipeline(
+        return pipeline(
             "ner",
             model=model,
             tokenizer=tokenizer,
@@ -45,18 +76,102 @@ class TransformersNERAnalyzer(BaseAnalyzer):
             device=self._device_id,
         )
 
-        if hasattr(self._pipeline.model.config, "max_position_embeddings"):
-            self._max_length = self._pipeline.model.config.max_position_embeddings
-        else:
-            self._max_length = MAX_LENGTH
+    def _tokenize(self, texts: List[str]) -> List[Dict[str, Any]]:
+        window_kwargs: Dict[str, Any] = (
+            {"return_overflowing_tokens": True, "stride": self.window_stride}
+            if self.use_sliding_window
+            else {}
+        )
+        return tokenize_texts(
+            self._pipeline.tokenizer,
+            texts,
+            self._max_length,
+            return_special_tokens_mask=True,
+            return_offsets_mapping=self._pipeline.tokenizer.is_fast,  # type: ignore[union-attr]
+            **window_kwargs,
+        )
+
+    def _token_scores(self, encodings: List[Dict[str, Any]]) -> List[np.ndarray]:
+        tokenizer = self._pipeline.tokenizer
+        token_scores: List[np.ndarray] = [np.empty(0)] * len(encodings)
+        for batch_indices in self.batchify_encodings(
+            [len(encoding["input_ids"]) for encoding in encodings], self.batch_size
+        ):
+            model_inputs = pad_encodings(
+                [encodings[idx] for idx in batch_indices],
+                pad_token_id=tokenizer.pad_token_id,  # type: ignore[union-attr]
+                device=self._pipeline.device,
+                model_input_names=tokenizer.model_input_names,  # type: ignore[union-attr]
+            )
+            with torch.no_grad():
+                logits = self._pipeline.model(**model_inputs).logits
+            batch_scores = logits.float().softmax(dim=-1).cpu().numpy()
+            for scores, idx in zip(batch_scores, batch_indices):
+                token_scores[idx] = scores[: len(encodings[idx]["input_ids"])]
+        return token_scores
 
     def _prediction_from_model(self, texts: List[str]) -> List[List[Dict[str, float]]]:
-        prediction = self._pipeline(texts)
-        return (   # type: ignore[no-any-return]
-            prediction
-            if len(prediction) and isinstance(prediction[0], list)
-            else [prediction]
+        if len(texts) == 0:
+            return []
+
+        # Texts are tokenized once, encodings are reused for batching and inference
+        encodings = self._tokenize(texts)
+        token_scores = self._token_scores(encodings)
+
+        document_windows: List[List[int]] = [[] for _ in texts]
+        for window_idx, document_idx in enumerate(window_document_indices(encodings)):
+            document_windows[document_idx].append(window_idx)
+
+        aggregation_strategy = (
+            AggregationStrategy.SIMPLE
+            if self.grouped_entities
+            else AggregationStrategy.NONE
         )
+        predictions: List[List[Dict[str, float]]] = []
+        for text, windows in zip(texts, document_windows):
+            input_ids = [np.array(encodings[idx]["input_ids"]) for idx in windows]
+            special_tokens_mask = [
+                np.array(encodings[idx]["special_tokens_mask"]) for idx in windows
+            ]
+            scores = [token_scores[idx] for idx in windows]
+            offset_mapping = (
+                [np.array(encodings[idx]["offset_mapping"]) for idx in windows]
+                if "offset_mapping" in encodings[windows[0]]
+                else None
+            )
+            if len(windows) > 1 and offset_mapping is not None:
+                (
+                    merged_ids,
+                    merged_scores,
+                    merged_offsets,
+                    merged_mask,
+                ) = merge_token_windows(
+                    input_ids, scores, offset_mapping, special_tokens_mask
+                )
+                input_ids, scores = [merged_ids], [merged_scores]
+                offset_mapping, special_tokens_mask = [merged_offsets], [merged_mask]
+
+            # Same post processing as token classification pipeline
+            pre_entities = self._pipeline.gather_pre_entities(  # type: ignore[attr-defined]
+                text,
+                input_ids[0],
+                scores[0],
+                None if offset_mapping is None else offset_mapping[0],
+                special_tokens_mask[0],
+                aggregation_strategy,
+            )
+            entities = self._pipeline.aggregate(  # type: ignore[attr-defined]
+                pre_entities, aggregation_strategy
+            )
+            predictions.append(
+                [
+                    entity
+                    for entity in entities
+                    if entity.get("entity", None) != "O"
+                    and entity.get("entity_group", None) != "O"
+                ]
+            )
+        return predictions
 
     def analyze_input(
         self,
@@ -66,62 +181,131 @@ class TransformersNERAnalyzer(BaseAnalyzer):
     ) -> List[TextPayload]:
         analyzer_output: List[TextPayload] = []
 
-        for batch_responses in self.batchify(source_response_list, self.batch_size):
-            texts = [
-                source_response.processed_text[: self._max_length]
-                for source_response in batch_responses
-            ]
-            batch_predictions = self._prediction_from_model(texts)
-
-            for prediction, source_response in zip(batch_predictions, batch_responses):
-                segmented_data = {"ner_data": prediction}
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=source_response.processed_text,
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+        texts = [
+            source_response.processed_text for source_response in source_response_list
+        ]
+        predictions = self._cached_inference(
+            texts=texts,
+            inference_fn=self._prediction_from_model,
+            fingerprint=json.dumps(
+                {
+                    "model": self.model_name_or_path,
+                    "tokenizer": self.tokenizer_name,
+                    "grouped_entities": self.grouped_entities,
+                    "window_stride": self.window_stride
+                    if self.use_sliding_window
+                    else None,
+                },
+                sort_keys=True,
+            ),
+        )
+
+        for prediction, source_response in zip(predictions, source_response_list):
+            segmented_data = {"ner_data": prediction}
+            if source_response.segmented_data:
+                segmented_data = {
+                    **segmented_data,
+                    **source_response.segmented_data,
+                }
+
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=source_response.processed_text,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
         return analyzer_output
 
 
+_SPACY_DISABLED_COMPONENTS: List[str] = [
+    "tagger",
+    "parser",
+    "attribute_ruler",
+    "lemmatizer",
+]
+
+_worker_nlp: Optional[Language] = None
+_worker_batch_size: int = 1000
+
+
+def _spacy_entities(doc: Doc) -> List[Dict[str, Any]]:
+    return [
+        {
+            "entity_group": ent.label_,
+            "word": ent.text,
+            "start": ent.start_char,
+            "end": ent.end_char,
+        }
+        for ent in doc.ents
+    ]
+
+
+def _init_spacy_worker(model_name_or_path: str, batch_size: int) -> None:
+    global _worker_nlp, _worker_batch_size
+    _worker_nlp = spacy.load(model_name_or_path, disable=_SPACY_DISABLED_COMPONENTS)
+    _worker_batch_size = batch_size
+
+
+def _spacy_worker_entities(texts: Sequence[str]) -> List[List[Dict[str, Any]]]:
+    if _worker_nlp is None:
+        raise RuntimeError("spaCy worker is not initialized")
+    return [
+        _spacy_entities(doc)
+        for doc in _worker_nlp.pipe(texts, batch_size=_worker_batch_size)
+    ]
+
+
 class SpacyNERAnalyzer(BaseAnalyzer):
     _nlp: Language = PrivateAttr()
+    _process_pool: Optional[PersistentProcessPool] = PrivateAttr(default=None)
     TYPE: str = "NER"
     model_name_or_path: str
     tokenizer_name: Optional[str] = None
     grouped_entities: Optional[bool] = True
+    # Number of worker processes, each worker load the model once on first use
+    # and is kept alive across `analyze_input` calls
     n_process: int = 1
 
     def __init__(self, **data: Any):
         super().__init__(**data)
         self._nlp = spacy.load(
             self.model_name_or_path,
-            disable=["tagger", "parser", "attribute_ruler", "lemmatizer"],
+            disable=_SPACY_DISABLED_COMPONENTS,
         )
+        if self.n_process > 1:
+            self._process_pool = PersistentProcessPool(
+                n_process=self.n_process,
+                initializer=_init_spacy_worker,
+                initargs=(self.model_name_or_path, self.batch_size),
+            )
+            weakref.finalize(self, self._process_pool.shutdown)
 
-    def _spacy_pipe_batchify(
-        self,
-        texts: List[str],
-        batch_size: int,
-        source_response_list: List[TextPayload],
-    ) -> Generator[Tuple[Iterator[Doc], List[TextPayload]], None, None]:
-        for index in range(0, len(texts), batch_size):
-            yield (
-                self._nlp.pipe(
-                    texts=texts[index: index + batch_size],
-                    batch_size=batch_size,
-                    n_process=self.n_process,
-                ),
-                source_response_list[index: index + batch_size],
+    def _spacy_pipe(
+        self, source_response_list: List[TextPayload]
+    ) -> Iterator[Tuple[List[Dict[str, Any]], TextPayload]]:
+        if self._process_pool is not None and len(source_response_list) > 1:
+            entities_list = self._process_pool.map_chunks(
+                _spacy_worker_entities,
+                [
+                    source_response.processed_text
+                    for source_response in source_response_list
+                ],
             )
+            yield from zip(entities_list, source_response_list)
+            return
+
+        # Single stream over all texts, payloads travel along with their docs
+        for doc, source_response in self._nlp.pipe(
+            (
+                (source_response.processed_text, source_response)
+                for source_response in source_response_list
+            ),
+            as_tuples=True,
+            batch_size=self.batch_size,
+        ):
+            yield _spacy_entities(doc), source_response
 
     def analyze_input(
         self,
@@ -130,36 +314,21 @@ class SpacyNERAnalyzer(BaseAnalyzer):
         **kwargs: Any,
     ) -> List[TextPayload]:
         analyzer_output: List[TextPayload] = []
-        texts = [
-            source_response.processed_text for source_response in source_response_list
-        ]
 
-        for batch_docs, batch_source_response in self._spacy_pipe_batchify(
-            texts, self.batch_size, source_response_list
-        ):
-            for doc, source_response in zip(batch_docs, batch_source_response):
-                ner_prediction = [
-                    {
-                        "entity_group": ent.label_,
-                        "word": ent.text,
-                        "start": ent.start_char,
-                        "end": ent.end_char,
-                    }
-                    for ent in doc.ents
-                ]
-                segmented_data = {"ner_data": ner_prediction}
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=source_response.processed_text,
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+        for ner_prediction, source_response in self._spacy_pipe(source_response_list):
+            segmented_data = {"ner_data": ner_prediction}
+            if source_response.segmented_data:
+                segmented_data = {
+                    **segmented_data,
+                    **source_response.segmented_data,
+                }
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=source_response.processed_text,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
 
         return analyzer_output
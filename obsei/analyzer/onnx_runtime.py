@@ -0,0 +1,219 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+    PretrainedConfig,
+    PreTrainedTokenizerBase,
+)
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_CACHE_DIR: str = os.path.join(
+    os.path.expanduser("~"), ".cache", "obsei", "onnx"
+)
+ONNX_OPSET_VERSION: int = 14
+
+
+def _model_revision(model_name_or_path: str, config: PretrainedConfig) -> str:
+    # Commit hash of hub model, local model directory is identified by its files
+    commit_hash = getattr(config, "_commit_hash", None)
+    if commit_hash:
+        return str(commit_hash)
+    local_path = Path(model_name_or_path)
+    files = sorted(local_path.iterdir()) if local_path.is_dir() else [local_path]
+    return hashlib.sha1(
+        json.dumps(
+            [
+                [file.name, file.stat().st_size, file.stat().st_mtime_ns]
+                for file in files
+                if file.is_file()
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def onnx_model_dir(
+    model_name_or_path: str,
+    config: PretrainedConfig,
+    cache_dir: Optional[str] = None,
+    opset_version: int = ONNX_OPSET_VERSION,
+) -> Path:
+    """
+    Cache directory of exported model, keyed by model name, revision and ONNX opset so
+    updated model is exported again. Quantized model is stored next to exported one.
+    """
+    export_key = hashlib.sha1(
+        json.dumps(
+            {
+                "revision": _model_revision(model_name_or_path, config),
+                "opset": opset_version,
+            },
+            sort_keys=True,
+        ).encode("utf-8")
+    ).hexdigest()[:16]
+    model_name = re.sub(r"[^\w.-]", "_", model_name_or_path.strip("/"))
+    return Path(cache_dir or DEFAULT_ONNX_CACHE_DIR) / model_name / export_key
+
+
+def _temp_model_path(model_path: Path) -> str:
+    # Unique per process and in the same directory, so `os.replace` is atomic
+    return str(model_path.with_name(f"{model_path.stem}.{os.getpid()}.tmp.onnx"))
+
+
+class OnnxSequenceClassificationModel:
+    """
+    Sequence classification model exported to ONNX and run via ONNX Runtime on CPU.
+    Called same as transformers model and return `SequenceClassifierOutput`
+    """
+
+    def __init__(self, model_path: str, config: PretrainedConfig):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(
+                "ONNX backend need onnxruntime, install it via `pip install obsei[onnx]`"
+            )
+
+        self.model_path = model_path
+        self.config = config
+        self.device = torch.device("cpu")
+        self._session = onnxruntime.InferenceSession(
+            model_path, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [
+            model_input.name for model_input in self._session.get_inputs()
+        ]
+
+    @classmethod
+    def from_pretrained(
+        cls,
+        model_name_or_path: str,
+        tokenizer: PreTrainedTokenizerBase,
+        cache_dir: Optional[str] = None,
+        quantize: bool = False,
+    ) -> "OnnxSequenceClassificationModel":
+        """
+        Load exported model from `cache_dir`, export (and quantize) it first if it is not cached
+        """
+        config = AutoConfig.from_pretrained(model_name_or_path)
+        model_dir = onnx_model_dir(model_name_or_path, config, cache_dir)
+        model_path = model_dir / "model.onnx"
+        quantized_model_path = model_dir / "model.quant.onnx"
+
+        if not model_path.exists():
+            model = AutoModelForSequenceClassification.from_pretrained(
+                model_name_or_path
+            )
+            model_dir.mkdir(parents=True, exist_ok=True)
+            cls.export(model, tokenizer, str(model_path))
+
+        if not quantize:
+            return cls(str(model_path), config)
+
+        if not quantized_model_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Quantizing {model_path}")
+            # Temporary file, so interrupted quantization is not picked from the cache
+            temp_model_path = _temp_model_path(quantized_model_path)
+            try:
+                quantize_dynamic(
+                    str(model_path), temp_model_path, weight_type=QuantType.QInt8
+                )
+                os.replace(temp_model_path, quantized_model_path)
+            finally:
+                if os.path.exists(temp_model_path):
+                    os.remove(temp_model_path)
+        return cls(str(quantized_model_path), config)
+
+    @classmethod
+    def export(
+        cls, model: Any, tokenizer: PreTrainedTokenizerBase, model_path: str
+    ) -> None:
+        logger.info(f"Exporting model to {model_path}")
+        model.eval()
+        # Exported inputs are positional, hence follow the model forward signature order
+        input_names = [
+            name
+            for name in inspect.signature(model.forward).parameters
+            if name in tokenizer.model_input_names
+        ]
+        dummy_inputs = tokenizer(["Obsei exports the model"], return_tensors="pt")
+        export_kwargs: Dict[str, Any] = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            export_kwargs["dynamo"] = False
+
+        # Temporary file, so interrupted export is not picked from the cache
+        temp_model_path = _temp_model_path(Path(model_path))
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy_inputs[name] for name in input_names),
+                temp_model_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                    "logits": {0: "batch"},
+                },
+                opset_version=ONNX_OPSET_VERSION,
+                **export_kwargs,
+            )
+        os.replace(temp_model_path, model_path)
+
+    def __call__(self, **model_inputs: Any) -> SequenceClassifierOutput:
+        return SequenceClassifierOutput(
+            logits=self.logits(**model_inputs)  # type: ignore[arg-type]
+        )
+
+    def logits(self, **model_inputs: Any) -> torch.Tensor:
+        onnx_inputs = {
+            name: np.asarray(
+                tensor.cpu().numpy() if isinstance(tensor, torch.Tensor) else tensor,
+                dtype=np.int64,
+            )
+            for name, tensor in model_inputs.items()
+            if name in self.input_names
+        }
+        return torch.from_numpy(self._session.run(["logits"], onnx_inputs)[0])
+
+
+class OnnxTextClassificationPipeline:
+    """
+    Holds tokenizer and ONNX model the same way as transformers text classification
+    pipeline, analyzer tokenize and score texts itself
+    """
+
+    def __init__(
+        self,
+        model_name_or_path: str,
+        cache_dir: Optional[str] = None,
+        quantize: bool = False,
+    ):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+        self.model = OnnxSequenceClassificationModel.from_pretrained(
+            model_name_or_path=model_name_or_path,
+            tokenizer=self.tokenizer,
+            cache_dir=cache_dir,
+            quantize=quantize,
+        )
+        self.device = self.model.device
+
+    @property
+    def entailment_id(self) -> int:
+        for label, ind in (self.model.config.label2id or {}).items():
+            if label.lower().startswith("entail"):
+                return int(ind)
+        return -1
@@ -1,7 +1,8 @@
+import inspect
 import logging
 from typing import Any, Dict, List, Optional
 
-from presidio_analyzer import AnalyzerEngine, EntityRecognizer
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, EntityRecognizer
 from presidio_anonymizer import AnonymizerEngine
 from presidio_analyzer.nlp_engine import NlpEngineProvider
 from presidio_anonymizer.entities.engine import OperatorConfig
@@ -55,8 +56,12 @@ class PresidioPIIAnalyzerConfig(BaseAnalyzerConfig):
 
 class PresidioPIIAnalyzer(BaseAnalyzer):
     _analyzer: AnalyzerEngine = PrivateAttr()
+    _batch_analyzer: BatchAnalyzerEngine = PrivateAttr()
+    _supports_pipe_args: bool = PrivateAttr()
     _anonymizer: AnonymizerEngine = PrivateAttr()
     TYPE: str = "PresidioPII"
+    # Number of processes used by NLP engine (ie spaCy `nlp.pipe`) to analyze batch
+    n_process: int = 1
     engine_config: Optional[PresidioEngineConfig] = None
     # To see list of supported entities refer https://microsoft.github.io/presidio/supported_entities/
     # To add customer recognizers refer https://microsoft.github.io/presidio/analyzer/adding_recognizers/
@@ -109,6 +114,13 @@ class PresidioPIIAnalyzer(BaseAnalyzer):
             nlp_engine=nlp_engine, supported_languages=languages
         )
 
+        self._batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self._analyzer)
+        # Older presidio releases (eg 2.2.351) forward unknown kwargs of
+        # `analyze_iterator` to `AnalyzerEngine.analyze`, which rejects them
+        self._supports_pipe_args = {"batch_size", "n_process"}.issubset(
+            inspect.signature(self._batch_analyzer.analyze_iterator).parameters
+        )
+
         # self._analyzer.registry.load_predefined_recognizers()
         if self.entity_recognizers:
             for entity_recognizer in self.entity_recognizers:
@@ -129,63 +141,68 @@ class PresidioPIIAnalyzer(BaseAnalyzer):
 
         analyzer_output: List[TextPayload] = []
 
-        for batch_responses in self.batchify(source_response_list, self.batch_size):
-            for source_response in batch_responses:
-                analyzer_result = self._analyzer.analyze(
-                    text=source_response.processed_text,
-                    entities=analyzer_config.entities,
-                    return_decision_process=analyzer_config.return_decision_process,
-                    language=language,
-                )
-
-                anonymized_result = None
-                if not analyzer_config.analyze_only:
-                    anonymizers_config = (
-                        analyzer_config.anonymizers_config or self.anonymizers_config
-                    )
-
-                    if (
-                        source_response.processed_text is not None
-                        and len(source_response.processed_text) > 0
-                    ):
-                        anonymized_result = self._anonymizer.anonymize(
-                            text=source_response.processed_text,
-                            operators=anonymizers_config,
-                            analyzer_results=analyzer_result,
-                        )
+        # NLP engine process whole input via `nlp.pipe` in batches (and processes)
+        pipe_args: Dict[str, Any] = {}
+        if self._supports_pipe_args:
+            pipe_args = {"batch_size": self.batch_size, "n_process": self.n_process}
+        analyzer_results = self._batch_analyzer.analyze_iterator(
+            texts=[
+                source_response.processed_text
+                for source_response in source_response_list
+            ],
+            language=language or "en",
+            entities=analyzer_config.entities,
+            return_decision_process=analyzer_config.return_decision_process,
+            **pipe_args,
+        )
 
+        anonymizers_config = (
+            analyzer_config.anonymizers_config or self.anonymizers_config
+        )
+        for analyzer_result, source_response in zip(
+            analyzer_results, source_response_list
+        ):
+            anonymized_result = None
+            if not analyzer_config.analyze_only:
                 if (
-                    analyzer_config.replace_original_text
-                    and anonymized_result is not None
+                    source_response.processed_text is not None
+                    and len(source_response.processed_text) > 0
                 ):
-                    text = anonymized_result.text
-                else:
-                    text = source_response.processed_text
+                    anonymized_result = self._anonymizer.anonymize(
+                        text=source_response.processed_text,
+                        operators=anonymizers_config,
+                        analyzer_results=analyzer_result,
+                    )
 
+            if analyzer_config.replace_original_text and anonymized_result is not None:
+                text = anonymized_result.text
+            else:
+                text = source_response.processed_text
+
+            segmented_data = {
+                "pii_data": {
+                    "analyzer_result": [vars(result) for result in analyzer_result],
+                    "anonymized_result": None
+                    if not anonymized_result
+                    else [vars(item) for item in anonymized_result.items],
+                    "anonymized_text": None
+                    if not anonymized_result
+                    else anonymized_result.text,
+                }
+            }
+            if source_response.segmented_data:
                 segmented_data = {
-                    "pii_data": {
-                        "analyzer_result": [vars(result) for result in analyzer_result],
-                        "anonymized_result": None
-                        if not anonymized_result
-                        else [vars(item) for item in anonymized_result.items],
-                        "anonymized_text": None
-                        if not anonymized_result
-                        else anonymized_result.text,
-                    }
+                    **segmented_data,
+                    **source_response.segmented_data,
                 }
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=text,
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=text,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
 
         return analyzer_output
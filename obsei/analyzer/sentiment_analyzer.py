@@ -1,5 +1,7 @@
 import logging
-from typing import Any, List, Optional
+import string
+import weakref
+from typing import Any, List, Optional, Sequence
 
 from pydantic import PrivateAttr
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
@@ -8,6 +10,7 @@ from obsei.analyzer.base_analyzer import (
     BaseAnalyzer,
     BaseAnalyzerConfig,
 )
+from obsei.misc.process_util import PersistentProcessPool
 from obsei.payload import TextPayload
 from obsei.analyzer.classification_analyzer import (
     ClassificationAnalyzerConfig,
@@ -17,17 +20,84 @@ from obsei.analyzer.classification_analyzer import (
 logger = logging.getLogger(__name__)
 
 
+class VaderScorer:
+    """
+    Vader compound scorer with precomputed lexicon and emoji lookups. Text without
+    any lexicon word or emoji always has 0.0 compound score, such text skip the
+    full Vader scoring.
+    """
+
+    def __init__(self, use_fast_path: bool = True):
+        self.model = SentimentIntensityAnalyzer()
+        self.use_fast_path = use_fast_path
+        self._lexicon_words = frozenset(self.model.lexicon)
+        # Vader replaces emojis character by character
+        self._emoji_chars = frozenset(
+            emoji for emoji in self.model.emojis if len(emoji) == 1
+        )
+
+    def _has_lexicon_word(self, text: str) -> bool:
+        for token in text.split():
+            token = token.lower()
+            if (
+                token in self._lexicon_words
+                or token.strip(string.punctuation) in self._lexicon_words
+            ):
+                return True
+        return False
+
+    def compound_score(self, text: str) -> float:
+        if (
+            self.use_fast_path
+            and self._emoji_chars.isdisjoint(text)
+            and not self._has_lexicon_word(text)
+        ):
+            return 0.0
+        return float(self.model.polarity_scores(text)["compound"])
+
+
+_worker_scorer: Optional[VaderScorer] = None
+
+
+def _init_vader_worker(use_fast_path: bool) -> None:
+    global _worker_scorer
+    _worker_scorer = VaderScorer(use_fast_path=use_fast_path)
+
+
+def _vader_compound_scores(texts: Sequence[str]) -> List[float]:
+    scorer = _worker_scorer or VaderScorer()
+    return [scorer.compound_score(text) for text in texts]
+
+
 class VaderSentimentAnalyzer(BaseAnalyzer):
     _model: SentimentIntensityAnalyzer = PrivateAttr()
+    _scorer: VaderScorer = PrivateAttr()
+    _process_pool: Optional[PersistentProcessPool] = PrivateAttr(default=None)
     TYPE: str = "Sentiment"
+    # Number of worker processes to shard input texts, workers are started on first use
+    n_process: int = 1
+    # Skip full scoring for texts without any lexicon word or emoji
+    use_fast_path: bool = True
 
     def __init__(self, **data: Any):
         super().__init__(**data)
-        self._model = SentimentIntensityAnalyzer()
+        self._scorer = VaderScorer(use_fast_path=self.use_fast_path)
+        self._model = self._scorer.model
+        if self.n_process > 1:
+            self._process_pool = PersistentProcessPool(
+                n_process=self.n_process,
+                initializer=_init_vader_worker,
+                initargs=(self.use_fast_path,),
+            )
+            weakref.finalize(self, self._process_pool.shutdown)
 
     def _get_sentiment_score_from_vader(self, text: str) -> float:
-        scores = self._model.polarity_scores(text)
-        return float(scores["compound"])
+        return self._scorer.compound_score(text)
+
+    def _get_sentiment_scores_from_vader(self, texts: List[str]) -> List[float]:
+        if self._process_pool is not None and len(texts) > 1:
+            return self._process_pool.map_chunks(_vader_compound_scores, texts)
+        return [self._get_sentiment_score_from_vader(text) for text in texts]
 
     def analyze_input(
         self,
@@ -37,38 +107,36 @@ class VaderSentimentAnalyzer(BaseAnalyzer):
     ) -> List[TextPayload]:
         analyzer_output: List[TextPayload] = []
 
-        for batch_responses in self.batchify(source_response_list, self.batch_size):
-            for source_response in batch_responses:
-                classification_map = {}
-                sentiment_value = self._get_sentiment_score_from_vader(
-                    source_response.processed_text
-                )
-                if sentiment_value < 0.0:
-                    classification_map["negative"] = -sentiment_value
-                    classification_map["positive"] = (
-                        1.0 - classification_map["negative"]
-                    )
-                else:
-                    classification_map["positive"] = sentiment_value
-                    classification_map["negative"] = (
-                        1.0 - classification_map["positive"]
-                    )
-
-                segmented_data = {"classifier_data": classification_map}
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=source_response.processed_text,
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+        # Whole input is scored at once, so it can be sharded across worker processes
+        sentiment_values = self._get_sentiment_scores_from_vader(
+            [source_response.processed_text for source_response in source_response_list]
+        )
+        for sentiment_value, source_response in zip(
+            sentiment_values, source_response_list
+        ):
+            classification_map = {}
+            if sentiment_value < 0.0:
+                classification_map["negative"] = -sentiment_value
+                classification_map["positive"] = 1.0 - classification_map["negative"]
+            else:
+                classification_map["positive"] = sentiment_value
+                classification_map["negative"] = 1.0 - classification_map["positive"]
+
+            segmented_data = {"classifier_data": classification_map}
+            if source_response.segmented_data:
+                segmented_data = {
+                    **segmented_data,
+                    **source_response.segmented_data,
+                }
+
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=source_response.processed_text,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
 
         return analyzer_output
 
@@ -0,0 +1,190 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from obsei.analyzer.base_analyzer import MAX_LENGTH
+
+# Tokenizers without configured limit report a huge `model_max_length`
+_UNSET_MODEL_MAX_LENGTH: int = int(1e6)
+
+
+def max_token_length(tokenizer: Any, model_config: Any) -> int:
+    """
+    Maximum number of tokens (including special tokens) model can take
+    """
+    limits = []
+    model_max_length = getattr(tokenizer, "model_max_length", None)
+    if model_max_length is not None and model_max_length < _UNSET_MODEL_MAX_LENGTH:
+        limits.append(int(model_max_length))
+    max_position_embeddings = getattr(model_config, "max_position_embeddings", None)
+    if max_position_embeddings is not None:
+        limits.append(int(max_position_embeddings))
+    return min(limits) if limits else MAX_LENGTH
+
+
+def tokenize_texts(
+    tokenizer: Any,
+    texts: List[str],
+    max_length: int,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Tokenize whole input once with token level truncation, returns per text
+    encodings (input ids, attention mask etc) to be batched later via `pad_encodings`
+    """
+    if len(texts) == 0:
+        return []
+    encodings = tokenizer(texts, truncation=True, max_length=max_length, **kwargs)
+    return [
+        {name: values[idx] for name, values in encodings.items()}
+        for idx in range(len(encodings["input_ids"]))
+    ]
+
+
+def pad_encodings(
+    encodings: List[Dict[str, Any]],
+    pad_token_id: Optional[int],
+    device: Any = None,
+    model_input_names: Optional[List[str]] = None,
+) -> Dict[str, torch.Tensor]:
+    """
+    Right pad token ids of the batch to it's longest encoding and build attention mask
+    """
+    model_input_names = model_input_names or [
+        "input_ids",
+        "attention_mask",
+        "token_type_ids",
+    ]
+    max_length = max(len(encoding["input_ids"]) for encoding in encodings)
+    model_inputs = {
+        "input_ids": torch.full(
+            (len(encodings), max_length), pad_token_id or 0, dtype=torch.long
+        ),
+        "attention_mask": torch.zeros((len(encodings), max_length), dtype=torch.long),
+    }
+    if "token_type_ids" in model_input_names and "token_type_ids" in encodings[0]:
+        model_inputs["token_type_ids"] = torch.zeros(
+            (len(encodings), max_length), dtype=torch.long
+        )
+
+    for row, encoding in enumerate(encodings):
+        length = len(encoding["input_ids"])
+        model_inputs["attention_mask"][row, :length] = 1
+        model_inputs["input_ids"][row, :length] = torch.tensor(
+            encoding["input_ids"], dtype=torch.long
+        )
+        if "token_type_ids" in model_inputs:
+            model_inputs["token_type_ids"][row, :length] = torch.tensor(
+                encoding["token_type_ids"], dtype=torch.long
+            )
+
+    return {
+        name: tensor if device is None else tensor.to(device)
+        for name, tensor in model_inputs.items()
+        if name in model_input_names
+    }
+
+
+def classification_probabilities(
+    logits: torch.Tensor, model_config: Any
+) -> torch.Tensor:
+    """
+    Label probabilities from `logits`, same function as text classification pipeline apply
+    """
+    logits = logits.float().cpu()
+    if model_config.problem_type == "regression":
+        return logits
+    if (
+        model_config.problem_type == "multi_label_classification"
+        or model_config.num_labels == 1
+    ):
+        return logits.sigmoid()
+    return logits.softmax(dim=-1)
+
+
+def top_labels(probabilities: torch.Tensor, model_config: Any) -> List[Dict[str, Any]]:
+    id2label = model_config.id2label or {}
+    scores, label_ids = probabilities.max(dim=-1)
+    return [
+        {"label": id2label[int(label_id)], "score": float(score)}
+        for score, label_id in zip(scores.tolist(), label_ids.tolist())
+    ]
+
+
+def window_document_indices(encodings: List[Dict[str, Any]]) -> List[int]:
+    """
+    Index of the source text of each encoding, texts tokenized with
+    `return_overflowing_tokens` have one encoding per window
+    """
+    return [
+        encoding.get("overflow_to_sample_mapping", idx)
+        for idx, encoding in enumerate(encodings)
+    ]
+
+
+def aggregate_windows(
+    window_scores: torch.Tensor,
+    document_indices: List[int],
+    num_documents: int,
+    reduction: str = "mean",
+) -> torch.Tensor:
+    """
+    Reduce per window scores (windows x labels) to per document scores (documents x labels)
+    """
+    index = torch.tensor(document_indices, dtype=torch.long)
+    num_labels = window_scores.shape[-1]
+    if reduction == "max":
+        return torch.full(
+            (num_documents, num_labels), float("-inf"), dtype=window_scores.dtype
+        ).scatter_reduce_(
+            0, index.unsqueeze(-1).expand_as(window_scores), window_scores, "amax"
+        )
+    if reduction == "mean":
+        summed_scores = torch.zeros(
+            (num_documents, num_labels), dtype=window_scores.dtype
+        ).index_add_(0, index, window_scores)
+        window_counts = torch.bincount(index, minlength=num_documents).clamp(min=1)
+        return summed_scores / window_counts.unsqueeze(-1)
+    raise ValueError(f"Unsupported window reduction {reduction}, use `mean` or `max`")
+
+
+def merge_token_windows(
+    input_ids: List[np.ndarray],
+    scores: List[np.ndarray],
+    offset_mapping: List[np.ndarray],
+    special_tokens_mask: List[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merge overlapping windows of one text into single token sequence, tokens are
+    identified by their character offsets and scores of tokens seen in multiple
+    windows are averaged. Special tokens are dropped.
+    """
+    keep = [mask == 0 for mask in special_tokens_mask]
+    window_ids = np.concatenate([ids[mask] for ids, mask in zip(input_ids, keep)])
+    window_scores = np.concatenate([score[mask] for score, mask in zip(scores, keep)])
+    window_offsets = np.concatenate(
+        [offsets[mask] for offsets, mask in zip(offset_mapping, keep)]
+    ).reshape(-1, 2)
+
+    # Sorted by start and end offset, same as the text order
+    max_offset = int(window_offsets.max(initial=0)) + 1
+    token_keys = (
+        window_offsets[:, 0].astype(np.int64) * max_offset + window_offsets[:, 1]
+    )
+    _, first_indices, inverse_indices = np.unique(
+        token_keys, return_index=True, return_inverse=True
+    )
+    inverse_indices = inverse_indices.reshape(-1)
+    merged_scores = np.zeros(
+        (len(first_indices), window_scores.shape[-1]), dtype=window_scores.dtype
+    )
+    np.add.at(merged_scores, inverse_indices, window_scores)
+    merged_scores /= np.bincount(inverse_indices)[:, None]
+
+    return (
+        window_ids[first_indices],
+        merged_scores,
+        window_offsets[first_indices],
+        np.zeros(len(first_indices), dtype=np.int64),
+    )
@@ -1,33 +1,113 @@
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import PrivateAttr
+import torch
+from pydantic import Field, PrivateAttr
 from transformers import pipeline, Pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
 
 from obsei.analyzer.base_analyzer import (
     BaseAnalyzer,
     BaseAnalyzerConfig,
-    MAX_LENGTH,
 )
+from obsei.analyzer.language_detector import (
+    BaseLanguageDetector,
+    ScriptStopwordLanguageDetector,
+)
+from obsei.analyzer.tokenization import max_token_length, pad_encodings, tokenize_texts
 from obsei.payload import TextPayload
 
 
+class TranslationAnalyzerConfig(BaseAnalyzerConfig):
+    TYPE: str = "Translation"
+    # Generation settings, unset ones fall back to the model generation defaults
+    # Number of beams for beam search, 1 means greedy decoding
+    num_beams: Optional[int] = None
+    # Maximum number of generated tokens per text
+    max_new_tokens: Optional[int] = None
+    # Stop beam search once `num_beams` finished candidates are found
+    early_stopping: Optional[bool] = None
+
+
 class TranslationAnalyzer(BaseAnalyzer):
     _pipeline: Pipeline = PrivateAttr()
     _max_length: int = PrivateAttr()
     TYPE: str = "Translation"
     model_name_or_path: str
+    # Generation cost is driven by the longest text of the batch, hence length sorted batches
+    batching_strategy: str = "length"
+    # ISO 639-1 code of the model output language. When set, language of every text is
+    # detected first and texts already in the target language are not translated.
+    # Undetermined texts are translated. Detected language is recorded in
+    # `translation_data` only when set, otherwise detection is not run at all.
+    target_language: Optional[str] = None
+    language_detector: BaseLanguageDetector = Field(
+        default=ScriptStopwordLanguageDetector()
+    )
 
     def __init__(self, **data: Any):
         super().__init__(**data)
+        self._pipeline = self._load_model(
+            task="translation",
+            model_name_or_path=self.model_name_or_path,
+            loader=self._create_pipeline,
+        )
+        # Maximum number of tokens, longer texts are truncated
+        self._max_length = max_token_length(
+            self._pipeline.tokenizer, self._pipeline.model.config
+        )
+
+    def _create_pipeline(self) -> Pipeline:
         tokenizer = AutoTokenizer.from_pretrained(self.model_name_or_path)
         model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name_or_path)
-        self._pipeline = pipeline(
+        return pipeline(
             "translation", model=model, tokenizer=tokenizer, device=self._device_id
         )
-        if hasattr(self._pipeline.model.config, "max_position_embeddings"):
-            self._max_length = self._pipeline.model.config.max_position_embeddings
-        else:
-            self._max_length = MAX_LENGTH
+
+    def _tokenize(self, texts: List[str]) -> List[Dict[str, Any]]:
+        # Same as pipeline preprocessing, task prefix (ie T5 "translate English to
+        # German: ") configured for the model is prepended to every text
+        prefix = getattr(self._pipeline.model.config, "prefix", "") or ""
+        return tokenize_texts(
+            self._pipeline.tokenizer,
+            [prefix + text for text in texts],
+            self._max_length,
+        )
+
+    def _translate_encodings(
+        self,
+        encodings: List[Dict[str, Any]],
+        analyzer_config: Optional[TranslationAnalyzerConfig] = None,
+    ) -> List[str]:
+        tokenizer = self._pipeline.tokenizer
+        model_inputs = pad_encodings(
+            encodings,
+            pad_token_id=tokenizer.pad_token_id,  # type: ignore[union-attr]
+            device=self._pipeline.device,
+            # Same as pipeline, seq2seq models do not take token type ids
+            model_input_names=["input_ids", "attention_mask"],
+        )
+        generate_kwargs: Dict[str, Any] = {}
+        # Pipeline generation defaults if available (ie max_new_tokens and num_beams)
+        generation_config = getattr(self._pipeline, "generation_config", None)
+        if generation_config is not None:
+            generate_kwargs["generation_config"] = generation_config
+        if analyzer_config is not None:
+            generate_kwargs.update(
+                {
+                    name: value
+                    for name, value in {
+                        "num_beams": analyzer_config.num_beams,
+                        "max_new_tokens": analyzer_config.max_new_tokens,
+                        "early_stopping": analyzer_config.early_stopping,
+                    }.items()
+                    if value is not None
+                }
+            )
+        model: Any = self._pipeline.model
+        with torch.no_grad():
+            output_ids = model.generate(**model_inputs, **generate_kwargs)
+        return tokenizer.batch_decode(  # type: ignore[union-attr]
+            output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
 
     def analyze_input(
         self,
@@ -37,34 +117,71 @@ class TranslationAnalyzer(BaseAnalyzer):
     ) -> List[TextPayload]:
 
         analyzer_output = []
+        translation_config = (
+            analyzer_config
+            if isinstance(analyzer_config, TranslationAnalyzerConfig)
+            else None
+        )
 
-        for batch_responses in self.batchify(source_response_list, self.batch_size):
-            texts = [
-                source_response.processed_text[: self._max_length]
-                for source_response in batch_responses
-            ]
+        texts = [
+            source_response.processed_text for source_response in source_response_list
+        ]
+        detected_languages: List[Optional[str]] = (
+            self.language_detector.detect(texts)
+            if self.target_language
+            else [None] * len(texts)
+        )
+        # Texts already in the target language are passed through as is
+        translations: List[str] = list(texts)
+        translate_indices = [
+            idx
+            for idx, language in enumerate(detected_languages)
+            if self.target_language is None or language != self.target_language
+        ]
+
+        # Texts are tokenized once, encodings are reused for batching and generation
+        encodings = self._tokenize([texts[idx] for idx in translate_indices])
 
-            batch_predictions = self._pipeline(texts)
+        # Batches are formed per source language
+        language_positions: Dict[Optional[str], List[int]] = {}
+        for position, idx in enumerate(translate_indices):
+            language_positions.setdefault(detected_languages[idx], []).append(position)
 
-            for prediction, source_response in zip(batch_predictions, batch_responses):
+        for positions in language_positions.values():
+            for batch_indices in self.batchify_encodings(
+                [len(encodings[position]["input_ids"]) for position in positions],
+                self.batch_size,
+            ):
+                batch_positions = [positions[idx] for idx in batch_indices]
+                batch_translations = self._translate_encodings(
+                    [encodings[position] for position in batch_positions],
+                    translation_config,
+                )
+                for translation, position in zip(batch_translations, batch_positions):
+                    translations[translate_indices[position]] = translation
+
+        for translation, detected_language, source_response in zip(
+            translations, detected_languages, source_response_list
+        ):
+            translation_data: Dict[str, Any] = {
+                "original_text": source_response.processed_text
+            }
+            if self.target_language:
+                translation_data["detected_language"] = detected_language
+            segmented_data = {"translation_data": translation_data}
+            if source_response.segmented_data:
                 segmented_data = {
-                    "translation_data": {
-                        "original_text": source_response.processed_text
-                    }
+                    **segmented_data,
+                    **source_response.segmented_data,
                 }
-                if source_response.segmented_data:
-                    segmented_data = {
-                        **segmented_data,
-                        **source_response.segmented_data,
-                    }
-
-                analyzer_output.append(
-                    TextPayload(
-                        processed_text=prediction["translation_text"],
-                        meta=source_response.meta,
-                        segmented_data=segmented_data,
-                        source_name=source_response.source_name,
-                    )
+
+            analyzer_output.append(
+                TextPayload(
+                    processed_text=translation,
+                    meta=source_response.meta,
+                    segmented_data=segmented_data,
+                    source_name=source_response.source_name,
                 )
+            )
 
         return analyzer_output
@@ -0,0 +1,227 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+from obsei.analyzer.base_analyzer import BaseAnalyzer, BaseAnalyzerConfig
+from obsei.sink.base_sink import BaseSink, BaseSinkConfig
+from obsei.source.base_source import BaseSource, BaseSourceConfig
+
+logger = logging.getLogger(__name__)
+
+# Marks end of the stream in stage queues
+_END_OF_STREAM = object()
+
+
+class StageMetrics(BaseModel):
+    name: str
+    # Number of micro batches and payloads processed by the stage
+    batch_count: int = 0
+    payload_count: int = 0
+    # Time spent in stage's own work (lookup, analyze or send)
+    busy_time_in_seconds: float = 0.0
+    # Time spent waiting for downstream queue, high value means downstream stage is slower
+    blocked_time_in_seconds: float = 0.0
+    # Input queue depth observed by the stage, source stage do not have input queue
+    queue_capacity: int = 0
+    current_queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_queue_depth: int = 0
+
+    @property
+    def average_queue_depth(self) -> float:
+        return self.total_queue_depth / self.batch_count if self.batch_count else 0.0
+
+    def record_queue_depth(self, depth: int) -> None:
+        self.current_queue_depth = depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.total_queue_depth += depth
+
+
+class ConcurrentExecutor(BaseModel):
+    """
+    Run source, analyzer and sink in their own threads connected via bounded queues.
+    Stage blocks when its output queue is full, so memory remain bounded by `queue_size`
+    micro batches per queue and throughput is governed by slowest stage.
+    Threads are used instead of processes because sources, analyzers and sinks usually
+    hold network clients and models which can't be shared across processes, while
+    network IO and torch inference both release the GIL.
+    """
+
+    # Maximum number of micro batches buffered between two stages
+    queue_size: int = 4
+    # Micro batch size, by default analyzer's batch_size is used
+    batch_size: Optional[int] = None
+    # Interval to check whether other stage failed while waiting on queue
+    poll_interval_in_seconds: float = 0.1
+    _metrics: Dict[str, StageMetrics] = PrivateAttr(default_factory=dict)
+    _metrics_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def execute(
+        self,
+        source: BaseSource,
+        source_config: BaseSourceConfig,
+        analyzer: BaseAnalyzer,
+        sink: BaseSink,
+        sink_config: BaseSinkConfig,
+        analyzer_config: Optional[BaseAnalyzerConfig] = None,
+        id: Optional[str] = None,
+    ) -> Dict[str, StageMetrics]:
+        analyzer_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        sink_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        errors: List[BaseException] = []
+
+        metrics = {
+            "source": StageMetrics(name="source"),
+            "analyzer": StageMetrics(name="analyzer", queue_capacity=self.queue_size),
+            "sink": StageMetrics(name="sink", queue_capacity=self.queue_size),
+        }
+        with self._metrics_lock:
+            self._metrics = metrics
+
+        batch_size = self.batch_size or analyzer.batch_size
+
+        def source_stage() -> None:
+            source_stream = source.lookup_stream(config=source_config, id=id)
+            batches = analyzer.batchify_stream(source_stream, batch_size)
+            while True:
+                start_time = time.perf_counter()
+                batch = next(batches, None)
+                metrics["source"].busy_time_in_seconds += (
+                    time.perf_counter() - start_time
+                )
+                if batch is None:
+                    break
+                metrics["source"].batch_count += 1
+                metrics["source"].payload_count += len(batch)
+                if not self._put(analyzer_queue, batch, stop_event, metrics["source"]):
+                    return
+
+        def analyzer_stage() -> None:
+            while True:
+                batch = self._get(analyzer_queue, stop_event, metrics["analyzer"])
+                if batch is _END_OF_STREAM or batch is None:
+                    return
+                start_time = time.perf_counter()
+                analyzer_responses = analyzer.analyze_input(
+                    source_response_list=batch,
+                    analyzer_config=analyzer_config,
+                    id=id,
+                )
+                metrics["analyzer"].busy_time_in_seconds += (
+                    time.perf_counter() - start_time
+                )
+                metrics["analyzer"].payload_count += len(batch)
+                if not self._put(
+                    sink_queue, analyzer_responses, stop_event, metrics["analyzer"]
+                ):
+                    return
+
+        def sink_stage() -> None:
+            while True:
+                batch = self._get(sink_queue, stop_event, metrics["sink"])
+                if batch is _END_OF_STREAM or batch is None:
+                    return
+                start_time = time.perf_counter()
+                sink_response = sink.send_data(
+                    analyzer_responses=batch, config=sink_config, id=id
+                )
+                metrics["sink"].busy_time_in_seconds += time.perf_counter() - start_time
+                metrics["sink"].payload_count += len(batch)
+                logger.info(
+                    f"sink_response#'{metrics['sink'].batch_count}'='{sink_response}'"
+                )
+
+        threads = [
+            self._start_stage(
+                "source", source_stage, analyzer_queue, stop_event, errors
+            ),
+            self._start_stage(
+                "analyzer", analyzer_stage, sink_queue, stop_event, errors
+            ),
+            self._start_stage("sink", sink_stage, None, stop_event, errors),
+        ]
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        for stage_metrics in metrics.values():
+            logger.info(f"Stage metrics: {stage_metrics}")
+
+        return metrics
+
+    def get_metrics(self) -> Dict[str, StageMetrics]:
+        """
+        Metrics of current or last execution, can be polled from other thread to find bottleneck stage
+        """
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+    def _start_stage(
+        self,
+        name: str,
+        target: Callable[[], None],
+        output_queue: "Optional[queue.Queue[Any]]",
+        stop_event: threading.Event,
+        errors: List[BaseException],
+    ) -> threading.Thread:
+        def run() -> None:
+            try:
+                target()
+            except BaseException as ex:
+                logger.error(f"Stage {name} failed: {ex}")
+                errors.append(ex)
+                stop_event.set()
+            finally:
+                # Signal end of stream to the downstream stage
+                if output_queue is not None:
+                    self._put(output_queue, _END_OF_STREAM, stop_event, None)
+
+        thread = threading.Thread(target=run, name=f"obsei-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _put(
+        self,
+        stage_queue: "queue.Queue[Any]",
+        item: Any,
+        stop_event: threading.Event,
+        stage_metrics: Optional[StageMetrics],
+    ) -> bool:
+        start_time = time.perf_counter()
+        try:
+            while not stop_event.is_set():
+                try:
+                    stage_queue.put(item, timeout=self.poll_interval_in_seconds)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            if stage_metrics is not None:
+                stage_metrics.blocked_time_in_seconds += (
+                    time.perf_counter() - start_time
+                )
+
+    def _get(
+        self,
+        stage_queue: "queue.Queue[Any]",
+        stop_event: threading.Event,
+        stage_metrics: StageMetrics,
+    ) -> Optional[Any]:
+        while not stop_event.is_set():
+            try:
+                item = stage_queue.get(timeout=self.poll_interval_in_seconds)
+            except queue.Empty:
+                continue
+            if item is not _END_OF_STREAM:
+                stage_metrics.batch_count += 1
+                stage_metrics.record_queue_depth(stage_queue.qsize())
+            return item
+        return None
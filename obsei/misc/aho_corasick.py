@@ -0,0 +1,146 @@
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasickAutomaton:
+    """
+    Multi pattern string matcher, finds all occurrences of all keywords in a single
+    linear scan of the text irrespective of number of keywords
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Length of the keyword prefix represented by the node
+        self._depth: List[int] = [0]
+        # Indices of keywords ending at the node, including ones via failure links
+        self._output: List[List[int]] = [[]]
+
+        for keyword_index, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[node] + 1)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(keyword_index)
+
+        # Breadth first, so failure node of every node is processed before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail_node = self._fail[node]
+                while fail_node and char not in self._goto[fail_node]:
+                    fail_node = self._fail[fail_node]
+                self._fail[next_node] = self._goto[fail_node].get(char, 0)
+                self._output[next_node] = (
+                    self._output[next_node] + self._output[self._fail[next_node]]
+                )
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yields (start, end, keyword index) of every keyword occurrence, overlapping ones included
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword_index in output[node]:
+                yield (
+                    position + 1 - len(self.keywords[keyword_index]),
+                    position + 1,
+                    keyword_index,
+                )
+
+    def find_non_overlapping(
+        self, text: str, word_boundaries: bool = False
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Leftmost longest non overlapping occurrences, if `word_boundaries` is set only
+        occurrences not surrounded by word characters are considered. Overlaps are
+        resolved during the scan, occurrence is selected as soon as no occurrence
+        starting at or before it can be found anymore
+        """
+        goto = self._goto
+        fail = self._fail
+        depth = self._depth
+        output = self._output
+        text_length = len(text)
+        selected: List[Tuple[int, int, int]] = []
+        # Occurrences found but not yet selected or discarded, bounded by keyword length
+        pending: List[Tuple[int, int, int]] = []
+        last_end = 0
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            end = position + 1
+            for keyword_index in output[node]:
+                start = end - len(self.keywords[keyword_index])
+                if start < last_end:
+                    continue
+                if word_boundaries and (
+                    (start > 0 and _is_word_char(text[start - 1]))
+                    or (end < text_length and _is_word_char(text[end]))
+                ):
+                    continue
+                pending.append((start, end, keyword_index))
+            # Occurrences found later start at or after the current node's prefix
+            last_end = self._select_pending(
+                pending, selected, end - depth[node], last_end
+            )
+        self._select_pending(pending, selected, text_length + 1, last_end)
+        return selected
+
+    @staticmethod
+    def _select_pending(
+        pending: List[Tuple[int, int, int]],
+        selected: List[Tuple[int, int, int]],
+        min_future_start: int,
+        last_end: int,
+    ) -> int:
+        while pending:
+            # Leftmost and then longest occurrence
+            best = min(pending, key=lambda match: (match[0], match[0] - match[1]))
+            if best[0] >= min_future_start:
+                break
+            selected.append(best)
+            last_end = best[1]
+            pending[:] = [match for match in pending if match[0] >= last_end]
+        return last_end
+
+    def replace(
+        self, text: str, replacements: Sequence[str], word_boundaries: bool = False
+    ) -> str:
+        """
+        Replace every occurrence of keyword with the replacement at the same index
+        """
+        parts: List[str] = []
+        last_end = 0
+        for start, end, keyword_index in self.find_non_overlapping(
+            text, word_boundaries
+        ):
+            parts.append(text[last_end:start])
+            parts.append(replacements[keyword_index])
+            last_end = end
+        parts.append(text[last_end:])
+        return "".join(parts)
@@ -0,0 +1,81 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunkify(items: Sequence[T], chunk_size: int) -> List[Sequence[T]]:
+    chunk_size = max(chunk_size, 1)
+    return [
+        items[index : index + chunk_size] for index in range(0, len(items), chunk_size)
+    ]
+
+
+class PersistentProcessPool:
+    """
+    Process pool created on first use and reused across calls, so worker start up
+    and `initializer` (ie model or lexicon loading) cost is paid only once per worker.
+    Work is shipped to workers as chunks of plain picklable items (ie strings).
+    """
+
+    def __init__(
+        self,
+        n_process: int,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+        start_method: Optional[str] = None,
+    ):
+        self.n_process = n_process
+        self.initializer = initializer
+        self.initargs = initargs
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting process pool with {self.n_process} workers")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.n_process,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+            return self._executor
+
+    def map_chunks(
+        self,
+        function: Callable[[Sequence[T]], List[R]],
+        items: Sequence[T],
+        chunk_size: Optional[int] = None,
+    ) -> List[R]:
+        """
+        Apply `function` on chunks of `items` in worker processes and return
+        flattened results in the input order
+        """
+        if len(items) == 0:
+            return []
+        if chunk_size is None:
+            # Few chunks per worker to balance uneven chunks
+            chunk_size = -(-len(items) // (self.n_process * 4))
+
+        results: List[R] = []
+        for chunk_results in self._get_executor().map(
+            function, chunkify(items, chunk_size)
+        ):
+            results.extend(chunk_results)
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -1,4 +1,10 @@
-from typing import List, Optional, Dict, Any
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+from pydantic import PrivateAttr
 
 from obsei.payload import TextPayload
 from obsei.postprocessor.base_postprocessor import (
@@ -8,6 +14,8 @@ from obsei.postprocessor.base_postprocessor import (
 from obsei.postprocessor.inference_aggregator_function import BaseInferenceAggregateFunction
 from obsei.preprocessor.text_splitter import TextSplitterPayload
 
+logger = logging.getLogger(__name__)
+
 
 class InferenceAggregatorConfig(BasePostprocessorConfig):
     aggregate_function: BaseInferenceAggregateFunction
@@ -18,14 +26,33 @@ class InferenceAggregator(BasePostprocessor):
         self, input_list: List[TextPayload], config: InferenceAggregatorConfig, **kwargs: Any
     ) -> List[TextPayload]:
 
-        aggregated_payloads = self.segregate_payload(input_list)
-        postproces_output: List[TextPayload] = []
-        for key, payload_list in aggregated_payloads.items():
-            postproces_output.extend(
-                config.aggregate_function.execute(payload_list)
+        sorted_payloads, document_indices = self.sort_payload(input_list)
+        return config.aggregate_function.execute_batch(
+            sorted_payloads, document_indices
+        )
+
+    @staticmethod
+    def sort_payload(
+        input_list: List[TextPayload],
+    ) -> Tuple[List[TextPayload], np.ndarray]:
+        """
+        Sort payload by document (in order of first appearance) and chunk id,
+        returns sorted payload along with document index of each payload
+        """
+        document_ids: Dict[str, int] = {}
+        document_indices = np.empty(len(input_list), dtype=np.int64)
+        chunk_ids = np.zeros(len(input_list), dtype=np.int64)
+        for idx, payload in enumerate(input_list):
+            splitter_data: Optional[TextSplitterPayload] = (
+                payload.meta.get("splitter", None) if payload.meta else None
             )
+            doc_id = splitter_data.document_id if splitter_data else str(idx)
+            document_indices[idx] = document_ids.setdefault(doc_id, len(document_ids))
+            if splitter_data:
+                chunk_ids[idx] = splitter_data.chunk_id
 
-        return postproces_output
+        order = np.lexsort((chunk_ids, document_indices))
+        return [input_list[idx] for idx in order], document_indices[order]
 
     @staticmethod
     def segregate_payload(
@@ -53,3 +80,91 @@ class InferenceAggregator(BasePostprocessor):
                 payloads.sort(key=lambda x: x.meta["splitter"].chunk_id)  # type: ignore[no-any-return]
 
         return segregated_payload
+
+
+class StreamingInferenceAggregator(InferenceAggregator):
+    """
+    Aggregate chunks arriving across many calls (ie streaming pipeline). Chunks are kept
+    per `TextSplitterPayload.document_id` and document is aggregated and returned as soon
+    as all of it's `total_chunks` chunks arrived, so memory is bounded by in-flight
+    documents. Call `flush` at the end of stream to aggregate incomplete documents,
+    `Processor` does it in stream mode when `aggregator` is set.
+    """
+
+    # Oldest incomplete documents are aggregated partially beyond this limit
+    max_pending_documents: Optional[int] = None
+    # Number of partially aggregated document ids remembered to drop their late chunks
+    max_evicted_documents: int = 100000
+    _pending: "OrderedDict[str, Dict[int, TextPayload]]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _evicted: "OrderedDict[str, None]" = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def postprocess_input(  # type: ignore[override]
+        self,
+        input_list: List[TextPayload],
+        config: InferenceAggregatorConfig,
+        **kwargs: Any,
+    ) -> List[TextPayload]:
+        completed: List[TextPayload] = []
+        with self._lock:
+            for payload in input_list:
+                splitter_data: Optional[TextSplitterPayload] = (
+                    payload.meta.get("splitter", None) if payload.meta else None
+                )
+                # Not split, hence already complete document
+                if splitter_data is None or splitter_data.total_chunks is None:
+                    completed.append(payload)
+                    continue
+                # Document is already emitted partially, don't emit it again
+                if splitter_data.document_id in self._evicted:
+                    logger.warning(
+                        f"Dropping late chunk {splitter_data.chunk_id} of already "
+                        f"aggregated document {splitter_data.document_id}"
+                    )
+                    continue
+
+                chunks = self._pending.setdefault(splitter_data.document_id, {})
+                # Keyed by chunk id, so redelivered chunk is not counted twice
+                chunks[splitter_data.chunk_id] = payload
+                if len(chunks) >= splitter_data.total_chunks:
+                    completed.extend(
+                        self._pending.pop(splitter_data.document_id).values()
+                    )
+
+            while (
+                self.max_pending_documents is not None
+                and len(self._pending) > self.max_pending_documents
+            ):
+                document_id, chunks = self._pending.popitem(last=False)
+                logger.warning(
+                    f"Aggregating incomplete document {document_id}, "
+                    f"pending documents exceeded {self.max_pending_documents}"
+                )
+                self._mark_evicted(document_id)
+                completed.extend(chunks.values())
+
+        return super().postprocess_input(completed, config, **kwargs)
+
+    def flush(self, config: InferenceAggregatorConfig) -> List[TextPayload]:
+        """
+        Aggregate all pending (incomplete) documents
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+            for document_id in self._pending:
+                self._mark_evicted(document_id)
+            self._pending.clear()
+        return super().postprocess_input(
+            [payload for chunks in pending for payload in chunks.values()], config
+        )
+
+    def _mark_evicted(self, document_id: str) -> None:
+        self._evicted[document_id] = None
+        while len(self._evicted) > self.max_evicted_documents:
+            self._evicted.popitem(last=False)
+
+    @property
+    def pending_documents(self) -> int:
+        return len(self._pending)
@@ -1,7 +1,9 @@
 import logging
 from abc import abstractmethod
-from typing import Any, Dict, List, Tuple
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from pydantic import BaseModel
 
 from obsei.payload import TextPayload
@@ -9,6 +11,75 @@ from obsei.payload import TextPayload
 logger = logging.getLogger(__name__)
 
 
+def segment_starts(document_indices: np.ndarray) -> np.ndarray:
+    """
+    Start position of each document in `document_indices` sorted by document
+    """
+    if len(document_indices) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(
+        np.concatenate(([True], document_indices[1:] != document_indices[:-1]))
+    )
+
+
+class ScoreMatrixBuilder:
+    """
+    Collect classifier scores of chunks as (chunks x labels) matrix, along with mask of
+    labels present in chunk and label names. Chunks are grouped by their label layout
+    (mostly all chunks have same labels), so each group is copied as one block.
+    """
+
+    def __init__(self) -> None:
+        self.rows: List[int] = []
+        self.classifier_data: List[Dict[str, float]] = []
+
+    def add(self, row: int, classifier_data: Dict[str, float]) -> None:
+        self.rows.append(row)
+        self.classifier_data.append(classifier_data)
+
+    def _layouts(
+        self,
+    ) -> Dict[Tuple[str, ...], Tuple[List[int], List[Dict[str, float]]]]:
+        layout_labels = list(map(tuple, self.classifier_data))
+        if len(layout_labels) == 0 or layout_labels.count(layout_labels[0]) == len(
+            layout_labels
+        ):
+            return {
+                labels: (self.rows, self.classifier_data)
+                for labels in layout_labels[:1]
+            }
+
+        layouts: Dict[Tuple[str, ...], Tuple[List[int], List[Dict[str, float]]]] = {}
+        for labels, row, classifier_data in zip(
+            layout_labels, self.rows, self.classifier_data
+        ):
+            if labels not in layouts:
+                layouts[labels] = ([], [])
+            layouts[labels][0].append(row)
+            layouts[labels][1].append(classifier_data)
+        return layouts
+
+    def build(self, num_rows: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        layouts = self._layouts()
+        label_ids = {
+            label: idx
+            for idx, label in enumerate(dict.fromkeys(chain.from_iterable(layouts)))
+        }
+        scores = np.zeros((num_rows, len(label_ids)), dtype=np.float64)
+        present = np.zeros((num_rows, len(label_ids)), dtype=bool)
+        for labels, (rows, layout_data) in layouts.items():
+            if len(labels) == 0:
+                continue
+            block = np.ix_(rows, [label_ids[label] for label in labels])
+            scores[block] = np.fromiter(
+                chain.from_iterable(map(dict.values, layout_data)),
+                dtype=np.float64,
+                count=len(rows) * len(labels),
+            ).reshape(len(rows), len(labels))
+            present[block] = True
+        return scores, present, list(label_ids)
+
+
 class BaseInferenceAggregateFunction(BaseModel):
     @abstractmethod
     def execute(
@@ -16,6 +87,23 @@ class BaseInferenceAggregateFunction(BaseModel):
     ) -> List[TextPayload]:
         pass
 
+    def execute_batch(
+        self,
+        input_list: List[TextPayload],
+        document_indices: np.ndarray,
+        **kwargs: Any,
+    ) -> List[TextPayload]:
+        """
+        Aggregate chunks of many documents, `input_list` is sorted by document and chunk id
+        and `document_indices` is document index of each chunk.
+        By default `execute` is called per document.
+        """
+        output: List[TextPayload] = []
+        bounds = np.append(segment_starts(document_indices), len(input_list))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            output.extend(self.execute(input_list[start:end], **kwargs))
+        return output
+
     @staticmethod
     def _extract_merged_parameters(
         input_list: List[TextPayload],
@@ -26,16 +114,21 @@ class BaseInferenceAggregateFunction(BaseModel):
         # Merge meta across payload and collect score keys
         for payload in input_list:
             document_length += len(payload.processed_text)
-            meta = {**meta, **payload.meta} if payload.meta else meta
-            # Remove splitter key from meta
-            meta.pop("splitter")
+            if payload.meta:
+                meta.update(payload.meta)
             doc_text.append(payload.processed_text)
+        # Remove splitter key from meta
+        meta.pop("splitter", None)
         return doc_text, document_length, meta
 
 
-class ClassificationAverageScore(BaseInferenceAggregateFunction):
-    name: str = "ClassificationAverageScore"
-    default_value: float = 0.0
+class ClassificationAggregateFunction(BaseInferenceAggregateFunction):
+    """
+    Vectorized aggregation of classifier scores, chunk scores of all documents are
+    laid out as single (chunks x labels) matrix and reduced per document segment
+    """
+
+    name: str
 
     def execute(
         self, input_list: List[TextPayload], **kwargs: Any
@@ -43,85 +136,176 @@ class ClassificationAverageScore(BaseInferenceAggregateFunction):
         if len(input_list) == 0:
             logger.warning("Can't aggregate empty list")
             return input_list
+        return self.execute_batch(
+            input_list, np.zeros(len(input_list), dtype=np.int64), **kwargs
+        )
 
-        if not input_list[0].is_contains_classification_payload():
-            logger.warning(
-                "ClassificationAverage supports Classification and Sentiment Analyzers only"
-            )
-            return input_list
+    def execute_batch(
+        self,
+        input_list: List[TextPayload],
+        document_indices: np.ndarray,
+        **kwargs: Any,
+    ) -> List[TextPayload]:
+        if len(input_list) == 0:
+            return []
 
-        default_value = kwargs.get("default_value", self.default_value)
+        starts = segment_starts(document_indices)
+        bounds = np.append(starts, len(input_list)).tolist()
 
-        source_name = input_list[0].source_name
+        # Single pass over chunks to merge text and meta and collect scores
+        score_builder = ScoreMatrixBuilder()
+        lengths: List[int] = [0] * len(input_list)
+        merged_documents: List[Optional[Tuple[List[str], Dict[str, Any]]]] = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if not input_list[start].is_contains_classification_payload():
+                merged_documents.append(None)
+                continue
+            doc_text: List[str] = []
+            meta: Dict[str, Any] = {}
+            for row, payload in enumerate(input_list[start:end], start):
+                doc_text.append(payload.processed_text)
+                lengths[row] = len(payload.processed_text)
+                if payload.meta:
+                    meta.update(payload.meta)
+                if payload.segmented_data:
+                    score_builder.add(
+                        row, payload.segmented_data.get("classifier_data", {})
+                    )
+            # Remove splitter key from meta
+            meta.pop("splitter", None)
+            merged_documents.append((doc_text, meta))
 
-        doc_text, document_length, meta = self._extract_merged_parameters(input_list)
+        scores, present, labels = score_builder.build(len(input_list))
+        aggregated_data = self.aggregate(
+            scores,
+            present,
+            np.array(lengths, dtype=np.float64),
+            starts,
+            labels,
+            **kwargs,
+        )
 
-        # Perform average based on chunk length
-        scores: Dict[str, float] = {}
-        for payload in input_list:
-            if payload.segmented_data:
-                for key, value in payload.segmented_data.get("classifier_data", {}).items():
-                    ratio = len(payload.processed_text) / document_length
-                    scores[key] = scores.get(key, default_value) + value * ratio
+        output: List[TextPayload] = []
+        for merged_document, data, start, end in zip(
+            merged_documents, aggregated_data, bounds[:-1], bounds[1:]
+        ):
+            if merged_document is None:
+                logger.warning(
+                    f"{self.name} supports Classification and Sentiment Analyzers only"
+                )
+                output.extend(input_list[start:end])
+                continue
 
-        return [
-            TextPayload(
-                processed_text=" ".join(doc_text),
-                meta=meta,
-                segmented_data={
-                    "aggregator_data": {
-                        "avg_score": scores,
-                        "aggregator_name": self.name,
-                    }
-                },
-                source_name=source_name,
+            doc_text, meta = merged_document
+            output.append(
+                TextPayload(
+                    processed_text=" ".join(doc_text),
+                    meta=meta,
+                    segmented_data={
+                        "aggregator_data": {**data, "aggregator_name": self.name}
+                    },
+                    source_name=input_list[start].source_name,
+                )
             )
+        return output
+
+    @abstractmethod
+    def aggregate(
+        self,
+        scores: np.ndarray,
+        present: np.ndarray,
+        lengths: np.ndarray,
+        starts: np.ndarray,
+        labels: List[str],
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregator data of each document from chunk `scores` and `present` masks (chunks x labels),
+        chunk `lengths` and document `starts` positions
+        """
+        pass
+
+    @staticmethod
+    def _label_dicts(
+        values: np.ndarray, mask: np.ndarray, labels: List[str]
+    ) -> List[Dict[str, Any]]:
+        value_rows = values.tolist()
+        full_rows = np.all(mask, axis=1)
+        # Mostly all labels are present in every document
+        label_dicts: List[Dict[str, Any]] = [
+            dict(zip(labels, row_values)) if full_row else {}
+            for row_values, full_row in zip(value_rows, full_rows.tolist())
         ]
+        rows, columns = np.nonzero(mask & ~full_rows[:, None])
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            label_dicts[row][labels[column]] = value_rows[row][column]
+        return label_dicts
 
 
-class ClassificationMaxCategories(BaseInferenceAggregateFunction):
-    name: str = "ClassificationMaxCategories"
-    score_threshold: float = 0.5
+class ClassificationAverageScore(ClassificationAggregateFunction):
+    name: str = "ClassificationAverageScore"
+    default_value: float = 0.0
 
-    def execute(
-        self, input_list: List[TextPayload], **kwargs: Any
-    ) -> List[TextPayload]:
-        if len(input_list) == 0:
-            logger.warning("Can't aggregate empty list")
-            return input_list
+    def aggregate(
+        self,
+        scores: np.ndarray,
+        present: np.ndarray,
+        lengths: np.ndarray,
+        starts: np.ndarray,
+        labels: List[str],
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        default_value = kwargs.get("default_value", self.default_value)
 
-        if not input_list[0].is_contains_classification_payload():
-            logger.warning(
-                "ClassificationAverage supports Classification and Sentiment Analyzers only"
-            )
-            return input_list
+        # Average weighted by chunk length
+        document_lengths = np.repeat(
+            np.add.reduceat(lengths, starts), np.diff(np.append(starts, len(lengths)))
+        )
+        ratios = np.divide(
+            lengths,
+            document_lengths,
+            out=np.zeros_like(lengths),
+            where=document_lengths > 0,
+        )
+        avg_scores = (
+            np.add.reduceat(scores * ratios[:, None], starts, axis=0) + default_value
+        )
+        label_present = np.add.reduceat(present, starts, axis=0) > 0
+
+        return [
+            {"avg_score": avg_score}
+            for avg_score in self._label_dicts(avg_scores, label_present, labels)
+        ]
 
-        score_threshold = kwargs.get("score_threshold", self.score_threshold)
 
-        source_name = input_list[0].source_name
+class ClassificationMaxCategories(ClassificationAggregateFunction):
+    name: str = "ClassificationMaxCategories"
+    score_threshold: float = 0.5
 
-        doc_text, _, meta = self._extract_merged_parameters(input_list)
+    def aggregate(
+        self,
+        scores: np.ndarray,
+        present: np.ndarray,
+        lengths: np.ndarray,
+        starts: np.ndarray,
+        labels: List[str],
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        score_threshold = kwargs.get("score_threshold", self.score_threshold)
 
-        max_scores: Dict[str, float] = {}
-        category_count: Dict[str, int] = {}
-        for payload in input_list:
-            if payload.segmented_data:
-                for key, value in payload.segmented_data.get("classifier_data", {}).items():
-                    if value > score_threshold:
-                        category_count[key] = category_count.get(key, 0) + 1
-                        max_scores[key] = max(max_scores.get(key, 0.0), value)
+        above_threshold = present & (scores > score_threshold)
+        category_counts = np.add.reduceat(
+            above_threshold.astype(np.int64), starts, axis=0
+        )
+        max_scores = np.maximum.reduceat(
+            np.where(above_threshold, np.maximum(scores, 0.0), 0.0), starts, axis=0
+        )
+        has_category = category_counts > 0
 
         return [
-            TextPayload(
-                processed_text=" ".join(doc_text),
-                meta=meta,
-                segmented_data={
-                    "aggregator_data": {
-                        "category_count": category_count,
-                        "max_scores": max_scores,
-                        "aggregator_name": self.name,
-                    }
-                },
-                source_name=source_name,
+            {"category_count": category_count, "max_scores": max_score}
+            for category_count, max_score in zip(
+                self._label_dicts(category_counts, has_category, labels),
+                self._label_dicts(max_scores, has_category, labels),
             )
         ]
@@ -1,7 +1,13 @@
+import io
+import pickle
 import traceback
 import logging
-from typing import List, Any, Optional, Tuple
+import weakref
+from typing import Callable, List, Any, Optional, Sequence, Tuple
 
+from pydantic import BaseModel, PrivateAttr
+
+from obsei.misc.process_util import PersistentProcessPool
 from obsei.payload import TextPayload
 from obsei.preprocessor.base_preprocessor import (
     BaseTextPreprocessor,
@@ -9,7 +15,7 @@ from obsei.preprocessor.base_preprocessor import (
 )
 from obsei.preprocessor.text_cleaning_function import TextCleaningFunction, ToLowerCase, RemoveWhiteSpaceAndEmptyToken, \
     RemovePunctuation, RemoveSpecialChars, DecodeUnicode, RemoveDateTime, ReplaceDomainKeywords, TokenStemming, \
-    RemoveStopWords
+    RemoveStopWords, TokenFunction, RegExRemoveDateTime
 from obsei.preprocessor.text_tokenizer import BaseTextTokenizer, NLTKTextTokenizer
 
 cleaner_logger: logging.Logger = logging.getLogger(__name__)
@@ -21,6 +27,11 @@ class TextCleanerConfig(BaseTextProcessorConfig):
     stop_words: Optional[List[str]] = None
     domain_keywords: Optional[Tuple[str, str]] = None
     disable_tokenization: bool = False
+    # Use `RegExRemoveDateTime` instead of `RemoveDateTime` in the default cleaning functions
+    use_regex_date_time_removal: bool = False
+    # Fuse consecutive per token cleaning functions into single pass over tokens,
+    # output is same as applying cleaning functions one after another
+    compile_cleaning_functions: bool = True
 
     def __init__(self, **data: Any):
         super().__init__(**data)
@@ -32,7 +43,9 @@ class TextCleanerConfig(BaseTextProcessorConfig):
                 RemovePunctuation(),
                 RemoveSpecialChars(),
                 DecodeUnicode(),
-                RemoveDateTime(),
+                RegExRemoveDateTime()
+                if self.use_regex_date_time_removal
+                else RemoveDateTime(),
                 ReplaceDomainKeywords(domain_keywords=self.domain_keywords),
                 TokenStemming(),
                 RemoveStopWords(
@@ -42,13 +55,136 @@ class TextCleanerConfig(BaseTextProcessorConfig):
             ]
 
 
+CleaningStage = Callable[[List[str]], List[str]]
+
+
+def _has_own_token_function(cleaning_function: TextCleaningFunction) -> bool:
+    # Subclass overriding `execute` but not `token_function` can't be fused
+    function_type = type(cleaning_function)
+    for klass in function_type.__mro__:
+        if "token_function" in klass.__dict__:
+            return klass.__dict__.get("execute") is function_type.execute
+    return False
+
+
+def _fuse_token_functions(token_functions: List[TokenFunction]) -> CleaningStage:
+    def fused_stage(tokens: List[str]) -> List[str]:
+        cleaned_tokens: List[str] = []
+        for token in tokens:
+            cleaned_token: Optional[str] = token
+            for token_function in token_functions:
+                cleaned_token = token_function(cleaned_token)  # type: ignore[arg-type]
+                if cleaned_token is None:
+                    break
+            else:
+                cleaned_tokens.append(cleaned_token)  # type: ignore[arg-type]
+        return cleaned_tokens
+
+    return fused_stage
+
+
+def compile_cleaning_functions(
+    cleaning_functions: List[TextCleaningFunction],
+) -> List[CleaningStage]:
+    """
+    Compile cleaning functions into stages, consecutive functions having per token
+    equivalent are fused into a single pass and others (ie working on joined text)
+    run as is
+    """
+    stages: List[CleaningStage] = []
+    token_functions: List[TokenFunction] = []
+    for cleaning_function in cleaning_functions:
+        token_function = (
+            cleaning_function.token_function()
+            if _has_own_token_function(cleaning_function)
+            else None
+        )
+        if token_function is not None:
+            token_functions.append(token_function)
+            continue
+        if token_functions:
+            stages.append(_fuse_token_functions(token_functions))
+            token_functions = []
+        stages.append(cleaning_function.execute)
+    if token_functions:
+        stages.append(_fuse_token_functions(token_functions))
+    return stages
+
+
+_worker_state: Optional[
+    Tuple[Optional[BaseTextTokenizer], TextCleanerConfig, Optional[List[CleaningStage]]]
+] = None
+
+
+def _init_cleaner_worker(cleaner_state: bytes) -> None:
+    global _worker_state
+    text_tokenizer, config = pickle.loads(cleaner_state)
+    _worker_state = (
+        text_tokenizer,
+        config,
+        compile_cleaning_functions(config.cleaning_functions)
+        if config.compile_cleaning_functions
+        else None,
+    )
+
+
+def _clean_texts(texts: Sequence[str]) -> List[str]:
+    if _worker_state is None:
+        raise RuntimeError("Text cleaner worker is not initialized")
+    text_tokenizer, config, compiled_stages = _worker_state
+    return [
+        TextCleaner.clean_text(text, text_tokenizer, config, compiled_stages)
+        for text in texts
+    ]
+
+
+class _PublicStatePickler(pickle.Pickler):
+    # Pickles models without private attributes, ie lazily built caches
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            return object.__new__, (type(obj),), dict(obj.__dict__)
+        return NotImplemented
+
+
+def _public_state_fingerprint(obj: Any) -> bytes:
+    buffer = io.BytesIO()
+    _PublicStatePickler(buffer).dump(obj)
+    return buffer.getvalue()
+
+
 class TextCleaner(BaseTextPreprocessor):
+    _process_pool: Optional[PersistentProcessPool] = PrivateAttr(default=None)
+    _process_pool_owner: Optional[bytes] = PrivateAttr(default=None)
     text_tokenizer: Optional[BaseTextTokenizer] = None
+    # Number of worker processes, workers keep tokenizer and cleaning functions loaded
+    # across calls and only texts are shipped to them
+    n_process: int = 1
+    # Number of texts per dispatched chunk, by default input is split into few chunks per worker
+    chunk_size: Optional[int] = None
 
     def __init__(self, **data: Any):
         super().__init__(**data)
         self.text_tokenizer = self.text_tokenizer or NLTKTextTokenizer()
 
+    def _get_process_pool(self, config: TextCleanerConfig) -> PersistentProcessPool:
+        # Workers are initialized with the tokenizer and config, restart them whenever
+        # their fields change (including in place changes of the config)
+        cleaner_fingerprint = _public_state_fingerprint((self.text_tokenizer, config))
+        if (
+            self._process_pool is None
+            or self._process_pool_owner != cleaner_fingerprint
+        ):
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+            self._process_pool = PersistentProcessPool(
+                n_process=self.n_process,
+                initializer=_init_cleaner_worker,
+                initargs=(pickle.dumps((self.text_tokenizer, config)),),
+            )
+            self._process_pool_owner = cleaner_fingerprint
+            weakref.finalize(self, self._process_pool.shutdown)
+        return self._process_pool
+
     def preprocess_input(  # type: ignore[override]
         self,
         input_list: List[TextPayload],
@@ -57,20 +193,66 @@ class TextCleaner(BaseTextPreprocessor):
     ) -> List[TextPayload]:
         if config.cleaning_functions is None:
             return input_list
+
+        if self.n_process > 1 and len(input_list) > 1:
+            cleaned_texts = self._get_process_pool(config).map_chunks(
+                _clean_texts,
+                [input_data.processed_text for input_data in input_list],
+                chunk_size=self.chunk_size,
+            )
+            for input_data, cleaned_text in zip(input_list, cleaned_texts):
+                input_data.processed_text = cleaned_text
+            return input_list
+
+        compiled_stages = (
+            compile_cleaning_functions(config.cleaning_functions)
+            if config.compile_cleaning_functions
+            else None
+        )
         for input_data in input_list:
-            if self.text_tokenizer is None or config.disable_tokenization:
-                tokens = [input_data.processed_text]
-            else:
-                tokens = self.text_tokenizer.tokenize_text(
-                    input_data.processed_text
-                )
-            for cleaning_function in config.cleaning_functions:
-                try:
-                    tokens = cleaning_function.execute(tokens)
-                except Exception as ex:
-                    cleaner_logger.warning(f"Received exception: {ex}")
-                    traceback.print_exc()
-
-            input_data.processed_text = " ".join(tokens)
+            input_data.processed_text = self.clean_text(
+                input_data.processed_text, self.text_tokenizer, config, compiled_stages
+            )
 
         return input_list
+
+    @staticmethod
+    def clean_text(
+        text: str,
+        text_tokenizer: Optional[BaseTextTokenizer],
+        config: TextCleanerConfig,
+        compiled_stages: Optional[List[CleaningStage]] = None,
+    ) -> str:
+        if text_tokenizer is None or config.disable_tokenization:
+            tokens = [text]
+        else:
+            tokens = text_tokenizer.tokenize_text(text)
+        return " ".join(
+            TextCleaner._clean_tokens(
+                tokens, config.cleaning_functions or [], compiled_stages
+            )
+        )
+
+    @staticmethod
+    def _clean_tokens(
+        tokens: List[str],
+        cleaning_functions: List[TextCleaningFunction],
+        compiled_stages: Optional[List[CleaningStage]] = None,
+    ) -> List[str]:
+        if compiled_stages is not None:
+            try:
+                cleaned_tokens = tokens
+                for stage in compiled_stages:
+                    cleaned_tokens = stage(cleaned_tokens)
+                return cleaned_tokens
+            except Exception:
+                # Rerun function by function, failing function is skipped as usual
+                pass
+
+        for cleaning_function in cleaning_functions:
+            try:
+                tokens = cleaning_function.execute(tokens)
+            except Exception as ex:
+                cleaner_logger.warning(f"Received exception: {ex}")
+                traceback.print_exc()
+        return tokens
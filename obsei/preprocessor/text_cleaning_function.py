@@ -1,8 +1,9 @@
+import functools
 import logging
 import re
 import string
 from abc import abstractmethod
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 from unicodedata import normalize
 
 import nltk
@@ -13,29 +14,60 @@ from pydantic import BaseModel, PrivateAttr, Field
 from spacy import Language  # type: ignore
 from spacy.cli import download  # type: ignore
 
+from obsei.misc.aho_corasick import AhoCorasickAutomaton
+
 cleaner_func_logger: logging.Logger = logging.getLogger(__name__)
 
+# Maps a token to cleaned token, `None` drops the token
+TokenFunction = Callable[[str], Optional[str]]
+
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+_SPECIAL_CHARS_REGEX = re.compile("[^A-Za-z0-9]+")
+
 
 class TextCleaningFunction(BaseModel):
     @abstractmethod
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         pass
 
+    def token_function(self) -> Optional[TokenFunction]:
+        """
+        Per token equivalent of `execute`, used to fuse consecutive cleaning functions
+        into single pass over tokens. `None` for functions working on whole token list.
+        """
+        return None
+
 
 class ToLowerCase(TextCleaningFunction):
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         return [token.lower() for token in tokens]
 
+    def token_function(self) -> Optional[TokenFunction]:
+        return str.lower
+
+
+def _strip_token(token: str) -> Optional[str]:
+    token = token.strip()
+    return token if token != "" else None
+
 
 class RemoveWhiteSpaceAndEmptyToken(TextCleaningFunction):
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         striped_tokens = [token.strip() for token in tokens]
         return [token for token in striped_tokens if token != ""]
 
+    def token_function(self) -> Optional[TokenFunction]:
+        return _strip_token
+
 
 # Removes words that don't add any meaning to the sequence
 class RemoveStopWords(TextCleaningFunction):
-    stop_words: Optional[List[str]] = None
+    """
+    `stop_words` is stored as tuple, lookup set is rebuilt when it is reassigned
+    """
+
+    _stop_word_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+    stop_words: Optional[Tuple[str, ...]] = None
     language: Optional[str] = "english"
 
     def __init__(self, **data: Any):
@@ -46,25 +78,56 @@ class RemoveStopWords(TextCleaningFunction):
             except LookupError:
                 nltk.download("stopwords")
             self.stop_words = stopwords.words(self.language)
+        else:
+            self._stop_word_set = frozenset(self.stop_words)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "stop_words" and value is not None:
+            value = tuple(value)
+        super().__setattr__(name, value)
+        if name == "stop_words":
+            self._stop_word_set = frozenset(self.stop_words or ())
+
+    def get_stop_word_set(self) -> FrozenSet[str]:
+        return self._stop_word_set
 
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         if not self.stop_words:
             return tokens
-        return [token for token in tokens if token not in self.stop_words]
+        stop_word_set = self._stop_word_set
+        return [token for token in tokens if token not in stop_word_set]
+
+    def token_function(self) -> Optional[TokenFunction]:
+        if not self.stop_words:
+            return None
+        stop_word_set = self._stop_word_set
+        return lambda token: None if token in stop_word_set else token
+
+
+def _remove_punctuation(token: str) -> Optional[str]:
+    token = token.translate(_PUNCTUATION_TABLE)
+    return token if len(token) else None
 
 
 class RemovePunctuation(TextCleaningFunction):
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         return [
-            token.translate(token.maketrans("", "", string.punctuation))
-            for token in tokens
-            if len(token.translate(token.maketrans("", "", string.punctuation)))
+            cleaned_token
+            for cleaned_token in map(_remove_punctuation, tokens)
+            if cleaned_token is not None
         ]
 
+    def token_function(self) -> Optional[TokenFunction]:
+        return _remove_punctuation
+
 
 # Transforms tokens to standardized form
 class TokenStemming(TextCleaningFunction):
+    # Per instance `functools.lru_cache` over the stemmer, it is thread safe
+    _memo: Optional[Any] = PrivateAttr(default=None)
     stemmer: Optional[Any] = None
+    # Stems of most recently used tokens are memoized, 0 disables memoization
+    memo_size: int = 100000
 
     def __init__(self, **data: Any):
         super().__init__(**data)
@@ -78,10 +141,62 @@ class TokenStemming(TextCleaningFunction):
                     "NLTK module is not installed hence token stemming will not work"
                 )
 
+    def _get_memo(self) -> Any:
+        memo = self._memo
+        if memo is None:
+            stemmer = self.stemmer
+
+            def stem_token(token: str) -> str:
+                return str(stemmer.stem(token))  # type: ignore[union-attr]
+
+            memo = functools.lru_cache(maxsize=self.memo_size)(stem_token)
+            self._memo = memo
+        return memo
+
+    def stem(self, token: str) -> str:
+        if self.memo_size <= 0:
+            return str(self.stemmer.stem(token))  # type: ignore[union-attr]
+        return str(self._get_memo()(token))
+
+    def get_memo_stats(self) -> Dict[str, Any]:
+        if self._memo is None:
+            hits, misses, size = 0, 0, 0
+        else:
+            hits, misses, _, size = self._memo.cache_info()
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": size,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def clear_memo(self) -> None:
+        self._memo = None
+
+    def __getstate__(self) -> Dict[Any, Any]:
+        # Memo is a per process cache, it is not shipped to worker processes
+        state = super().__getstate__()
+        state["__pydantic_private__"] = {
+            **(state.get("__pydantic_private__") or {}),
+            "_memo": None,
+        }
+        return state
+
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         if not self.stemmer:
             return tokens
-        return [self.stemmer.stem(token) for token in tokens]
+        return [self.stem(token) for token in tokens]
+
+    def token_function(self) -> Optional[TokenFunction]:
+        if not self.stemmer:
+            return None
+        return self.stem
+
+
+def _remove_special_chars(token: str) -> Optional[str]:
+    token = _SPECIAL_CHARS_REGEX.sub("", token)
+    return token if token != "" else None
 
 
 class RemoveSpecialChars(TextCleaningFunction):
@@ -92,8 +207,18 @@ class RemoveSpecialChars(TextCleaningFunction):
     """
 
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
-        cleaned_tokens = [re.sub("[^A-Za-z0-9]+", "", token) for token in tokens]
-        return [token for token in cleaned_tokens if token != ""]
+        return [
+            cleaned_token
+            for cleaned_token in map(_remove_special_chars, tokens)
+            if cleaned_token is not None
+        ]
+
+    def token_function(self) -> Optional[TokenFunction]:
+        return _remove_special_chars
+
+
+def _decode_unicode(token: str) -> str:
+    return normalize("NFKD", token).encode("ascii", "ignore").decode("utf-8")
 
 
 # Converts unicodes to ASCII characters
@@ -104,6 +229,9 @@ class DecodeUnicode(TextCleaningFunction):
             for token in tokens
         ]
 
+    def token_function(self) -> Optional[TokenFunction]:
+        return _decode_unicode
+
 
 class RemoveDateTime(TextCleaningFunction):
     _white_space_cleaner = RemoveWhiteSpaceAndEmptyToken()
@@ -119,9 +247,98 @@ class RemoveDateTime(TextCleaningFunction):
         return self._white_space_cleaner.execute(tokens)
 
 
+_DAY_PATTERN = r"(?:[12][0-9]|3[01]|0?[1-9])"
+_ORDINAL_DAY_PATTERN = _DAY_PATTERN + r"(?:st|nd|rd|th)"
+_YEAR_PATTERN = r"(?:19|20)[0-9]{2}"
+_MONTH_PATTERN = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_TIME_PATTERN = (
+    r"(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9](?:\.[0-9]+)?)?(?:\s*[ap]\.?m\b\.?)?"
+    r"|(?:1[0-2]|0?[1-9])\s*[ap]\.?m\b\.?"
+)
+_DATE_TIME_PATTERNS = [
+    # ISO 8601 date with optional time, ie 2021-05-15 or 2021-05-15T16:45:00Z
+    r"[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}(?:[t ](?:[01][0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9](?:\.[0-9]+)?)?(?:z|[+-][0-9]{2}:?[0-9]{2})?)?",
+    # Numeric dates, ie 15/05/2021, 05-15-21 or 15.05.2021
+    r"[0-9]{1,2}[/.-][0-9]{1,2}[/.-](?:[0-9]{4}|[0-9]{2})",
+    # Textual dates, ie 15th May 2021, 15 of May, May 15th, 2021 or May 2021
+    _DAY_PATTERN
+    + r"(?:st|nd|rd|th)?\s+(?:of\s+)?"
+    + _MONTH_PATTERN
+    + r"(?:,?\s+"
+    + _YEAR_PATTERN
+    + r")?",
+    _MONTH_PATTERN
+    + r"\s+"
+    + _DAY_PATTERN
+    + r"(?:st|nd|rd|th)?(?:,?\s+"
+    + _YEAR_PATTERN
+    + r")?",
+    _MONTH_PATTERN + r"\s+" + _YEAR_PATTERN,
+    _TIME_PATTERN,
+    _ORDINAL_DAY_PATTERN,
+    _YEAR_PATTERN,
+    # Unambiguous month and weekday names ("may" and "march" are common words)
+    r"(?:january|february|april|june|july|september|october|november|december)",
+    r"(?:mon|tues|wednes|thurs|fri|satur|sun)day",
+    r"(?:utc|gmt)",
+]
+_DATE_TIME_REGEX = re.compile(
+    r"(?<!\w)(?:" + "|".join(_DATE_TIME_PATTERNS) + r")(?!\w)", re.IGNORECASE
+)
+
+
+class RegExRemoveDateTime(TextCleaningFunction):
+    """
+    Faster alternative of `RemoveDateTime`, removes common date and time formats
+    (numeric and ISO dates, textual dates, times, ordinal days, years, month and
+    weekday names) via single precompiled regex instead of fuzzy date parsing
+    """
+
+    _white_space_cleaner = RemoveWhiteSpaceAndEmptyToken()
+
+    def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
+        text: str = " ".join(tokens)
+        return self._white_space_cleaner.execute(
+            _DATE_TIME_REGEX.sub(" ", text).split()
+        )
+
+
 # Replaces domain specific keywords
 class ReplaceDomainKeywords(TextCleaningFunction):
-    domain_keywords: Optional[List[Tuple[str, str]]] = None
+    """
+    Replaces all keywords in a single scan of the text via Aho-Corasick automaton built
+    once from `domain_keywords`. Overlapping keywords are resolved by leftmost longest match.
+    `domain_keywords` is stored as tuple, automaton is rebuilt when it is reassigned.
+    """
+
+    _automaton: Optional[AhoCorasickAutomaton] = PrivateAttr(default=None)
+    _replacements: List[str] = PrivateAttr(default_factory=list)
+    domain_keywords: Optional[Tuple[Tuple[str, str], ...]] = None
+    # Replace keywords only if they are not part of a longer word
+    match_word_boundaries: bool = False
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._build_automaton()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "domain_keywords" and value is not None:
+            value = tuple(tuple(keywords) for keywords in value)
+        super().__setattr__(name, value)
+        if name == "domain_keywords":
+            self._build_automaton()
+
+    def _build_automaton(self) -> None:
+        # First target wins for repeated source keyword
+        replacements: Dict[str, str] = {}
+        for source_keyword, target_keyword in self.domain_keywords or ():
+            if source_keyword:
+                replacements.setdefault(source_keyword, target_keyword)
+        self._automaton = AhoCorasickAutomaton(list(replacements.keys()))
+        self._replacements = list(replacements.values())
 
     def execute(self, tokens: List[str], **kwargs: Any) -> List[str]:
         # don't do anything when no domain keywords specified
@@ -129,9 +346,9 @@ class ReplaceDomainKeywords(TextCleaningFunction):
             return tokens
 
         text: str = " ".join(tokens)
-        for source_keyword, target_keyword in self.domain_keywords:
-            if source_keyword in text or source_keyword.lower() in text:
-                text = text.replace(source_keyword, target_keyword)
+        text = self._automaton.replace(  # type: ignore[union-attr]
+            text, self._replacements, word_boundaries=self.match_word_boundaries
+        )
         tokens = text.split()
         return tokens
 
@@ -148,6 +365,13 @@ class RegExSubstitute(TextCleaningFunction):
 
         return [compiled_regex.sub(self.substitute, token) for token in tokens]
 
+    def token_function(self) -> Optional[TokenFunction]:
+        if not self.pattern or not self.substitute:
+            return None
+        compiled_regex = re.compile(self.pattern)
+        substitute = self.substitute
+        return lambda token: compiled_regex.sub(substitute, token)
+
 
 class SpacyLemmatization(TextCleaningFunction):
     _nlp: Language = PrivateAttr()
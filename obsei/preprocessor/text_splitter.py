@@ -1,9 +1,12 @@
 import logging
-from typing import List, Optional, Any
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Any, Sequence, Tuple
 import uuid
 
 import nltk
-from nltk import sent_tokenize
 from pydantic import BaseModel
 
 from obsei.payload import TextPayload
@@ -14,6 +17,12 @@ from obsei.preprocessor.base_preprocessor import (
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_REGEX = re.compile(r"[ \n\t]")
+
+# Sentence tokenizers loaded once per process, keyed by resource path
+_SENTENCE_TOKENIZERS: Dict[str, Any] = {}
+_SENTENCE_TOKENIZERS_LOCK = threading.Lock()
+
 
 class TextSplitterPayload(BaseModel):
     phrase: str
@@ -21,30 +30,275 @@ class TextSplitterPayload(BaseModel):
     chunk_length: int
     document_id: str
     total_chunks: Optional[int] = None
+    # Character offsets of the phrase in the original text
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+
+
+class TextSpan(NamedTuple):
+    start: int
+    end: int
+
+
+class WhitespaceIndex:
+    """
+    Whitespace positions of a text collected once, cut points are then found by
+    binary search instead of scanning the text backwards for every cut
+    """
+
+    def __init__(self, text: str):
+        self.length = len(text)
+        self.positions = [match.start() for match in _WHITESPACE_REGEX.finditer(text)]
+
+    def valid_index(self, idx: int) -> int:
+        """
+        Last whitespace position at or before `idx`, 0 if there is none
+        """
+        if idx <= 0:
+            return 0
+        if idx >= self.length:
+            return self.length
+        position_idx = bisect_right(self.positions, idx) - 1
+        return self.positions[position_idx] if position_idx >= 0 else 0
+
+
+def split_spans(
+    text: str, max_split_length: int, split_stride: int = 0, offset: int = 0
+) -> List[TextSpan]:
+    """
+    Split `text` on whitespace into spans of at most `max_split_length` characters,
+    consecutive spans overlap by up to `split_stride` characters. Text without
+    whitespace in a window is cut at exactly `max_split_length`.
+    Spans are character offsets into the text shifted by `offset`.
+    """
+    text_length = len(text)
+    whitespace_index = WhitespaceIndex(text)
+    spans: List[TextSpan] = []
+
+    start_idx = 0
+    previous_start_idx = -1
+    while start_idx < text_length:
+        if split_stride > 0 and start_idx > 0:
+            stride_idx = whitespace_index.valid_index(start_idx - split_stride)
+            if stride_idx > previous_start_idx:
+                start_idx = stride_idx + 1
+            else:
+                # No whitespace in the overlap, overlap by exactly `split_stride` characters
+                start_idx = max(start_idx - split_stride, previous_start_idx + 1)
+        end_idx = whitespace_index.valid_index(
+            min(start_idx + max_split_length, text_length)
+        )
+        next_start_idx = end_idx + 1
+        # No whitespace in the window, hard cut
+        if end_idx <= start_idx:
+            end_idx = min(start_idx + max_split_length, text_length)
+            next_start_idx = end_idx
+
+        spans.append(TextSpan(offset + start_idx, offset + end_idx))
+        previous_start_idx = start_idx
+        start_idx = next_start_idx
+
+    return spans
+
+
+def token_split_spans(
+    offset_mapping: Sequence[Tuple[int, int]],
+    max_split_length: int,
+    split_stride: int = 0,
+    offset: int = 0,
+) -> List[TextSpan]:
+    """
+    Same as `split_spans` but `max_split_length` and `split_stride` are token counts,
+    `offset_mapping` is character offsets of the text tokens (without special tokens).
+    Cuts are placed on word boundaries (gap between tokens) if possible.
+    """
+    token_count = len(offset_mapping)
+    # Token indices starting a new word
+    word_starts = [
+        idx
+        for idx in range(1, token_count)
+        if offset_mapping[idx][0] > offset_mapping[idx - 1][1]
+    ]
+    spans: List[TextSpan] = []
+
+    start_token = 0
+    while start_token < token_count:
+        end_token = min(start_token + max_split_length, token_count)
+        if end_token < token_count:
+            word_start_idx = bisect_right(word_starts, end_token) - 1
+            if word_start_idx >= 0 and word_starts[word_start_idx] > start_token:
+                end_token = word_starts[word_start_idx]
+
+        spans.append(
+            TextSpan(
+                offset + offset_mapping[start_token][0],
+                offset + offset_mapping[end_token - 1][1],
+            )
+        )
+        if end_token >= token_count:
+            break
+
+        next_start_token = end_token
+        if split_stride > 0:
+            next_start_token = max(end_token - split_stride, start_token + 1)
+            word_start_idx = bisect_left(word_starts, next_start_token)
+            if (
+                word_start_idx < len(word_starts)
+                and word_starts[word_start_idx] < end_token
+            ):
+                next_start_token = word_starts[word_start_idx]
+        start_token = next_start_token
+
+    return spans
+
+
+def _punkt_language(resource: str) -> Optional[str]:
+    # ie "tokenizers/punkt/PY3/english.pickle" or "tokenizers/punkt_tab/english/"
+    parts = [part for part in resource.split("/") if part]
+    if (
+        len(parts) < 2
+        or parts[0] != "tokenizers"
+        or parts[1] not in ("punkt", "punkt_tab")
+    ):
+        return None
+    return os.path.splitext(parts[-1])[0] if len(parts) > 2 else "english"
+
+
+def _load_sentence_tokenizer(resource: str) -> Any:
+    language = _punkt_language(resource)
+    # NLTK>=3.9 ship punkt parameters as "punkt_tab" instead of pickle
+    punkt_tokenizer_cls = getattr(nltk.tokenize, "PunktTokenizer", None)
+    if language is not None and punkt_tokenizer_cls is not None:
+        return punkt_tokenizer_cls(language)
+    return nltk.data.load(resource)
+
+
+def get_sentence_tokenizer(resource: str, offline: bool = False) -> Any:
+    """
+    Sentence tokenizer loaded from NLTK `resource` path, cached for the whole process.
+    Missing punkt data is downloaded unless `offline`, then `LookupError` is raised.
+    """
+    tokenizer = _SENTENCE_TOKENIZERS.get(resource)
+    if tokenizer is not None:
+        return tokenizer
+
+    with _SENTENCE_TOKENIZERS_LOCK:
+        if resource in _SENTENCE_TOKENIZERS:
+            return _SENTENCE_TOKENIZERS[resource]
+        try:
+            tokenizer = _load_sentence_tokenizer(resource)
+        except LookupError:
+            if offline:
+                raise
+            package = (
+                "punkt_tab" if hasattr(nltk.tokenize, "PunktTokenizer") else "punkt"
+            )
+            logger.info(
+                f"Sentence tokenizer {resource} not found, downloading {package}"
+            )
+            nltk.download(package, quiet=True)
+            tokenizer = _load_sentence_tokenizer(resource)
+        _SENTENCE_TOKENIZERS[resource] = tokenizer
+    return tokenizer
+
+
+def sentence_spans(
+    texts: List[str], resource: str, offline: bool = False
+) -> List[List[TextSpan]]:
+    """
+    Character spans of sentences of each text, all texts share same cached tokenizer
+    """
+    tokenizer = get_sentence_tokenizer(resource, offline=offline)
+    return [
+        [TextSpan(start, end) for start, end in tokenizer.span_tokenize(text)]
+        for text in texts
+    ]
 
 
 class TextSplitterConfig(BaseTextProcessorConfig):
     max_split_length: int = 512
     split_stride: int = 0  # overlap length
+    # "character" or "token", unit of `max_split_length` and `split_stride`. Token mode
+    # need HuggingFace fast tokenizer (ie analyzer's tokenizer) passed to `TextSplitter`,
+    # `max_split_length` then includes special tokens (ie [CLS] and [SEP]) the tokenizer
+    # adds, so split encoded for the model is at most `max_split_length` tokens long
+    split_unit: str = "character"
     document_id_key: Optional[str] = None  # document_id in meta
     enable_sentence_split: bool = False
     honor_paragraph_boundary: bool = False
     paragraph_marker: str = '\n\n'
     sentence_tokenizer: str = 'tokenizers/punkt/PY3/english.pickle'
+    # Never download missing sentence tokenizer data, fail instead
+    offline: bool = False
 
-    def __init__(self, **data: Any):
-        super().__init__(**data)
 
-        if self.enable_sentence_split:
-            nltk.download('punkt')
+class TextSplitter(BaseTextPreprocessor):
+    # HuggingFace fast tokenizer for "token" split unit, analyzers pass their own
+    # tokenizer via `tokenizer` argument of `preprocess_input`
+    tokenizer: Optional[Any] = None
 
+    def _atomic_spans(
+        self,
+        atomic_texts: List[Tuple[str, int]],
+        config: TextSplitterConfig,
+        tokenizer: Any,
+    ) -> List[List[TextSpan]]:
+        if config.split_unit == "character":
+            return [
+                split_spans(
+                    atomic_text,
+                    max_split_length=config.max_split_length,
+                    split_stride=config.split_stride,
+                    offset=atomic_start,
+                )
+                for atomic_text, atomic_start in atomic_texts
+            ]
+        if config.split_unit != "token":
+            raise ValueError(
+                f"Unsupported split unit {config.split_unit}, use `character` or `token`"
+            )
+        if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+            raise ValueError("Token split unit need HuggingFace fast tokenizer")
+        if len(atomic_texts) == 0:
+            return []
+
+        # Leave room for special tokens added when split is encoded for the model
+        max_split_tokens = max(
+            config.max_split_length - tokenizer.num_special_tokens_to_add(), 1
+        )
+        # All texts of all documents are tokenized in one batch
+        offset_mappings = tokenizer(
+            [atomic_text for atomic_text, _ in atomic_texts],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            # Texts are longer than model limit by intent
+            verbose=False,
+        )["offset_mapping"]
+        return [
+            token_split_spans(
+                offset_mapping,
+                max_split_length=max_split_tokens,
+                split_stride=config.split_stride,
+                offset=atomic_start,
+            )
+            for offset_mapping, (_, atomic_start) in zip(offset_mappings, atomic_texts)
+        ]
 
-class TextSplitter(BaseTextPreprocessor):
     def preprocess_input(  # type: ignore[override]
-        self, input_list: List[TextPayload], config: TextSplitterConfig, **kwargs: Any
+        self,
+        input_list: List[TextPayload],
+        config: TextSplitterConfig,
+        tokenizer: Optional[Any] = None,
+        **kwargs: Any,
     ) -> List[TextPayload]:
         text_splits: List[TextPayload] = []
 
+        document_ids: List[str] = []
+        # Paragraphs along with their offset in the original text and document index
+        paragraphs: List[Tuple[str, int]] = []
+        paragraph_document_indices: List[int] = []
         for idx, input_data in enumerate(input_list):
             if (
                 config.document_id_key
@@ -54,54 +308,66 @@ class TextSplitter(BaseTextPreprocessor):
                 document_id = str(input_data.meta.get(config.document_id_key))
             else:
                 document_id = uuid.uuid4().hex
+            document_ids.append(document_id)
 
+            text = input_data.processed_text
             if config.honor_paragraph_boundary:
-                paragraphs = input_data.processed_text.split(config.paragraph_marker)
+                document_paragraphs = text.split(config.paragraph_marker)
             else:
-                paragraphs = [input_data.processed_text]
-
-            atomic_texts: List[str] = []
-            for paragraph in paragraphs:
-                if config.enable_sentence_split:
-                    atomic_texts.extend(sent_tokenize(paragraph))
-                else:
-                    atomic_texts.append(paragraph)
-
-            split_id = 0
-            document_splits: List[TextSplitterPayload] = []
-            for text in atomic_texts:
-                text_length = len(text)
-                if text_length == 0:
-                    continue
-
-                start_idx = 0
-                while start_idx < text_length:
-                    if config.split_stride > 0 and start_idx > 0:
-                        start_idx = (
-                            self._valid_index(
-                                text, start_idx - config.split_stride
-                            )
-                            + 1
-                        )
-                    end_idx = self._valid_index(
-                        text,
-                        min(start_idx + config.max_split_length, text_length),
+                document_paragraphs = [text]
+
+            paragraph_start = 0
+            for paragraph in document_paragraphs:
+                if len(paragraph) > 0:
+                    paragraphs.append((paragraph, paragraph_start))
+                    paragraph_document_indices.append(idx)
+                paragraph_start += len(paragraph) + len(config.paragraph_marker)
+
+        # Atomic texts along with their offset in the original text and document index
+        atomic_texts: List[Tuple[str, int]] = paragraphs
+        atomic_document_indices: List[int] = paragraph_document_indices
+        if config.enable_sentence_split:
+            atomic_texts = []
+            atomic_document_indices = []
+            for (paragraph, paragraph_start), idx, spans in zip(
+                paragraphs,
+                paragraph_document_indices,
+                sentence_spans(
+                    [paragraph for paragraph, _ in paragraphs],
+                    resource=config.sentence_tokenizer,
+                    offline=config.offline,
+                ),
+            ):
+                for span in spans:
+                    atomic_texts.append(
+                        (paragraph[span.start : span.end], paragraph_start + span.start)
                     )
+                    atomic_document_indices.append(idx)
 
-                    phrase = text[start_idx:end_idx]
-                    document_splits.append(
-                        TextSplitterPayload(
-                            phrase=phrase,
-                            chunk_id=split_id,
-                            chunk_length=len(phrase),
-                            document_id=document_id,
-                        )
+        document_splits: List[List[TextSplitterPayload]] = [[] for _ in input_list]
+        for (atomic_text, atomic_start), idx, spans in zip(
+            atomic_texts,
+            atomic_document_indices,
+            self._atomic_spans(atomic_texts, config, tokenizer or self.tokenizer),
+        ):
+            for span in spans:
+                phrase = atomic_text[
+                    span.start - atomic_start : span.end - atomic_start
+                ]
+                document_splits[idx].append(
+                    TextSplitterPayload(
+                        phrase=phrase,
+                        chunk_id=len(document_splits[idx]),
+                        chunk_length=len(phrase),
+                        document_id=document_ids[idx],
+                        start_offset=span.start,
+                        end_offset=span.end,
                     )
-                    start_idx = end_idx + 1
-                    split_id += 1
+                )
 
-            total_splits = len(document_splits)
-            for split in document_splits:
+        for input_data, splits in zip(input_list, document_splits):
+            total_splits = len(splits)
+            for split in splits:
                 split.total_chunks = total_splits
                 payload = TextPayload(
                     processed_text=split.phrase,
@@ -114,16 +380,3 @@ class TextSplitter(BaseTextPreprocessor):
                 text_splits.append(payload)
 
         return text_splits
-
-    @staticmethod
-    def _valid_index(document: str, idx: int) -> int:
-        if idx <= 0:
-            return 0
-        if idx >= len(document):
-            return len(document)
-        new_idx = idx
-        while new_idx > 0:
-            if document[new_idx] in [" ", "\n", "\t"]:
-                break
-            new_idx -= 1
-        return new_idx
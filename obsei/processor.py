@@ -4,6 +4,11 @@ from typing import Optional
 from pydantic import BaseModel
 
 from obsei.analyzer.base_analyzer import BaseAnalyzer, BaseAnalyzerConfig
+from obsei.executor import ConcurrentExecutor
+from obsei.postprocessor.inference_aggregator import (
+    InferenceAggregatorConfig,
+    StreamingInferenceAggregator,
+)
 from obsei.sink.base_sink import BaseSink, BaseSinkConfig
 from obsei.source.base_source import BaseSource, BaseSourceConfig
 from obsei.workflow.workflow import Workflow
@@ -18,6 +23,16 @@ class Processor(BaseModel):
     source_config: Optional[BaseSourceConfig] = None
     sink: Optional[BaseSink] = None
     sink_config: Optional[BaseSinkConfig] = None
+    # Stream payloads from source to sink in micro batches instead of materializing all of them
+    stream: bool = False
+    # Micro batch size used in stream mode, by default analyzer's batch_size is used
+    stream_batch_size: Optional[int] = None
+    # Aggregate chunks spanning micro batches in stream mode, incomplete documents are
+    # flushed to sink at the end of stream
+    aggregator: Optional[StreamingInferenceAggregator] = None
+    aggregator_config: Optional[InferenceAggregatorConfig] = None
+    # Run source, analyzer and sink concurrently, it takes precedence over `stream` mode
+    executor: Optional[ConcurrentExecutor] = None
 
     def process(
         self,
@@ -49,6 +64,30 @@ class Processor(BaseModel):
         if sink is None or sink_config is None:
             return
 
+        if self.executor is not None:
+            self.executor.execute(
+                source=source,
+                source_config=source_config,
+                sink=sink,
+                sink_config=sink_config,
+                analyzer=analyzer,
+                analyzer_config=analyzer_config,
+                id=id,
+            )
+            return
+
+        if self.stream:
+            self._process_stream(
+                source=source,
+                source_config=source_config,
+                sink=sink,
+                sink_config=sink_config,
+                analyzer=analyzer,
+                analyzer_config=analyzer_config,
+                id=id,
+            )
+            return
+
         source_response_list = source.lookup(config=source_config, id=id)
         for idx, source_response in enumerate(source_response_list):
             logger.info(f"source_response#'{idx}'='{source_response}'")
@@ -66,3 +105,52 @@ class Processor(BaseModel):
         )
         for idx, sink_response in enumerate(sink_response_list):
             logger.info(f"source_response#'{idx}'='{sink_response}'")
+
+    def _process_stream(
+        self,
+        source: BaseSource,
+        source_config: BaseSourceConfig,
+        sink: BaseSink,
+        sink_config: BaseSinkConfig,
+        analyzer: BaseAnalyzer,
+        analyzer_config: Optional[BaseAnalyzerConfig] = None,
+        id: Optional[str] = None,
+    ) -> None:
+        source_response_stream = source.lookup_stream(config=source_config, id=id)
+
+        analyzer_response_batches = analyzer.analyze_stream(
+            source_response_stream=source_response_stream,
+            analyzer_config=analyzer_config,
+            batch_size=self.stream_batch_size,
+            id=id,
+        )
+
+        response_idx = 0
+        for batch_idx, analyzer_response_list in enumerate(analyzer_response_batches):
+            for analyzer_response in analyzer_response_list:
+                logger.info(f"analyzer_response#'{response_idx}'='{analyzer_response}'")
+                response_idx += 1
+
+            if self.aggregator is not None and self.aggregator_config is not None:
+                analyzer_response_list = self.aggregator.postprocess_input(
+                    input_list=analyzer_response_list, config=self.aggregator_config
+                )
+                # Documents of this batch are still waiting for their remaining chunks
+                if not analyzer_response_list:
+                    continue
+
+            # Sink is flushed per micro batch hence it receive data as soon as first batch is analyzed
+            sink_response = sink.send_data(
+                analyzer_responses=analyzer_response_list, config=sink_config, id=id
+            )
+            logger.info(f"sink_response#'{batch_idx}'='{sink_response}'")
+
+        if self.aggregator is not None and self.aggregator_config is not None:
+            flushed_response_list = self.aggregator.flush(self.aggregator_config)
+            if flushed_response_list:
+                sink_response = sink.send_data(
+                    analyzer_responses=flushed_response_list,
+                    config=sink_config,
+                    id=id,
+                )
+                logger.info(f"sink_response#'flush'='{sink_response}'")
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List, Optional, Any
+from typing import Any, Generator, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -21,5 +21,11 @@ class BaseSource(BaseSettings):
     def lookup(self, config: BaseSourceConfig, **kwargs: Any) -> List[TextPayload]:
         pass
 
+    def lookup_stream(
+        self, config: BaseSourceConfig, **kwargs: Any
+    ) -> Generator[TextPayload, None, None]:
+        # Sources which can fetch data lazily should override it to yield payloads as soon as they are available
+        yield from self.lookup(config=config, **kwargs)
+
     class Config:
         arbitrary_types_allowed = True
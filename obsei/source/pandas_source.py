@@ -1,4 +1,4 @@
-from typing import List, Optional, Any
+from typing import Any, Dict, Generator, List, Optional
 
 from pandas import DataFrame
 
@@ -35,20 +35,35 @@ class PandasSourceConfig(BaseSourceConfig):
 
 class PandasSource(BaseSource):
     NAME: Optional[str] = "Pandas"
+    stream_chunk_size: int = 1000
 
     def lookup(self, config: PandasSourceConfig, **kwargs: Any) -> List[TextPayload]:  # type: ignore[override]
         df_to_records = config.dataframe.to_dict("records")
         source_responses: List[TextPayload] = [
-            TextPayload(
-                processed_text=config.separator.join(
-                    [record.get(text_column) for text_column in config.text_columns]
-                ),
-                meta={key: record[key] for key in config.include_columns}
-                if config.include_columns is not None
-                else record,
-                source_name=self.NAME,
-            )
-            for record in df_to_records
+            self._record_to_payload(record, config) for record in df_to_records
         ]
 
         return source_responses
+
+    def lookup_stream(  # type: ignore[override]
+        self, config: PandasSourceConfig, **kwargs: Any
+    ) -> Generator[TextPayload, None, None]:
+        # Convert dataframe in slices to avoid materializing all the records at once
+        for index in range(0, len(config.dataframe), self.stream_chunk_size):
+            df_slice = config.dataframe.iloc[index : index + self.stream_chunk_size]
+            for record in df_slice.to_dict("records"):
+                yield self._record_to_payload(record, config)
+
+    def _record_to_payload(
+        self, record: Dict[str, Any], config: PandasSourceConfig
+    ) -> TextPayload:
+        # Presence of every text column is validated by `PandasSourceConfig`
+        return TextPayload(
+            processed_text=config.separator.join(
+                [record[text_column] for text_column in config.text_columns]
+            ),
+            meta={key: record[key] for key in config.include_columns}
+            if config.include_columns is not None
+            else record,
+            source_name=self.NAME,
+        )
@@ -0,0 +1,298 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, PrivateAttr
+
+from obsei.analyzer.base_analyzer import BaseAnalyzer
+from obsei.processor import Processor
+from obsei.sink.base_sink import BaseSink
+from obsei.source.base_source import BaseSource
+from obsei.workflow.store import WorkflowStore
+from obsei.workflow.workflow import Workflow
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowRunStats(BaseModel):
+    workflow_id: str
+    run_count: int = 0
+    failure_count: int = 0
+    last_error: Optional[str] = None
+    # Epoch time in seconds
+    last_due_time: Optional[float] = None
+    last_start_time: Optional[float] = None
+    next_run_time: Optional[float] = None
+    # Lag is the delay between due time and actual start time of the run
+    last_lag_in_seconds: Optional[float] = None
+    max_lag_in_seconds: float = 0.0
+    last_run_duration_in_seconds: Optional[float] = None
+    max_run_duration_in_seconds: float = 0.0
+    total_run_duration_in_seconds: float = 0.0
+
+    @property
+    def average_run_duration_in_seconds(self) -> float:
+        return (
+            self.total_run_duration_in_seconds / self.run_count
+            if self.run_count
+            else 0.0
+        )
+
+
+class ScheduledWorkflow(BaseModel):
+    workflow: Workflow
+    source: BaseSource
+    analyzer: BaseAnalyzer
+    sink: BaseSink
+    # None means workflow will run only once
+    interval_in_seconds: Optional[int] = None
+    next_run_time: Optional[float] = None
+    running: bool = False
+    stats: WorkflowRunStats
+
+    @property
+    def source_key(self) -> str:
+        return type(self.source).__name__
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class WorkflowScheduler(BaseModel):
+    """
+    Run many workflows concurrently on a worker pool, each workflow is executed every
+    `WorkflowConfig.time_in_seconds` seconds. Workflows using the same source type
+    share a concurrency limit, to honor rate limits of the underlying APIs.
+
+    Thread safety: analyzer (as well as source and sink) instance passed to many
+    workflows is called concurrently from the worker threads. Built-in analyzers guard
+    their mutable state (inference cache, zero-shot hypothesis encodings, stemming memo
+    of text cleaner) with locks and model inference is stateless. Custom analyzer
+    keeping mutable state across `analyze_input` calls must guard it, or a separate
+    instance should be passed per workflow.
+    """
+
+    max_workers: int = 4
+    # Maximum in flight runs per source type (ie TwitterSource)
+    max_concurrency_per_source: int = 1
+    # Overrides `max_concurrency_per_source` for given source type names
+    source_concurrency_limits: Optional[Dict[str, int]] = None
+    # Used when workflow do not have `time_in_seconds`, None means run only once
+    default_interval_in_seconds: Optional[int] = None
+    poll_interval_in_seconds: float = 1.0
+    # Processor options used to run each workflow
+    stream: bool = False
+    stream_batch_size: Optional[int] = None
+    _jobs: Dict[str, ScheduledWorkflow] = PrivateAttr(default_factory=dict)
+    _analyzers: Dict[str, BaseAnalyzer] = PrivateAttr(default_factory=dict)
+    _in_flight: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _idle_condition: threading.Condition = PrivateAttr()
+    _pool: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _stop_event: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _dispatcher: Optional[threading.Thread] = PrivateAttr(default=None)
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._idle_condition = threading.Condition(self._lock)
+
+    def get_analyzer(
+        self, analyzer_class: Type[BaseAnalyzer], **kwargs: Any
+    ) -> BaseAnalyzer:
+        """
+        Return analyzer instance shared across workflows, analyzer (and it's model) is
+        initialized only once for the same class and init arguments. Returned analyzer is
+        called concurrently, see thread safety note of `WorkflowScheduler`
+        """
+        key = (
+            f"{analyzer_class.__module__}.{analyzer_class.__qualname__}:"
+            + json.dumps(kwargs, sort_keys=True, default=str)
+        )
+        with self._lock:
+            if key not in self._analyzers:
+                logger.info(f"Initializing shared analyzer {key}")
+                self._analyzers[key] = analyzer_class(**kwargs)
+            return self._analyzers[key]
+
+    def add_workflow(
+        self,
+        workflow: Workflow,
+        source: BaseSource,
+        analyzer: BaseAnalyzer,
+        sink: BaseSink,
+        start_time: Optional[float] = None,
+    ) -> None:
+        interval = workflow.config.time_in_seconds or self.default_interval_in_seconds
+        next_run_time = start_time if start_time is not None else time.time()
+        with self._lock:
+            previous_job = self._jobs.get(workflow.id)
+            self._jobs[workflow.id] = ScheduledWorkflow(
+                workflow=workflow,
+                source=source,
+                analyzer=analyzer,
+                sink=sink,
+                interval_in_seconds=interval,
+                next_run_time=next_run_time,
+                running=previous_job.running if previous_job else False,
+                stats=previous_job.stats
+                if previous_job
+                else WorkflowRunStats(
+                    workflow_id=workflow.id, next_run_time=next_run_time
+                ),
+            )
+
+    def add_workflows_from_store(
+        self,
+        store: WorkflowStore,
+        resolver: Callable[[Workflow], Tuple[BaseSource, BaseAnalyzer, BaseSink]],
+    ) -> None:
+        """
+        Schedule all the workflows from the store, `resolver` maps workflow to it's
+        source, analyzer and sink instances. Use `get_analyzer` in resolver to share analyzers.
+        """
+        for workflow in store.get_all():
+            source, analyzer, sink = resolver(workflow)
+            self.add_workflow(
+                workflow=workflow, source=source, analyzer=analyzer, sink=sink
+            )
+
+    def remove_workflow(self, workflow_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(workflow_id, None)
+
+    def get_stats(self) -> Dict[str, WorkflowRunStats]:
+        with self._lock:
+            return {
+                workflow_id: job.stats.model_copy()
+                for workflow_id, job in self._jobs.items()
+            }
+
+    def run_pending(self, now: Optional[float] = None) -> List[str]:
+        """
+        Dispatch all due workflows to the worker pool without waiting for them.
+        Returns ids of dispatched workflows
+        """
+        now = now if now is not None else time.time()
+        dispatched: List[str] = []
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="obsei-workflow"
+                )
+
+            due_jobs = sorted(
+                [
+                    job
+                    for job in self._jobs.values()
+                    if not job.running
+                    and job.next_run_time is not None
+                    and job.next_run_time <= now
+                ],
+                key=lambda job: job.next_run_time or 0.0,
+            )
+            for job in due_jobs:
+                source_key = job.source_key
+                if self._in_flight.get(source_key, 0) >= self._source_limit(source_key):
+                    continue
+                self._in_flight[source_key] = self._in_flight.get(source_key, 0) + 1
+                job.running = True
+                self._pool.submit(self._run_job, job, job.next_run_time or now)
+                dispatched.append(job.workflow.id)
+
+        return dispatched
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no workflow is running, returns False if timed out
+        """
+        with self._idle_condition:
+            return self._idle_condition.wait_for(
+                lambda: not any(self._in_flight.values()), timeout=timeout
+            )
+
+    def start(self) -> None:
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="obsei-scheduler", daemon=True
+        )
+        self._dispatcher.start()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop_event.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+            self._dispatcher = None
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_pending()
+            except Exception as ex:
+                logger.error(f"Unable to dispatch workflows: {ex}")
+            self._stop_event.wait(self.poll_interval_in_seconds)
+
+    def _source_limit(self, source_key: str) -> int:
+        if (
+            self.source_concurrency_limits
+            and source_key in self.source_concurrency_limits
+        ):
+            return self.source_concurrency_limits[source_key]
+        return self.max_concurrency_per_source
+
+    def _run_job(self, job: ScheduledWorkflow, due_time: float) -> None:
+        start_time = time.time()
+        error: Optional[str] = None
+        try:
+            Processor(
+                source=job.source,
+                analyzer=job.analyzer,
+                sink=job.sink,
+                stream=self.stream,
+                stream_batch_size=self.stream_batch_size,
+            ).process(workflow=job.workflow)
+        except Exception as ex:
+            logger.error(f"Workflow {job.workflow.id} failed: {ex}")
+            error = str(ex)
+        end_time = time.time()
+
+        with self._lock:
+            stats = job.stats
+            duration = end_time - start_time
+            lag = max(start_time - due_time, 0.0)
+            stats.run_count += 1
+            stats.last_due_time = due_time
+            stats.last_start_time = start_time
+            stats.last_lag_in_seconds = lag
+            stats.max_lag_in_seconds = max(stats.max_lag_in_seconds, lag)
+            stats.last_run_duration_in_seconds = duration
+            stats.max_run_duration_in_seconds = max(
+                stats.max_run_duration_in_seconds, duration
+            )
+            stats.total_run_duration_in_seconds += duration
+            if error is not None:
+                stats.failure_count += 1
+                stats.last_error = error
+
+            # Workflow might be re-added while it was running
+            current_job = self._jobs.get(job.workflow.id, job)
+            current_job.next_run_time = (
+                None
+                if current_job.interval_in_seconds is None
+                else max(due_time + current_job.interval_in_seconds, end_time)
+            )
+            stats.next_run_time = current_job.next_run_time
+            current_job.running = False
+
+            source_key = job.source_key
+            self._in_flight[source_key] = self._in_flight.get(source_key, 1) - 1
+            self._idle_condition.notify_all()
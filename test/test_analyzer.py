@@ -1,6 +1,15 @@
 import pytest
-
-from obsei.analyzer.classification_analyzer import ClassificationAnalyzerConfig
+from transformers import AutoConfig, PretrainedConfig
+
+from obsei.analyzer.base_analyzer import BaseAnalyzer
+from obsei.analyzer.inference_cache import InMemoryInferenceCache
+from obsei.analyzer.sentiment_analyzer import VaderScorer, VaderSentimentAnalyzer
+from obsei.analyzer.classification_analyzer import (
+    ClassificationAnalyzerConfig,
+    TextClassificationAnalyzer,
+)
+from obsei.analyzer.ner_analyzer import SpacyNERAnalyzer, TransformersNERAnalyzer
+from obsei.analyzer.onnx_runtime import ONNX_OPSET_VERSION, onnx_model_dir
 from obsei.payload import TextPayload
 from obsei.postprocessor.inference_aggregator import InferenceAggregatorConfig
 from obsei.postprocessor.inference_aggregator_function import (
@@ -45,6 +54,54 @@ def test_zero_shot_analyzer(zero_shot_analyzer):
         assert "negative" in analyzer_response.segmented_data["classifier_data"]
 
 
+@pytest.mark.parametrize("multi_class_classification", [True, False])
+def test_zero_shot_analyzer_matches_pipeline(
+    zero_shot_analyzer, multi_class_classification
+):
+    labels = ["facility", "food"]
+    analyzer_config = ClassificationAnalyzerConfig(
+        labels=labels, multi_class_classification=multi_class_classification
+    )
+
+    predictions = zero_shot_analyzer.prediction_from_model(
+        texts=TEXTS, analyzer_config=analyzer_config
+    )
+
+    # Config labels are not mutated
+    assert analyzer_config.labels == ["facility", "food"]
+
+    pipeline_predictions = zero_shot_analyzer._pipeline(
+        TEXTS,
+        candidate_labels=["facility", "food", "positive", "negative"],
+        multi_label=multi_class_classification,
+    )
+    for prediction, pipeline_prediction in zip(predictions, pipeline_predictions):
+        assert list(prediction.keys()) == pipeline_prediction["labels"]
+        assert list(prediction.values()) == pytest.approx(
+            pipeline_prediction["scores"], abs=1e-5
+        )
+
+
+def test_zero_shot_analyzer_hypothesis_cache_is_bounded(zero_shot_analyzer):
+    cache_size = zero_shot_analyzer.hypothesis_cache_size
+    zero_shot_analyzer.hypothesis_cache_size = 2
+    zero_shot_analyzer._hypothesis_encodings.clear()
+    try:
+        encodings = [
+            zero_shot_analyzer._hypothesis_encoding(label)
+            for label in ["facility", "food", "staff", "facility"]
+        ]
+        # Least recently used "food" is evicted
+        assert list(zero_shot_analyzer._hypothesis_encodings.keys()) == [
+            "This example is staff.",
+            "This example is facility.",
+        ]
+        assert encodings[0] == encodings[3]
+    finally:
+        zero_shot_analyzer.hypothesis_cache_size = cache_size
+        zero_shot_analyzer._hypothesis_encodings.clear()
+
+
 @pytest.mark.parametrize(
     "label_map, expected", [
         (None, ["LABEL_1", "LABEL_0"]),
@@ -70,6 +127,62 @@ def test_text_classification_analyzer(text_classification_analyzer, label_map, e
         assert analyzer_response.segmented_data["classifier_data"].keys() <= set(expected)
 
 
+def test_text_classification_analyzer_shares_model(text_classification_analyzer):
+    analyzer = TextClassificationAnalyzer(
+        model_name_or_path="obsei-ai/sell-buy-intent-classifier-bert-mini",
+    )
+
+    assert analyzer._pipeline is text_classification_analyzer._pipeline
+
+
+@pytest.mark.parametrize(
+    "max_batch_tokens, expected",
+    [
+        (None, [[1, 3], [4, 0], [2]]),
+        (60, [[1], [3], [4, 0], [2]]),
+    ],
+)
+def test_batchify_by_length(max_batch_tokens, expected):
+    batches = list(
+        BaseAnalyzer.batchify_by_length(
+            lengths=[5, 50, 3, 40, 7], batch_size=2, max_batch_tokens=max_batch_tokens
+        )
+    )
+
+    assert batches == expected
+
+
+def test_text_classification_analyzer_length_batching(text_classification_analyzer):
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample")
+        for text in BUY_SELL_TEXTS + TEXTS
+    ]
+    analyzer_config = ClassificationAnalyzerConfig()
+    expected_responses = text_classification_analyzer.analyze_input(
+        source_response_list=source_responses,
+        analyzer_config=analyzer_config,
+    )
+
+    text_classification_analyzer.batching_strategy = "length"
+    try:
+        analyzer_responses = text_classification_analyzer.analyze_input(
+            source_response_list=source_responses,
+            analyzer_config=analyzer_config,
+        )
+    finally:
+        text_classification_analyzer.batching_strategy = "arrival"
+
+    assert len(analyzer_responses) == len(expected_responses)
+    for analyzer_response, expected_response in zip(
+        analyzer_responses, expected_responses
+    ):
+        assert analyzer_response.processed_text == expected_response.processed_text
+        assert (
+            analyzer_response.segmented_data["classifier_data"].keys()
+            == expected_response.segmented_data["classifier_data"].keys()
+        )
+
+
 @pytest.mark.parametrize(
     "aggregate_function", [ClassificationAverageScore(), ClassificationMaxCategories()]
 )
@@ -115,6 +228,34 @@ def test_vader_analyzer(vader_analyzer):
         assert "negative" in analyzer_response.segmented_data["classifier_data"]
 
 
+def test_vader_analyzer_parallel(vader_analyzer):
+    texts = TEXTS + ["The table is brown", "I love it 😁", "NO WAY this is AWESOME!!!"]
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample") for text in texts * 3
+    ]
+    parallel_analyzer = VaderSentimentAnalyzer(n_process=2)
+
+    expected_responses = vader_analyzer.analyze_input(
+        source_response_list=source_responses
+    )
+    analyzer_responses = parallel_analyzer.analyze_input(
+        source_response_list=source_responses
+    )
+
+    assert [response.segmented_data for response in analyzer_responses] == [
+        response.segmented_data for response in expected_responses
+    ]
+
+
+def test_vader_scorer_fast_path():
+    scorer = VaderScorer()
+    slow_scorer = VaderScorer(use_fast_path=False)
+
+    for text in TEXTS + ["The table is brown.", "I love it 😁", "kind of", ""]:
+        assert scorer.compound_score(text) == slow_scorer.compound_score(text)
+    assert scorer.compound_score("The table is brown.") == 0.0
+
+
 def test_trf_ner_analyzer(trf_ner_analyzer):
     source_responses = [
         TextPayload(
@@ -140,6 +281,32 @@ def test_trf_ner_analyzer(trf_ner_analyzer):
     assert matched_count == 3
 
 
+def test_trf_ner_analyzer_sliding_window(trf_ner_analyzer):
+    window_analyzer = TransformersNERAnalyzer(
+        model_name_or_path="dbmdz/bert-large-cased-finetuned-conll03-english",
+        tokenizer_name="bert-base-cased",
+        use_sliding_window=True,
+        window_stride=64,
+    )
+    # Entity lies beyond the model maximum length
+    long_text = (
+        "The weather is nice today. " * 150 + "My name is Sam and I live in Berlin."
+    )
+    source_responses = [TextPayload(processed_text=long_text, source_name="sample")]
+
+    truncated_entities = trf_ner_analyzer.analyze_input(
+        source_response_list=source_responses
+    )[0].segmented_data["ner_data"]
+    window_entities = window_analyzer.analyze_input(
+        source_response_list=source_responses
+    )[0].segmented_data["ner_data"]
+
+    assert "Berlin" not in [entity["word"] for entity in truncated_entities]
+    assert {"Sam", "Berlin"} <= {entity["word"] for entity in window_entities}
+    for entity in window_entities:
+        assert long_text[entity["start"] : entity["end"]] == entity["word"]
+
+
 def test_spacy_ner_analyzer(spacy_ner_analyzer):
     source_responses = [
         TextPayload(
@@ -163,3 +330,178 @@ def test_spacy_ner_analyzer(spacy_ner_analyzer):
             matched_count = matched_count + 1
 
     assert matched_count == 3
+
+
+def test_spacy_ner_analyzer_parallel(spacy_ner_analyzer):
+    texts = [
+        "My name is Sam and I live in Berlin, Germany.",
+        "Peter is travelling to Paris next week.",
+        "The table is brown",
+    ]
+    source_responses = [
+        TextPayload(
+            processed_text=text, source_name="sample", segmented_data={"index": idx}
+        )
+        for idx, text in enumerate(texts * 5)
+    ]
+    parallel_analyzer = SpacyNERAnalyzer(
+        model_name_or_path="en_core_web_sm", n_process=2
+    )
+
+    expected_responses = spacy_ner_analyzer.analyze_input(
+        source_response_list=source_responses
+    )
+    # Second call reuses already started workers
+    for _ in range(2):
+        analyzer_responses = parallel_analyzer.analyze_input(
+            source_response_list=source_responses
+        )
+        assert [response.segmented_data for response in analyzer_responses] == [
+            response.segmented_data for response in expected_responses
+        ]
+
+
+def test_text_classification_analyzer_inference_cache(text_classification_analyzer):
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample")
+        for text in BUY_SELL_TEXTS + BUY_SELL_TEXTS
+    ]
+    analyzer_config = ClassificationAnalyzerConfig()
+    expected_responses = text_classification_analyzer.analyze_input(
+        source_response_list=source_responses,
+        analyzer_config=analyzer_config,
+    )
+
+    inference_cache = InMemoryInferenceCache()
+    text_classification_analyzer.inference_cache = inference_cache
+    try:
+        for _ in range(2):
+            analyzer_responses = text_classification_analyzer.analyze_input(
+                source_response_list=source_responses,
+                analyzer_config=analyzer_config,
+            )
+            for analyzer_response, expected_response in zip(
+                analyzer_responses, expected_responses
+            ):
+                assert analyzer_response.segmented_data[
+                    "classifier_data"
+                ] == pytest.approx(expected_response.segmented_data["classifier_data"])
+    finally:
+        text_classification_analyzer.inference_cache = None
+
+    assert inference_cache.misses == len(BUY_SELL_TEXTS)
+    assert inference_cache.hits == len(BUY_SELL_TEXTS)
+    assert inference_cache.size() == len(BUY_SELL_TEXTS)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_text_classification_analyzer_onnx_backend(tmp_path, quantize):
+    pytest.importorskip("onnxruntime")
+    model_name_or_path = "obsei-ai/sell-buy-intent-classifier-bert-mini"
+    onnx_analyzer = TextClassificationAnalyzer(
+        model_name_or_path=model_name_or_path,
+        backend="onnx",
+        quantize=quantize,
+        onnx_cache_dir=str(tmp_path),
+    )
+    pytorch_analyzer = TextClassificationAnalyzer(model_name_or_path=model_name_or_path)
+
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample")
+        for text in BUY_SELL_TEXTS
+    ]
+    analyzer_config = ClassificationAnalyzerConfig()
+    onnx_responses = onnx_analyzer.analyze_input(
+        source_response_list=source_responses, analyzer_config=analyzer_config
+    )
+    pytorch_responses = pytorch_analyzer.analyze_input(
+        source_response_list=source_responses, analyzer_config=analyzer_config
+    )
+
+    model_dir = onnx_model_dir(
+        model_name_or_path,
+        AutoConfig.from_pretrained(model_name_or_path),
+        str(tmp_path),
+    )
+    assert (model_dir / "model.onnx").exists()
+    assert (model_dir / "model.quant.onnx").exists() == quantize
+    for onnx_response, pytorch_response in zip(onnx_responses, pytorch_responses):
+        onnx_scores = onnx_response.segmented_data["classifier_data"]
+        pytorch_scores = pytorch_response.segmented_data["classifier_data"]
+        assert onnx_scores.keys() == pytorch_scores.keys()
+        if not quantize:
+            assert list(onnx_scores.values()) == pytest.approx(
+                list(pytorch_scores.values()), abs=1e-4
+            )
+
+    # Interrupted export or quantization leave no temporary files behind
+    assert not list(model_dir.glob("*.tmp.onnx"))
+    # Analyzers with different cache directory do not share the ONNX session
+    other_onnx_analyzer = TextClassificationAnalyzer(
+        model_name_or_path=model_name_or_path,
+        backend="onnx",
+        quantize=quantize,
+        onnx_cache_dir=str(tmp_path / "other"),
+    )
+    assert other_onnx_analyzer._pipeline is not onnx_analyzer._pipeline
+
+
+def test_onnx_model_dir_is_keyed_by_revision_and_opset(tmp_path):
+    model_path = tmp_path / "models" / "classifier"
+    model_path.mkdir(parents=True)
+    config = PretrainedConfig()
+    config.save_pretrained(str(model_path))
+    cache_dir = str(tmp_path / "onnx")
+
+    model_dir = onnx_model_dir(str(model_path), config, cache_dir)
+    assert model_dir == onnx_model_dir(str(model_path), config, cache_dir)
+    # Other ONNX opset is exported again instead of reusing stale export
+    assert model_dir != onnx_model_dir(
+        str(model_path), config, cache_dir, ONNX_OPSET_VERSION + 1
+    )
+    # Updated local model is exported again
+    (model_path / "model.safetensors").write_bytes(b"weights")
+    assert model_dir != onnx_model_dir(str(model_path), config, cache_dir)
+
+    # Hub model is keyed by its commit hash
+    config._commit_hash = "0" * 40
+    hub_model_dir = onnx_model_dir("obsei-ai/classifier", config, cache_dir)
+    assert hub_model_dir.parent.name == "obsei-ai_classifier"
+    config._commit_hash = "1" * 40
+    assert hub_model_dir != onnx_model_dir("obsei-ai/classifier", config, cache_dir)
+
+
+@pytest.mark.parametrize("window_aggregation", ["mean", "max"])
+def test_text_classification_analyzer_sliding_window(
+    text_classification_analyzer, window_aggregation
+):
+    window_analyzer = TextClassificationAnalyzer(
+        model_name_or_path="obsei-ai/sell-buy-intent-classifier-bert-mini",
+        use_sliding_window=True,
+        window_stride=64,
+        window_aggregation=window_aggregation,
+    )
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample")
+        for text in BUY_SELL_TEXTS + [" ".join([SELL_INTENT] * 100)]
+    ]
+    analyzer_config = ClassificationAnalyzerConfig()
+
+    window_responses = window_analyzer.analyze_input(
+        source_response_list=source_responses, analyzer_config=analyzer_config
+    )
+    truncated_responses = text_classification_analyzer.analyze_input(
+        source_response_list=source_responses, analyzer_config=analyzer_config
+    )
+
+    assert len(window_responses) == len(source_responses)
+    # Short texts fit in a single window hence same as truncation
+    for window_response, truncated_response in zip(
+        window_responses[:-1], truncated_responses[:-1]
+    ):
+        window_scores = window_response.segmented_data["classifier_data"]
+        truncated_scores = truncated_response.segmented_data["classifier_data"]
+        assert window_scores.keys() == truncated_scores.keys()
+        for label, score in window_scores.items():
+            assert score == pytest.approx(truncated_scores[label], abs=1e-4)
+    assert "LABEL_0" in window_responses[-1].segmented_data["classifier_data"]
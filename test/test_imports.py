@@ -35,16 +35,46 @@ def test_sink():
 
 def test_analyzer():
     from obsei.analyzer.base_analyzer import BaseAnalyzer, BaseAnalyzerConfig
+    from obsei.analyzer.model_registry import (
+        ModelRegistry,
+        ModelRegistryEntry,
+        model_registry,
+    )
+    from obsei.analyzer.inference_cache import (
+        BaseInferenceCache,
+        InMemoryInferenceCache,
+        SQLiteInferenceCache,
+    )
+    from obsei.analyzer.onnx_runtime import (
+        OnnxSequenceClassificationModel,
+        OnnxTextClassificationPipeline,
+    )
+    from obsei.analyzer.tokenization import (
+        classification_probabilities,
+        top_labels,
+        max_token_length,
+        pad_encodings,
+        tokenize_texts,
+        aggregate_windows,
+        merge_token_windows,
+    )
+    from obsei.analyzer.language_detector import (
+        BaseLanguageDetector,
+        ScriptStopwordLanguageDetector,
+    )
     from obsei.analyzer.dummy_analyzer import DummyAnalyzer, DummyAnalyzerConfig
     from obsei.analyzer.ner_analyzer import TransformersNERAnalyzer, SpacyNERAnalyzer
     from obsei.analyzer.pii_analyzer import PresidioPIIAnalyzer, PresidioPIIAnalyzerConfig, PresidioAnonymizerConfig, PresidioModelConfig, PresidioEngineConfig
-    from obsei.analyzer.sentiment_analyzer import VaderSentimentAnalyzer, TransformersSentimentAnalyzerConfig, TransformersSentimentAnalyzer
-    from obsei.analyzer.translation_analyzer import TranslationAnalyzer
+    from obsei.analyzer.sentiment_analyzer import VaderSentimentAnalyzer, TransformersSentimentAnalyzerConfig, TransformersSentimentAnalyzer, \
+        VaderScorer
+    from obsei.analyzer.translation_analyzer import TranslationAnalyzer, TranslationAnalyzerConfig
     from obsei.analyzer.classification_analyzer import ClassificationAnalyzerConfig, ZeroShotClassificationAnalyzer, TextClassificationAnalyzer
 
     from obsei.postprocessor.base_postprocessor import BasePostprocessor, BasePostprocessorConfig
-    from obsei.postprocessor.inference_aggregator import InferenceAggregatorConfig, InferenceAggregator
-    from obsei.postprocessor.inference_aggregator_function import BaseInferenceAggregateFunction, ClassificationAverageScore, ClassificationMaxCategories
+    from obsei.postprocessor.inference_aggregator import InferenceAggregatorConfig, InferenceAggregator, \
+        StreamingInferenceAggregator
+    from obsei.postprocessor.inference_aggregator_function import BaseInferenceAggregateFunction, ClassificationAverageScore, ClassificationMaxCategories, \
+        ClassificationAggregateFunction, ScoreMatrixBuilder, segment_starts
 
     from obsei.preprocessor.base_preprocessor import BaseTextPreprocessor, BaseTextProcessorConfig
     from obsei.preprocessor.text_cleaner import TextCleaner, TextCleanerConfig
@@ -52,14 +82,23 @@ def test_analyzer():
     from obsei.preprocessor.text_tokenizer import BaseTextTokenizer, NLTKTextTokenizer
     from obsei.preprocessor.text_cleaning_function import TextCleaningFunction, ToLowerCase, RemoveStopWords, \
         RemovePunctuation, TokenStemming, RemoveSpecialChars, RemoveWhiteSpaceAndEmptyToken, DecodeUnicode, \
-        RemoveDateTime, ReplaceDomainKeywords, RegExSubstitute, SpacyLemmatization
+        RemoveDateTime, ReplaceDomainKeywords, RegExSubstitute, SpacyLemmatization, RegExRemoveDateTime
 
 
 def test_core():
     from obsei.configuration import ObseiConfiguration
     from obsei.payload import BasePayload, TextPayload
     from obsei.processor import Processor
+    from obsei.executor import ConcurrentExecutor, StageMetrics
 
     from obsei.workflow.base_store import BaseStore
     from obsei.workflow.store import WorkflowStore, WorkflowTable
     from obsei.workflow.workflow import Workflow, WorkflowState, WorkflowConfig
+    from obsei.workflow.scheduler import (
+        WorkflowScheduler,
+        WorkflowRunStats,
+        ScheduledWorkflow,
+    )
+
+    from obsei.misc.process_util import PersistentProcessPool, chunkify
+    from obsei.misc.aho_corasick import AhoCorasickAutomaton
@@ -1,4 +1,151 @@
-
-# TDB
 # There are few more iteration required before stablizing this module (specially input and output configuration)
 # Few things are already being tested in test_classification_analyzer_with_splitter_aggregator function
+import pytest
+
+from obsei.payload import TextPayload
+from obsei.postprocessor.inference_aggregator import (
+    InferenceAggregator,
+    InferenceAggregatorConfig,
+    StreamingInferenceAggregator,
+)
+from obsei.postprocessor.inference_aggregator_function import (
+    ClassificationAverageScore,
+    ClassificationMaxCategories,
+)
+from obsei.preprocessor.text_splitter import TextSplitterPayload
+
+
+def _chunk(document_id, chunk_id, text, classifier_data):
+    return TextPayload(
+        processed_text=text,
+        source_name="sample",
+        segmented_data={"classifier_data": classifier_data},
+        meta={
+            "document": document_id,
+            "splitter": TextSplitterPayload(
+                phrase=text,
+                chunk_id=chunk_id,
+                chunk_length=len(text),
+                document_id=document_id,
+                total_chunks=2,
+            ),
+        },
+    )
+
+
+# Chunks of two documents in shuffled order, second document has different labels per chunk
+CHUNKS = [
+    _chunk("doc_2", 1, "ccc", {"buy": 0.9}),
+    _chunk("doc_1", 1, "bbb", {"positive": 0.4, "negative": 0.6}),
+    _chunk("doc_2", 0, "d", {"sell": 0.7, "buy": 0.2}),
+    _chunk("doc_1", 0, "a", {"positive": 0.8, "negative": 0.2}),
+]
+
+
+def test_average_score():
+    aggregated = InferenceAggregator().postprocess_input(
+        input_list=CHUNKS,
+        config=InferenceAggregatorConfig(
+            aggregate_function=ClassificationAverageScore()
+        ),
+    )
+
+    assert [payload.processed_text for payload in aggregated] == ["d ccc", "a bbb"]
+    assert aggregated[0].meta == {"document": "doc_2"}
+    # Scores are weighted by chunk length
+    assert aggregated[0].segmented_data["aggregator_data"][
+        "avg_score"
+    ] == pytest.approx({"sell": 0.7 * 0.25, "buy": 0.2 * 0.25 + 0.9 * 0.75})
+    assert aggregated[1].segmented_data["aggregator_data"][
+        "avg_score"
+    ] == pytest.approx(
+        {"positive": 0.8 * 0.25 + 0.4 * 0.75, "negative": 0.2 * 0.25 + 0.6 * 0.75}
+    )
+
+
+def test_max_categories():
+    aggregated = InferenceAggregator().postprocess_input(
+        input_list=CHUNKS,
+        config=InferenceAggregatorConfig(
+            aggregate_function=ClassificationMaxCategories(score_threshold=0.5)
+        ),
+    )
+
+    assert aggregated[0].segmented_data["aggregator_data"]["category_count"] == {
+        "sell": 1,
+        "buy": 1,
+    }
+    assert aggregated[0].segmented_data["aggregator_data"][
+        "max_scores"
+    ] == pytest.approx({"sell": 0.7, "buy": 0.9})
+    assert aggregated[1].segmented_data["aggregator_data"]["category_count"] == {
+        "positive": 1,
+        "negative": 1,
+    }
+    assert aggregated[1].segmented_data["aggregator_data"][
+        "max_scores"
+    ] == pytest.approx({"positive": 0.8, "negative": 0.6})
+
+
+def test_non_classification_payload_is_not_aggregated():
+    chunks = [TextPayload(processed_text="no classifier data", source_name="sample")]
+    aggregated = InferenceAggregator().postprocess_input(
+        input_list=chunks,
+        config=InferenceAggregatorConfig(
+            aggregate_function=ClassificationAverageScore()
+        ),
+    )
+    assert aggregated == chunks
+
+
+def test_streaming_aggregator():
+    aggregator = StreamingInferenceAggregator()
+    config = InferenceAggregatorConfig(aggregate_function=ClassificationAverageScore())
+    batch_aggregated = InferenceAggregator().postprocess_input(
+        input_list=CHUNKS, config=config
+    )
+
+    # Each document is emitted once all of it's chunks arrived
+    assert aggregator.postprocess_input(input_list=CHUNKS[:2], config=config) == []
+    assert aggregator.pending_documents == 2
+    first_aggregated = aggregator.postprocess_input(
+        input_list=CHUNKS[2:3], config=config
+    )
+    assert first_aggregated == batch_aggregated[:1]
+    # Redelivered chunk is not counted twice
+    assert aggregator.postprocess_input(input_list=CHUNKS[1:2], config=config) == []
+    assert (
+        aggregator.postprocess_input(input_list=CHUNKS[3:], config=config)
+        == batch_aggregated[1:]
+    )
+    assert aggregator.pending_documents == 0
+    assert aggregator.flush(config) == []
+
+
+def test_streaming_aggregator_flush():
+    aggregator = StreamingInferenceAggregator(max_pending_documents=1)
+    config = InferenceAggregatorConfig(aggregate_function=ClassificationMaxCategories())
+
+    # Oldest document is aggregated partially when pending documents exceed the limit
+    evicted = aggregator.postprocess_input(input_list=CHUNKS[:2], config=config)
+    assert [payload.processed_text for payload in evicted] == ["ccc"]
+    assert aggregator.pending_documents == 1
+
+    flushed = aggregator.flush(config)
+    assert [payload.processed_text for payload in flushed] == ["bbb"]
+    assert aggregator.pending_documents == 0
+
+
+def test_streaming_aggregator_drops_late_chunks():
+    aggregator = StreamingInferenceAggregator(max_pending_documents=1)
+    config = InferenceAggregatorConfig(aggregate_function=ClassificationAverageScore())
+
+    # "doc_2" is evicted by "doc_1" and emitted partially
+    evicted = aggregator.postprocess_input(input_list=CHUNKS[:2], config=config)
+    assert [payload.processed_text for payload in evicted] == ["ccc"]
+
+    # Late chunk of "doc_2" is dropped instead of opening new pending document
+    completed = aggregator.postprocess_input(input_list=CHUNKS[2:], config=config)
+    assert [payload.processed_text for payload in completed] == ["a bbb"]
+    assert aggregator.pending_documents == 0
+    assert aggregator.flush(config) == []
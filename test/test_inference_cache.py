@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from obsei.analyzer.classification_analyzer import TextClassificationAnalyzer
+from obsei.analyzer.dummy_analyzer import DummyAnalyzer
+from obsei.analyzer.inference_cache import (
+    InMemoryInferenceCache,
+    SQLiteInferenceCache,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def inference_cache(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryInferenceCache()
+    return SQLiteInferenceCache(database_path=str(tmp_path / "cache.db"))
+
+
+def test_inference_cache_get_set(inference_cache):
+    key = inference_cache.build_key("some text", "model-a")
+
+    assert key != inference_cache.build_key("some text", "model-b")
+    assert inference_cache.get(key) is None
+
+    inference_cache.set(key, {"positive": np.float32(0.5)})
+    assert inference_cache.get(key) == {"positive": 0.5}
+    assert inference_cache.get_stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    inference_cache.clear()
+    assert inference_cache.size() == 0
+
+
+def test_in_memory_inference_cache_eviction():
+    inference_cache = InMemoryInferenceCache(max_size=2)
+    inference_cache.set("a", 1)
+    inference_cache.set("b", 2)
+    # Touch "a" so "b" become least recently used
+    assert inference_cache.get("a") == 1
+    inference_cache.set("c", 3)
+
+    assert inference_cache.get("b") is None
+    assert inference_cache.get("a") == 1
+    assert inference_cache.get("c") == 3
+
+
+def test_sqlite_inference_cache_persistence(tmp_path):
+    database_path = str(tmp_path / "cache.db")
+    inference_cache = SQLiteInferenceCache(database_path=database_path)
+    inference_cache.set("key", [{"entity_group": "PER", "score": 0.9}])
+    inference_cache.close()
+
+    reopened_cache = SQLiteInferenceCache(database_path=database_path)
+    assert reopened_cache.get("key") == [{"entity_group": "PER", "score": 0.9}]
+
+
+def test_analyzer_cached_inference(inference_cache):
+    analyzer = DummyAnalyzer(inference_cache=inference_cache)
+    inferred_texts = []
+
+    def inference_fn(texts):
+        inferred_texts.extend(texts)
+        return [{"length": len(text)} for text in texts]
+
+    texts = ["one", "three", "one"]
+    first = analyzer._cached_inference(texts, inference_fn, fingerprint="dummy")
+    second = analyzer._cached_inference(texts, inference_fn, fingerprint="dummy")
+
+    assert first == second == [{"length": 3}, {"length": 5}, {"length": 3}]
+    # Duplicate texts are inferred only once and second call is fully cached
+    assert inferred_texts == ["one", "three"]
+    assert inference_cache.hits == 3
+    assert inference_cache.misses == 2
+
+
+@pytest.mark.parametrize(
+    "backend, quantize", [("pytorch", False), ("onnx", False), ("onnx", True)]
+)
+def test_classification_cache_fingerprint_backend(inference_cache, backend, quantize):
+    # Fingerprint need no loaded model
+    pytorch_analyzer = TextClassificationAnalyzer.model_construct(
+        model_name_or_path="model-a"
+    )
+    analyzer = TextClassificationAnalyzer.model_construct(
+        model_name_or_path="model-a", backend=backend, quantize=quantize
+    )
+    inference_cache.set(
+        inference_cache.build_key("some text", pytorch_analyzer._cache_fingerprint()),
+        {"buy": 0.9},
+    )
+
+    cached = inference_cache.get(
+        inference_cache.build_key("some text", analyzer._cache_fingerprint())
+    )
+    if backend == "pytorch":
+        assert cached == {"buy": 0.9}
+    else:
+        assert cached is None
+        assert (
+            analyzer._cache_fingerprint()
+            != TextClassificationAnalyzer.model_construct(
+                model_name_or_path="model-a", backend=backend, quantize=not quantize
+            )._cache_fingerprint()
+        )
@@ -0,0 +1,33 @@
+import pytest
+
+from obsei.analyzer.language_detector import ScriptStopwordLanguageDetector
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("The app is very good and I like it", "en"),
+        ("Die App ist sehr gut und ich mag sie nicht", "de"),
+        ("La aplicación es muy buena pero no funciona", "es"),
+        ("Cette application est très bien mais pas pour moi", "fr"),
+        ("मुझे सब चीजे बहुत अच्छी लगी ।", "hi"),
+        ("Приложение работает отлично", "ru"),
+        ("このアプリは素晴らしい", "ja"),
+        ("mera naam joker, tera naam kya ?", None),
+        # Single shared function word is not enough evidence
+        ("Fiesta in Barcelona", None),
+        ("Die Hard", None),
+        # Few function words in long text
+        (
+            "Der Bahnhof Zoologischer Garten und Hauptstrasse Charlottenburg Kreuzung "
+            "Berlin Mitte Tiergarten",
+            None,
+        ),
+        ("👍👍👍 12345", None),
+        ("", None),
+    ],
+)
+def test_script_stopword_language_detector(text, expected):
+    detector = ScriptStopwordLanguageDetector()
+
+    assert detector.detect([text]) == [expected]
@@ -0,0 +1,125 @@
+import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import torch
+
+from obsei.analyzer.dummy_analyzer import DummyAnalyzer
+from obsei.analyzer.model_registry import ModelRegistry, model_registry
+
+
+class FakeModel:
+    def __init__(self, parameter_count: int):
+        self.model = torch.nn.Linear(parameter_count, 1, bias=False)
+
+
+def test_registry_reference_counting():
+    registry = ModelRegistry()
+    key = registry.build_key("text-classification", "fake-model", -1)
+    load_calls = []
+
+    def loader():
+        load_calls.append(1)
+        return FakeModel(10)
+
+    first = registry.acquire(key, loader)
+    second = registry.acquire(key, loader)
+
+    assert first is second
+    assert len(load_calls) == 1
+    assert registry.get_stats()[key]["ref_count"] == 2
+    assert registry.total_memory_in_bytes() == 10 * 4
+
+    registry.release(key)
+    assert registry.get_stats()[key]["ref_count"] == 1
+    registry.release(key)
+    assert key not in registry.get_stats()
+
+
+def test_registry_lru_eviction():
+    # Every fake model takes 40 bytes
+    registry = ModelRegistry(max_memory_in_bytes=100)
+    keys = [registry.build_key("ner", f"model-{idx}", -1) for idx in range(3)]
+
+    for key in keys[:2]:
+        registry.acquire(key, lambda: FakeModel(10))
+        registry.release(key)
+
+    # Unreferenced models are kept as long as they fit
+    assert set(registry.get_stats().keys()) == set(keys[:2])
+
+    # Touch first model so second one become least recently used
+    registry.acquire(keys[0], lambda: FakeModel(10))
+    registry.release(keys[0])
+
+    registry.acquire(keys[2], lambda: FakeModel(10))
+    assert set(registry.get_stats().keys()) == {keys[0], keys[2]}
+
+
+def test_registry_never_evicts_referenced_models():
+    registry = ModelRegistry(max_memory_in_bytes=10)
+    key = registry.build_key("ner", "model", -1)
+
+    model = registry.acquire(key, lambda: FakeModel(10))
+
+    assert registry.acquire(key, lambda: FakeModel(10)) is model
+    assert registry.get_stats()[key]["ref_count"] == 2
+
+
+def test_analyzer_releases_model_on_garbage_collection():
+    analyzer = DummyAnalyzer()
+    model = analyzer._load_model(
+        task="dummy", model_name_or_path="dummy-model", loader=lambda: FakeModel(1)
+    )
+    key = model_registry.build_key("dummy", "dummy-model", analyzer._device_id)
+    assert model_registry.get_stats()[key]["ref_count"] == 1
+
+    del analyzer
+    gc.collect()
+    assert key not in model_registry.get_stats()
+    assert model is not None
+
+
+def test_registry_loads_outside_of_lock():
+    registry = ModelRegistry()
+    slow_key = registry.build_key("ner", "slow-model", -1)
+    fast_key = registry.build_key("ner", "fast-model", -1)
+    slow_loading_started = threading.Event()
+    release_slow_loading = threading.Event()
+    load_calls = []
+
+    def slow_loader():
+        load_calls.append(slow_key)
+        slow_loading_started.set()
+        release_slow_loading.wait(timeout=5)
+        return FakeModel(10)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        slow_models = [executor.submit(registry.acquire, slow_key, slow_loader)]
+        assert slow_loading_started.wait(timeout=5)
+        # Second caller of the same key waits for the first load
+        slow_models.append(executor.submit(registry.acquire, slow_key, slow_loader))
+        # Other model is loaded while slow model is still loading
+        fast_model = registry.acquire(fast_key, lambda: FakeModel(10))
+        assert not release_slow_loading.is_set()
+        release_slow_loading.set()
+
+        assert slow_models[0].result() is slow_models[1].result()
+
+    assert fast_model is not slow_models[0].result()
+    assert load_calls == [slow_key]
+    assert registry.get_stats()[slow_key]["ref_count"] == 2
+
+
+def test_registry_load_failure_is_not_cached():
+    registry = ModelRegistry()
+    key = registry.build_key("ner", "broken-model", -1)
+
+    def failing_loader():
+        raise RuntimeError("unable to load")
+
+    with pytest.raises(RuntimeError):
+        registry.acquire(key, failing_loader)
+    assert key not in registry.get_stats()
+    assert registry.acquire(key, lambda: FakeModel(10)) is not None
@@ -0,0 +1,34 @@
+from pandas import DataFrame
+
+from obsei.source.pandas_source import PandasSource, PandasSourceConfig
+
+
+def test_pandas_source_lookup_stream():
+    dataframe = DataFrame(
+        {
+            "title": [f"title {idx}" for idx in range(5)],
+            "body": [f"body {idx}" for idx in range(5)],
+            "rating": list(range(5)),
+        }
+    )
+    source_config = PandasSourceConfig(
+        dataframe=dataframe,
+        text_columns=["title", "body"],
+        include_columns=["rating"],
+    )
+    # Chunk size not dividing number of rows, last chunk is partial
+    source = PandasSource(stream_chunk_size=2)
+
+    streamed_responses = list(source.lookup_stream(source_config))
+    responses = source.lookup(source_config)
+
+    assert len(streamed_responses) == len(dataframe)
+    assert [response.processed_text for response in streamed_responses] == [
+        f"title {idx} body {idx}" for idx in range(5)
+    ]
+    assert [response.meta for response in streamed_responses] == [
+        {"rating": idx} for idx in range(5)
+    ]
+    assert [response.processed_text for response in streamed_responses] == [
+        response.processed_text for response in responses
+    ]
@@ -86,3 +86,26 @@ def test_pii_analyzer_analyze_only(pii_analyzer):
         assert analyzer_response.segmented_data["pii_data"]["anonymized_result"] is None
 
         assert text == analyzer_response.processed_text
+
+
+def test_pii_analyzer_batch(pii_analyzer):
+    analyzer_config = PresidioPIIAnalyzerConfig(
+        analyze_only=False, replace_original_text=True
+    )
+    texts = [text_to_anonymize, "", "Nothing personal here", text_to_anonymize]
+
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample") for text in texts
+    ]
+    analyzer_responses = pii_analyzer.analyze_input(
+        source_response_list=source_responses, analyzer_config=analyzer_config
+    )
+    assert len(analyzer_responses) == len(texts)
+
+    assert analyzer_responses[1].processed_text == ""
+    assert analyzer_responses[1].segmented_data["pii_data"]["analyzer_result"] == []
+    assert analyzer_responses[2].processed_text == "Nothing personal here"
+    for analyzer_response in [analyzer_responses[0], analyzer_responses[3]]:
+        for pii_info in PII_LIST:
+            assert pii_info not in analyzer_response.processed_text
+    assert analyzer_responses[0].processed_text == analyzer_responses[3].processed_text
@@ -0,0 +1,192 @@
+from typing import Any, Generator, List, Optional, Tuple
+
+import pytest
+
+from obsei.analyzer.dummy_analyzer import DummyAnalyzer, DummyAnalyzerConfig
+from obsei.executor import ConcurrentExecutor
+from obsei.payload import TextPayload
+from obsei.postprocessor.inference_aggregator import (
+    InferenceAggregatorConfig,
+    StreamingInferenceAggregator,
+)
+from obsei.postprocessor.inference_aggregator_function import (
+    ClassificationAverageScore,
+)
+from obsei.preprocessor.text_splitter import TextSplitterPayload
+from obsei.processor import Processor
+from obsei.sink.base_sink import BaseSink, BaseSinkConfig
+from obsei.source.base_source import BaseSource, BaseSourceConfig
+
+TEXTS = [f"text number {idx}" for idx in range(10)]
+
+
+class CountingSource(BaseSource):
+    yielded_count: int = 0
+
+    def lookup(self, config: BaseSourceConfig, **kwargs: Any) -> List[TextPayload]:
+        return list(self.lookup_stream(config, **kwargs))
+
+    def lookup_stream(
+        self, config: BaseSourceConfig, **kwargs: Any
+    ) -> Generator[TextPayload, None, None]:
+        for text in TEXTS:
+            self.yielded_count += 1
+            yield TextPayload(processed_text=text, source_name="sample")
+
+
+class ChunkSource(CountingSource):
+    # (document id, chunk id, total chunks), chunks of "doc_1" span micro batches
+    chunks: List[Tuple[str, int, int]] = [
+        ("doc_1", 0, 2),
+        ("doc_2", 0, 1),
+        ("doc_3", 0, 3),
+        ("doc_1", 1, 2),
+        ("doc_3", 1, 3),
+    ]
+
+    def lookup_stream(
+        self, config: BaseSourceConfig, **kwargs: Any
+    ) -> Generator[TextPayload, None, None]:
+        for document_id, chunk_id, total_chunks in self.chunks:
+            self.yielded_count += 1
+            text = f"{document_id} chunk {chunk_id}"
+            yield TextPayload(
+                processed_text=text,
+                source_name="sample",
+                segmented_data={"classifier_data": {"positive": 1.0}},
+                meta={
+                    "splitter": TextSplitterPayload(
+                        phrase=text,
+                        chunk_id=chunk_id,
+                        chunk_length=len(text),
+                        document_id=document_id,
+                        total_chunks=total_chunks,
+                    )
+                },
+            )
+
+
+class RecordingSink(BaseSink):
+    batches: List[List[TextPayload]] = []
+    source_count_on_send: List[int] = []
+    source: CountingSource
+
+    def send_data(
+        self,
+        analyzer_responses: List[TextPayload],
+        config: BaseSinkConfig,
+        **kwargs: Any,
+    ) -> Any:
+        self.batches.append(analyzer_responses)
+        self.source_count_on_send.append(self.source.yielded_count)
+        return analyzer_responses
+
+
+class FailingSink(BaseSink):
+    def send_data(
+        self,
+        analyzer_responses: List[TextPayload],
+        config: BaseSinkConfig,
+        **kwargs: Any,
+    ) -> Any:
+        raise RuntimeError("sink failed")
+
+
+def _processor(
+    stream: bool = False, executor: Optional[ConcurrentExecutor] = None
+) -> Processor:
+    source = CountingSource()
+    return Processor(
+        source=source,
+        source_config=BaseSourceConfig(),
+        analyzer=DummyAnalyzer(),
+        analyzer_config=DummyAnalyzerConfig(dummy_data="dummy"),
+        sink=RecordingSink(source=source),
+        sink_config=BaseSinkConfig(),
+        stream=stream,
+        stream_batch_size=3,
+        executor=executor,
+    )
+
+
+def test_process_without_stream():
+    processor = _processor(stream=False)
+    processor.process()
+
+    assert len(processor.sink.batches) == 1
+    assert [payload.processed_text for payload in processor.sink.batches[0]] == TEXTS
+
+
+def test_process_with_stream():
+    processor = _processor(stream=True)
+    processor.process()
+
+    batches = processor.sink.batches
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [payload.processed_text for batch in batches for payload in batch] == TEXTS
+    for batch in batches:
+        for payload in batch:
+            assert payload.segmented_data["dummy_data"] == "dummy"
+
+    # Sink should receive first batch before source is exhausted
+    assert processor.sink.source_count_on_send == [3, 6, 9, 10]
+
+
+def test_process_stream_with_aggregator():
+    source = ChunkSource()
+    processor = Processor(
+        source=source,
+        source_config=BaseSourceConfig(),
+        analyzer=DummyAnalyzer(),
+        sink=RecordingSink(source=source),
+        sink_config=BaseSinkConfig(),
+        stream=True,
+        stream_batch_size=2,
+        aggregator=StreamingInferenceAggregator(),
+        aggregator_config=InferenceAggregatorConfig(
+            aggregate_function=ClassificationAverageScore()
+        ),
+    )
+    processor.process()
+
+    # Documents are sent once all of their chunks arrived, incomplete "doc_3" is
+    # flushed at the end of stream
+    batches = processor.sink.batches
+    assert [[payload.processed_text for payload in batch] for batch in batches] == [
+        ["doc_2 chunk 0"],
+        ["doc_1 chunk 0 doc_1 chunk 1"],
+        ["doc_3 chunk 0 doc_3 chunk 1"],
+    ]
+    assert processor.sink.source_count_on_send == [2, 4, 5]
+    for batch in batches:
+        assert "aggregator_data" in batch[0].segmented_data
+    assert processor.aggregator.pending_documents == 0
+
+
+def test_process_with_concurrent_executor():
+    executor = ConcurrentExecutor(queue_size=1, batch_size=4)
+    processor = _processor(executor=executor)
+    processor.process()
+
+    batches = processor.sink.batches
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [payload.processed_text for batch in batches for payload in batch] == TEXTS
+
+    metrics = executor.get_metrics()
+    assert metrics.keys() == {"source", "analyzer", "sink"}
+    for stage_metrics in metrics.values():
+        assert stage_metrics.batch_count == 3
+        assert stage_metrics.payload_count == len(TEXTS)
+        assert stage_metrics.max_queue_depth <= 1
+
+
+def test_concurrent_executor_propagates_stage_error():
+    executor = ConcurrentExecutor(queue_size=1, batch_size=1)
+    with pytest.raises(RuntimeError, match="sink failed"):
+        executor.execute(
+            source=CountingSource(),
+            source_config=BaseSourceConfig(),
+            analyzer=DummyAnalyzer(),
+            sink=FailingSink(),
+            sink_config=BaseSinkConfig(),
+        )
@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Any, List, Optional
+
+import pytest
+from pydantic import PrivateAttr
+
+from obsei.analyzer.dummy_analyzer import DummyAnalyzer, DummyAnalyzerConfig
+from obsei.payload import TextPayload
+from obsei.sink.base_sink import BaseSink, BaseSinkConfig
+from obsei.source.base_source import BaseSource, BaseSourceConfig
+from obsei.workflow.scheduler import WorkflowScheduler
+from obsei.workflow.workflow import Workflow, WorkflowConfig
+
+
+class SourceActivity:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+
+@pytest.fixture
+def source_activity():
+    return SourceActivity()
+
+
+class SlowSource(BaseSource):
+    delay_in_seconds: float = 0.05
+    _activity: Optional[SourceActivity] = PrivateAttr(default=None)
+
+    def __init__(self, activity: Optional[SourceActivity] = None, **data: Any):
+        super().__init__(**data)
+        self._activity = activity
+
+    def lookup(self, config: BaseSourceConfig, **kwargs: Any) -> List[TextPayload]:
+        activity = self._activity or SourceActivity()
+        with activity.lock:
+            activity.active += 1
+            activity.max_active = max(activity.max_active, activity.active)
+        time.sleep(self.delay_in_seconds)
+        with activity.lock:
+            activity.active -= 1
+        return [TextPayload(processed_text=f"workflow {kwargs.get('id')}")]
+
+
+class CollectingSink(BaseSink):
+    received: List[str] = []
+
+    def send_data(
+        self,
+        analyzer_responses: List[TextPayload],
+        config: BaseSinkConfig,
+        **kwargs: Any,
+    ) -> Any:
+        self.received.extend(
+            [response.processed_text for response in analyzer_responses]
+        )
+        return analyzer_responses
+
+
+def _workflow(workflow_id: str, time_in_seconds: int = 60) -> Workflow:
+    return Workflow(
+        id=workflow_id,
+        config=WorkflowConfig(
+            source_config=BaseSourceConfig(),
+            sink_config=BaseSinkConfig(),
+            analyzer_config=DummyAnalyzerConfig(),
+            time_in_seconds=time_in_seconds,
+        ),
+    )
+
+
+def test_scheduler_runs_due_workflows_with_source_limit(source_activity):
+    scheduler = WorkflowScheduler(max_workers=4, max_concurrency_per_source=2)
+    analyzer = scheduler.get_analyzer(DummyAnalyzer)
+    sink = CollectingSink()
+
+    now = time.time()
+    for idx in range(4):
+        scheduler.add_workflow(
+            workflow=_workflow(f"wf-{idx}"),
+            source=SlowSource(activity=source_activity),
+            analyzer=analyzer,
+            sink=sink,
+            start_time=now,
+        )
+
+    # Only two workflows can run at once for the same source type
+    assert len(scheduler.run_pending(now=now)) == 2
+    assert scheduler.wait_until_idle(timeout=5)
+    assert len(scheduler.run_pending(now=now)) == 2
+    assert scheduler.wait_until_idle(timeout=5)
+    # Nothing is due until the interval elapses
+    assert scheduler.run_pending(now=now) == []
+    scheduler.stop()
+
+    assert 1 <= source_activity.max_active <= 2
+    assert sorted(sink.received) == [f"workflow wf-{idx}" for idx in range(4)]
+
+    stats = scheduler.get_stats()
+    assert len(stats) == 4
+    for workflow_stats in stats.values():
+        assert workflow_stats.run_count == 1
+        assert workflow_stats.failure_count == 0
+        assert workflow_stats.last_run_duration_in_seconds is not None
+        assert workflow_stats.last_lag_in_seconds is not None
+        assert workflow_stats.next_run_time is not None
+        assert workflow_stats.next_run_time >= now + 60
+
+
+def test_scheduler_shares_analyzer():
+    scheduler = WorkflowScheduler()
+    analyzer = scheduler.get_analyzer(DummyAnalyzer, device="cpu")
+
+    assert scheduler.get_analyzer(DummyAnalyzer, device="cpu") is analyzer
+    assert scheduler.get_analyzer(DummyAnalyzer, batch_size=2) is not analyzer
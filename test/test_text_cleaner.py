@@ -1,8 +1,14 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from obsei.payload import TextPayload
-from obsei.preprocessor.text_cleaner import TextCleanerConfig
+from obsei.preprocessor.text_cleaner import TextCleanerConfig, TextCleaner, compile_cleaning_functions, \
+    _public_state_fingerprint
 from obsei.preprocessor.text_cleaning_function import DecodeUnicode, RemoveDateTime, RemovePunctuation, \
     RemoveSpecialChars, RemoveStopWords, RemoveWhiteSpaceAndEmptyToken, ReplaceDomainKeywords, ToLowerCase, \
-    RegExSubstitute, SpacyLemmatization
+    RegExSubstitute, SpacyLemmatization, TokenStemming, RegExRemoveDateTime
 
 TEXT_WITH_WHITE_SPACES = """        If anyone is interested... these are our hosts. I can’t recommend them enough,
 Abc & Pbc.         """
@@ -79,6 +85,31 @@ def test_remove_date_time(text_cleaner):
     )
 
 
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (TEXT_WITH_DATE_TIME, "Peter drinks likely likes to tea at every"),
+        (
+            "Delivered on 2021-05-15T16:45:00Z, ordered 15/05/2021",
+            "Delivered on , ordered",
+        ),
+        ("See you on Monday at 4 pm or 10:30 a.m. GMT", "See you on at or"),
+        ("I may buy it in March 3, 2020 or in June", "I may buy it in or in"),
+        ("I have 3 cats", "I have 3 cats"),
+    ],
+)
+def test_regex_remove_date_time(text_cleaner, text, expected):
+    request = TextPayload(processed_text=text)
+
+    config = TextCleanerConfig(
+        disable_tokenization=True, cleaning_functions=[RegExRemoveDateTime()]
+    )
+    cleaner_responses = text_cleaner.preprocess_input(
+        config=config, input_list=[request]
+    )
+    assert expected == cleaner_responses[0].processed_text
+
+
 def test_remove_stop_words(text_cleaner):
     request = TextPayload(processed_text=TEXT_WITH_STOP_WORDS)
 
@@ -125,6 +156,77 @@ def test_replace_domain_keywords(text_cleaner):
     )
 
 
+def test_replace_domain_keywords_word_boundaries(text_cleaner):
+    request = TextPayload(processed_text="ML in HTML and ML-ops")
+
+    config = TextCleanerConfig(
+        disable_tokenization=True,
+        cleaning_functions=[
+            ReplaceDomainKeywords(
+                domain_keywords=[("ML", "machine learning")], match_word_boundaries=True
+            )
+        ],
+    )
+
+    cleaner_responses = text_cleaner.preprocess_input(
+        config=config, input_list=[request]
+    )
+    assert (
+        "machine learning in HTML and machine learning-ops"
+        == cleaner_responses[0].processed_text
+    )
+
+
+def test_replace_domain_keywords_overlapping():
+    replace_domain_keywords = ReplaceDomainKeywords(
+        domain_keywords=[
+            ("new york", "NY"),
+            ("york", "Y"),
+            ("new", "N"),
+            ("new", "ignored"),
+        ]
+    )
+
+    # Leftmost longest keyword wins, first target is used for repeated keyword
+    assert replace_domain_keywords.execute(
+        ["new", "york", "and", "new", "delhi", "york"]
+    ) == ["NY", "and", "N", "delhi", "Y"]
+
+
+def test_replace_domain_keywords_reassigned():
+    replace_domain_keywords = ReplaceDomainKeywords(
+        domain_keywords=[("ML", "machine learning")]
+    )
+    assert replace_domain_keywords.execute(["ML", "and", "DL"]) == [
+        "machine",
+        "learning",
+        "and",
+        "DL",
+    ]
+
+    # Stored as tuple, so keywords can't be silently changed in place
+    assert replace_domain_keywords.domain_keywords == (("ML", "machine learning"),)
+    replace_domain_keywords.domain_keywords = [
+        ("ML", "machine learning"),
+        ("DL", "deep learning"),
+    ]
+    assert replace_domain_keywords.execute(["ML", "and", "DL"]) == [
+        "machine",
+        "learning",
+        "and",
+        "deep",
+        "learning",
+    ]
+
+    replace_domain_keywords.domain_keywords = [("ML", "ml"), ("DL", "deep learning")]
+    assert replace_domain_keywords.execute(["ML", "and", "DL"]) == [
+        "ml",
+        "and",
+        "deep",
+        "learning",
+    ]
+
+
 def test_decode_unicode(text_cleaner):
     request = TextPayload(processed_text=TEXT_WITH_UNICODE)
 
@@ -175,3 +277,199 @@ def test_spacy_lemmatizer(text_cleaner):
         'the bat see the cat with good stripe hang upside down by their foot'
         == cleaner_response.processed_text
     )
+
+
+@pytest.mark.parametrize("use_default_cleaning_functions", [True, False])
+def test_compiled_cleaning_functions(text_cleaner, use_default_cleaning_functions):
+    # Built in the test, as `RemoveStopWords` may download NLTK stopwords
+    cleaning_functions = (
+        None
+        if use_default_cleaning_functions
+        else [
+            ToLowerCase(),
+            RegExSubstitute(pattern=r"-", substitute=" "),
+            RemovePunctuation(),
+            DecodeUnicode(),
+            TokenStemming(),
+            RemoveStopWords(language="english"),
+            RemoveSpecialChars(),
+            ReplaceDomainKeywords(domain_keywords=[("ml", "machine learning")]),
+            RemoveWhiteSpaceAndEmptyToken(),
+        ]
+    )
+    texts = [
+        TEXT_WITH_WHITE_SPACES,
+        TEXT_WITH_PUNCTUATION,
+        TEXT_WITH_SPECIAL_CHARACTERS,
+        TEXT_WITH_DATE_TIME,
+        TEXT_WITH_DOMAIN_WORDS,
+        TEXT_WITH_STOP_WORDS,
+        TEXT_WITH_UPPER_CASE,
+        TEXT_WITH_UNICODE,
+        "Obsei-is-a-lowcode-lib ... Café 👍",
+        "",
+    ]
+
+    outputs = {}
+    for compiled in [False, True]:
+        config = TextCleanerConfig(
+            cleaning_functions=cleaning_functions, compile_cleaning_functions=compiled
+        )
+        cleaner_responses = text_cleaner.preprocess_input(
+            config=config,
+            input_list=[TextPayload(processed_text=text) for text in texts],
+        )
+        outputs[compiled] = [response.processed_text for response in cleaner_responses]
+
+    assert outputs[True] == outputs[False]
+
+
+def test_compile_cleaning_functions_fuses_token_functions():
+    stages = compile_cleaning_functions(
+        [
+            ToLowerCase(),
+            RemovePunctuation(),
+            RemoveDateTime(),
+            RemoveSpecialChars(),
+            RemoveWhiteSpaceAndEmptyToken(),
+        ]
+    )
+
+    # Two fused token passes around the date time function
+    assert len(stages) == 3
+    assert stages[0](["Hello", "...", "World!"]) == ["hello", "world"]
+    assert stages[2](["#obsei", "@@", " x "]) == ["obsei", "x"]
+
+
+def test_parallel_text_cleaner(text_cleaner):
+    texts = [
+        TEXT_WITH_WHITE_SPACES,
+        TEXT_WITH_PUNCTUATION,
+        TEXT_WITH_SPECIAL_CHARACTERS,
+        TEXT_WITH_DATE_TIME,
+        TEXT_WITH_STOP_WORDS,
+        TEXT_WITH_UNICODE,
+    ] * 5
+    parallel_cleaner = TextCleaner(n_process=2, chunk_size=4)
+
+    for config in [
+        TextCleanerConfig(),
+        TextCleanerConfig(cleaning_functions=[ToLowerCase()]),
+    ]:
+        expected_responses = text_cleaner.preprocess_input(
+            config=config,
+            input_list=[TextPayload(processed_text=text) for text in texts],
+        )
+        cleaner_responses = parallel_cleaner.preprocess_input(
+            config=config,
+            input_list=[TextPayload(processed_text=text) for text in texts],
+        )
+        assert [response.processed_text for response in cleaner_responses] == [
+            response.processed_text for response in expected_responses
+        ]
+
+
+def test_token_stemming_memo():
+    stemming = TokenStemming(memo_size=2)
+    tokens = ["running", "flies", "running", "dying", "flies"]
+
+    assert stemming.execute(tokens) == [
+        stemming.stemmer.stem(token) for token in tokens
+    ]
+    # "flies" is evicted once "dying" is memoized
+    assert stemming.get_memo_stats() == {
+        "hits": 1,
+        "misses": 4,
+        "size": 2,
+        "hit_rate": 0.2,
+    }
+
+    stemming.clear_memo()
+    assert stemming.get_memo_stats()["size"] == 0
+
+
+def test_token_stemming_memo_threads():
+    stemming = TokenStemming(memo_size=10)
+    tokens = [f"running{idx % 50}" for idx in range(2000)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(stemming.execute, [tokens] * 8))
+
+    assert all(result == results[0] for result in results)
+    memo_stats = stemming.get_memo_stats()
+    assert memo_stats["hits"] + memo_stats["misses"] == len(tokens) * 8
+    assert memo_stats["size"] <= 10
+
+
+def test_token_stemming_memo_is_not_pickled():
+    stemming = TokenStemming()
+    empty_size = len(pickle.dumps(stemming))
+    stemming.execute([f"running{idx}" for idx in range(1000)])
+
+    assert len(pickle.dumps(stemming)) == empty_size
+    unpickled_stemming = pickle.loads(pickle.dumps(stemming))
+    assert unpickled_stemming.get_memo_stats()["size"] == 0
+    assert unpickled_stemming.execute(["running"]) == ["run"]
+
+
+def test_cleaner_fingerprint_ignores_private_state():
+    stemming = TokenStemming()
+    replace_domain_keywords = ReplaceDomainKeywords(
+        domain_keywords=[("ML", "machine learning")]
+    )
+    config = TextCleanerConfig(cleaning_functions=[stemming, replace_domain_keywords])
+    fingerprint = _public_state_fingerprint(config)
+
+    # Lazily built caches do not change the fingerprint
+    stemming.execute(["running", "flies"])
+    replace_domain_keywords._automaton = None
+    assert _public_state_fingerprint(config) == fingerprint
+
+    replace_domain_keywords.domain_keywords = [("DL", "deep learning")]
+    assert _public_state_fingerprint(config) != fingerprint
+
+
+def test_parallel_text_cleaner_reuses_pool():
+    parallel_cleaner = TextCleaner(n_process=2)
+    config = TextCleanerConfig(cleaning_functions=[TokenStemming()])
+    texts = ["running flies", "dying cats"]
+
+    parallel_cleaner.preprocess_input(
+        config=config, input_list=[TextPayload(processed_text=text) for text in texts]
+    )
+    process_pool = parallel_cleaner._process_pool
+    # Single text is cleaned serially and fill the memo in the main process
+    parallel_cleaner.preprocess_input(
+        config=config, input_list=[TextPayload(processed_text="running flies")]
+    )
+    parallel_cleaner.preprocess_input(
+        config=config, input_list=[TextPayload(processed_text=text) for text in texts]
+    )
+    assert parallel_cleaner._process_pool is process_pool
+
+    # In place change of the config restarts workers, same as serial mode sees it
+    config.cleaning_functions.append(ToLowerCase())  # type: ignore[union-attr]
+    parallel_cleaner.preprocess_input(
+        config=config, input_list=[TextPayload(processed_text=text) for text in texts]
+    )
+    assert parallel_cleaner._process_pool is not process_pool
+    process_pool = parallel_cleaner._process_pool
+
+    parallel_cleaner.preprocess_input(
+        config=TextCleanerConfig(cleaning_functions=[ToLowerCase()]),
+        input_list=[TextPayload(processed_text=text) for text in texts],
+    )
+    assert parallel_cleaner._process_pool is not process_pool
+
+
+def test_remove_stop_words_reassigned():
+    remove_stop_words = RemoveStopWords(stop_words=["in", "then"])
+    assert remove_stop_words.execute(["in", "off", "then"]) == ["off"]
+
+    remove_stop_words.stop_words = ["off"]
+    assert remove_stop_words.execute(["in", "off", "then"]) == ["in", "then"]
+
+    # Stored as tuple, so stop words can't be silently changed in place
+    assert remove_stop_words.stop_words == ("off",)
+    remove_stop_words.stop_words = [*remove_stop_words.stop_words, "in"]
+    assert remove_stop_words.execute(["in", "off", "then"]) == ["then"]
@@ -1,6 +1,8 @@
 import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import PreTrainedTokenizerFast
 
-from obsei.preprocessor.text_splitter import TextSplitterConfig
+from obsei.preprocessor.text_splitter import TextSplitterConfig, get_sentence_tokenizer
 from obsei.payload import TextPayload
 
 DOCUMENT_1 = """I love playing console games."""
@@ -95,3 +97,137 @@ def test_sentence_splits(doc, expected_lengths, stride, text_splitter):
         assert "splitter" in text_payload.meta
         splitter_payload = text_payload.meta["splitter"]
         assert splitter_payload.chunk_length == expected_length
+
+
+@pytest.mark.parametrize("stride", [0, 16])
+def test_splits_without_whitespace(stride, text_splitter):
+    # Minified or CJK text, cut at exactly max split length
+    doc = "x" * 300
+    doc_splits = text_splitter.preprocess_input(
+        input_list=[TextPayload(processed_text=doc)],
+        config=TextSplitterConfig(max_split_length=128, split_stride=stride),
+    )
+
+    expected_lengths = [128, 128, 44] if stride == 0 else [128, 128, 76]
+    assert [
+        split.meta["splitter"].chunk_length for split in doc_splits
+    ] == expected_lengths
+
+
+@pytest.mark.parametrize("enable_sentence_split", [False, True])
+def test_split_offsets(enable_sentence_split, text_splitter):
+    doc_splits = text_splitter.preprocess_input(
+        input_list=[TextPayload(processed_text=DOCUMENT_3)],
+        config=TextSplitterConfig(
+            max_split_length=128,
+            split_stride=10,
+            honor_paragraph_boundary=True,
+            enable_sentence_split=enable_sentence_split,
+        ),
+    )
+
+    for text_payload in doc_splits:
+        splitter_payload = text_payload.meta["splitter"]
+        assert (
+            DOCUMENT_3[splitter_payload.start_offset : splitter_payload.end_offset]
+            == splitter_payload.phrase
+        )
+
+
+@pytest.fixture(scope="module")
+def word_level_tokenizer():
+    # Offline fast tokenizer with a token per word and per punctuation
+    tokenizer = Tokenizer(models.WordLevel(vocab={"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer)
+
+
+@pytest.mark.parametrize("stride", [0, 8])
+def test_token_splits(stride, text_splitter, word_level_tokenizer):
+    docs = [DOCUMENT_1, DOCUMENT_2, DOCUMENT_3]
+    doc_splits = text_splitter.preprocess_input(
+        input_list=[TextPayload(processed_text=doc) for doc in docs],
+        config=TextSplitterConfig(
+            max_split_length=64,
+            split_stride=stride,
+            honor_paragraph_boundary=True,
+            split_unit="token",
+        ),
+        tokenizer=word_level_tokenizer,
+    )
+
+    splits_per_doc = {}
+    for text_payload in doc_splits:
+        splitter_payload = text_payload.meta["splitter"]
+        splits_per_doc.setdefault(splitter_payload.document_id, []).append(
+            splitter_payload
+        )
+        token_count = len(
+            word_level_tokenizer(splitter_payload.phrase, add_special_tokens=False)[
+                "input_ids"
+            ]
+        )
+        assert 0 < token_count <= 64
+
+    assert len(splits_per_doc) == len(docs)
+    for doc, splits in zip(docs, splits_per_doc.values()):
+        assert splits[0].total_chunks == len(splits)
+        for split in splits:
+            assert doc[split.start_offset : split.end_offset] == split.phrase
+        # Splits cover the whole document and overlap only when stride is set
+        assert splits[-1].end_offset == len(doc.rstrip())
+        for previous_split, split in zip(splits, splits[1:]):
+            if stride == 0:
+                assert split.start_offset > previous_split.end_offset
+            elif doc[previous_split.end_offset : split.start_offset].strip() != "":
+                assert split.start_offset < previous_split.end_offset
+
+
+def test_token_splits_leave_room_for_special_tokens(text_splitter):
+    tokenizer = Tokenizer(
+        models.WordLevel(vocab={"[UNK]": 0, "[CLS]": 1, "[SEP]": 2}, unk_token="[UNK]")
+    )
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 1), ("[SEP]", 2)]
+    )
+    bert_like_tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer)
+    assert bert_like_tokenizer.num_special_tokens_to_add() == 2
+
+    doc_splits = text_splitter.preprocess_input(
+        input_list=[TextPayload(processed_text=DOCUMENT_2)],
+        config=TextSplitterConfig(max_split_length=16, split_unit="token"),
+        tokenizer=bert_like_tokenizer,
+    )
+
+    assert len(doc_splits) > 1
+    for text_payload in doc_splits:
+        # Model input of the split including [CLS] and [SEP] is not truncated
+        assert len(bert_like_tokenizer(text_payload.processed_text)["input_ids"]) <= 16
+
+
+def test_token_splits_need_fast_tokenizer(text_splitter):
+    with pytest.raises(ValueError):
+        text_splitter.preprocess_input(
+            input_list=[TextPayload(processed_text=DOCUMENT_1)],
+            config=TextSplitterConfig(split_unit="token"),
+        )
+
+
+def test_sentence_tokenizer_cache():
+    sentence_tokenizer = TextSplitterConfig().sentence_tokenizer
+    assert get_sentence_tokenizer(sentence_tokenizer) is get_sentence_tokenizer(
+        sentence_tokenizer
+    )
+
+
+def test_offline_sentence_tokenizer(text_splitter):
+    with pytest.raises(LookupError):
+        text_splitter.preprocess_input(
+            input_list=[TextPayload(processed_text=DOCUMENT_1)],
+            config=TextSplitterConfig(
+                enable_sentence_split=True,
+                sentence_tokenizer="tokenizers/punkt_tab/obsei_missing_language/",
+                offline=True,
+            ),
+        )
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from obsei.analyzer.base_analyzer import MAX_LENGTH
+from obsei.analyzer.tokenization import (
+    aggregate_windows,
+    classification_probabilities,
+    max_token_length,
+    merge_token_windows,
+    pad_encodings,
+    top_labels,
+    window_document_indices,
+)
+
+
+@pytest.mark.parametrize(
+    "model_max_length, max_position_embeddings, expected",
+    [
+        (512, 514, 512),
+        (int(1e30), 128, 128),
+        (None, None, MAX_LENGTH),
+    ],
+)
+def test_max_token_length(model_max_length, max_position_embeddings, expected):
+    tokenizer = SimpleNamespace(model_max_length=model_max_length)
+    model_config = SimpleNamespace(max_position_embeddings=max_position_embeddings)
+
+    assert max_token_length(tokenizer, model_config) == expected
+
+
+def test_pad_encodings():
+    encodings = [
+        {
+            "input_ids": [1, 5, 2],
+            "token_type_ids": [0, 0, 0],
+            "offset_mapping": [(0, 0)] * 3,
+        },
+        {"input_ids": [1, 2], "token_type_ids": [0, 0], "offset_mapping": [(0, 0)] * 2},
+    ]
+
+    model_inputs = pad_encodings(
+        encodings,
+        pad_token_id=9,
+        model_input_names=["input_ids", "token_type_ids", "attention_mask"],
+    )
+
+    assert model_inputs.keys() == {"input_ids", "token_type_ids", "attention_mask"}
+    assert model_inputs["input_ids"].tolist() == [[1, 5, 2], [1, 2, 9]]
+    assert model_inputs["attention_mask"].tolist() == [[1, 1, 1], [1, 1, 0]]
+
+    model_inputs = pad_encodings(
+        encodings, pad_token_id=9, model_input_names=["input_ids", "attention_mask"]
+    )
+    assert model_inputs.keys() == {"input_ids", "attention_mask"}
+
+
+def test_top_labels():
+    model_config = SimpleNamespace(
+        problem_type=None, num_labels=2, id2label={0: "negative", 1: "positive"}
+    )
+    logits = torch.tensor([[0.0, 2.0], [3.0, 1.0]])
+
+    scores = top_labels(
+        classification_probabilities(logits, model_config), model_config
+    )
+
+    assert [score["label"] for score in scores] == ["positive", "negative"]
+    assert scores[0]["score"] == pytest.approx(
+        torch.tensor([0.0, 2.0]).softmax(-1)[1].item()
+    )
+
+
+def test_aggregate_windows():
+    window_scores = torch.tensor([[0.2, 0.8], [0.6, 0.4], [0.9, 0.1]])
+    encodings = [
+        {"input_ids": [1], "overflow_to_sample_mapping": 0},
+        {"input_ids": [1], "overflow_to_sample_mapping": 0},
+        {"input_ids": [1], "overflow_to_sample_mapping": 1},
+    ]
+    document_indices = window_document_indices(encodings)
+
+    assert document_indices == [0, 0, 1]
+    assert torch.allclose(
+        aggregate_windows(window_scores, document_indices, 2, "mean"),
+        torch.tensor([[0.4, 0.6], [0.9, 0.1]]),
+    )
+    assert torch.allclose(
+        aggregate_windows(window_scores, document_indices, 2, "max"),
+        torch.tensor([[0.6, 0.8], [0.9, 0.1]]),
+    )
+    with pytest.raises(ValueError):
+        aggregate_windows(window_scores, document_indices, 2, "median")
+
+
+def test_merge_token_windows():
+    # Two windows of "a b c" with overlapping token "b"
+    input_ids = [np.array([101, 1, 2, 102]), np.array([101, 2, 3, 102])]
+    offset_mapping = [
+        np.array([(0, 0), (0, 1), (2, 3), (0, 0)]),
+        np.array([(0, 0), (2, 3), (4, 5), (0, 0)]),
+    ]
+    special_tokens_mask = [np.array([1, 0, 0, 1]), np.array([1, 0, 0, 1])]
+    scores = [
+        np.array([[0.5, 0.5], [1.0, 0.0], [0.8, 0.2], [0.5, 0.5]]),
+        np.array([[0.5, 0.5], [0.4, 0.6], [0.0, 1.0], [0.5, 0.5]]),
+    ]
+
+    merged_ids, merged_scores, merged_offsets, merged_mask = merge_token_windows(
+        input_ids, scores, offset_mapping, special_tokens_mask
+    )
+
+    assert merged_ids.tolist() == [1, 2, 3]
+    assert merged_offsets.tolist() == [[0, 1], [2, 3], [4, 5]]
+    assert np.allclose(merged_scores, [[1.0, 0.0], [0.6, 0.4], [0.0, 1.0]])
+    assert merged_mask.tolist() == [0, 0, 0]
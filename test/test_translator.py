@@ -1,3 +1,7 @@
+from obsei.analyzer.translation_analyzer import (
+    TranslationAnalyzer,
+    TranslationAnalyzerConfig,
+)
 from obsei.payload import TextPayload
 
 GOOD_TEXT = """मुझे सब चीजे बहुत अच्छी लगी ।"""
@@ -27,3 +31,69 @@ def test_translate_analyzer(translate_analyzer):
         assert analyzer_response.segmented_data["translation_data"] is not None
         assert text == analyzer_response.segmented_data["translation_data"]["original_text"]
         assert text != analyzer_response.processed_text
+
+
+def test_translate_analyzer_skips_target_language():
+    translate_analyzer = TranslationAnalyzer(
+        model_name_or_path="Helsinki-NLP/opus-mt-hi-en",
+        batch_size=2,
+        target_language="en",
+    )
+    english_text = "The app is very good and I like it"
+    texts = [GOOD_TEXT, english_text, HINGLISH_TEXT]
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample") for text in texts
+    ]
+    analyzer_responses = translate_analyzer.analyze_input(
+        source_response_list=source_responses,
+    )
+    assert len(analyzer_responses) == len(texts)
+
+    detected_languages = [
+        response.segmented_data["translation_data"]["detected_language"]
+        for response in analyzer_responses
+    ]
+    assert detected_languages == ["hi", "en", None]
+    assert analyzer_responses[0].processed_text != GOOD_TEXT
+    assert analyzer_responses[1].processed_text == english_text
+    assert analyzer_responses[2].processed_text != HINGLISH_TEXT
+
+
+def test_translate_analyzer_generation_config(translate_analyzer):
+    source_responses = [
+        TextPayload(processed_text=text, source_name="sample") for text in TEXTS
+    ]
+    analyzer_config = TranslationAnalyzerConfig(num_beams=1, max_new_tokens=4)
+    analyzer_responses = translate_analyzer.analyze_input(
+        source_response_list=source_responses,
+        analyzer_config=analyzer_config,
+    )
+    assert len(analyzer_responses) == len(TEXTS)
+
+    for text, analyzer_response in zip(TEXTS, analyzer_responses):
+        assert (
+            text
+            == analyzer_response.segmented_data["translation_data"]["original_text"]
+        )
+        # Every word takes at least one generated token
+        assert len(analyzer_response.processed_text.split()) <= 4
+
+
+def test_translate_analyzer_model_prefix(translate_analyzer):
+    tokenizer = translate_analyzer._pipeline.tokenizer
+    model_config = translate_analyzer._pipeline.model.config
+    original_prefix = model_config.prefix
+    model_config.prefix = "translate Hindi to English: "
+    try:
+        encodings = translate_analyzer._tokenize([GOOD_TEXT])
+    finally:
+        model_config.prefix = original_prefix
+
+    assert (
+        encodings[0]["input_ids"]
+        == tokenizer("translate Hindi to English: " + GOOD_TEXT)["input_ids"]
+    )
+    assert (
+        translate_analyzer._tokenize([GOOD_TEXT])[0]["input_ids"]
+        == tokenizer(GOOD_TEXT)["input_ids"]
+    )